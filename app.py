@@ -1,42 +1,19 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+# plotly.express is imported inside the chart builders that use it; it is not
+# needed for the first paint and adds ~60 ms to a fresh server process
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import plotly.io as pio
 import numpy as np
-from datetime import datetime, date
-# import database as db  # Disabled for now - to implement later
-import requests
+from datetime import date, timedelta
+import math
+import sqlite3
+import database as db
+import profiling
+from metric_schema import TREND_METRICS
+from sheets import DATA_SOURCES, HIERARCHY, fetch_google_sheet, load_data, month_sheet_names, sheet_record_date
 from io import BytesIO
 
-# Google Sheet Configuration
-DATA_SOURCES = {
-    "Daily KPI Scorecard": {
-        "id": "1NLF3LTZbNybmSL8b7N3GSHwhfJD82Hxm-wkRiZooohk",
-        "type": "operational"
-    },
-    "Budget Tracker": {
-        "id": "1oVKpIEmRUTzJX5T66ziGpx2VBhLAcEETcFCS1Q4ah3M",
-        "type": "budget"
-    },
-}
-DEFAULT_DATA_SOURCE = "Daily KPI Scorecard"
-
-def get_google_sheet_url(sheet_id, sheet_name):
-    """Generate URL to fetch Google Sheet as Excel"""
-    # Use export URL for xlsx format
-    return f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=xlsx"
-
-def fetch_google_sheet(sheet_id):
-    """Fetch Google Sheet data directly"""
-    url = get_google_sheet_url(sheet_id, None)
-    try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        return BytesIO(response.content)
-    except Exception as e:
-        raise Exception(f"Failed to fetch Google Sheet: {str(e)}")
-
 # Page configuration
 st.set_page_config(
     page_title="Blue Star Investments - KPI Dashboard",
@@ -101,248 +78,84 @@ st.markdown("""
         box-shadow: 0 1px 3px rgba(0,0,0,0.1);
         border: 1px solid #e0e0e0;
     }
-</style>
-""", unsafe_allow_html=True)
-
-# Hierarchy mapping
-HIERARCHY = {
-    "North": {
-        "Dakotasota": ["Bemidji, MN", "Grand Forks, ND", "Grand Rapids, MN", "Hibbing, MN", "Jamestown, ND", "Virginia, MN"],
-        "Duluth": ["Cloquet, MN", "Duluth, MN (Superior St)", "Duluth, MN (West)", "Hermantown, MN", "Superior, WI"],
-        "Mid-Atlantic": ["Ashland, VA", "Chester, VA", "Clinton, MD", "Lovingston, VA", "Mechanicsville, VA", "Palmyra, VA", "Richmond, VA (Forest Hill Ave)", "Shrewsbury, PA", "Sparks, MD", "Timonium, MD", "Windsor, VA"],
-        "Nebraska": ["Columbus, NE", "Fremont, NE", "Grand Island, NE", "Kearney, NE", "Lincoln, NE (N. 26th)", "Lincoln, NE (27th St)", "Lincoln, NE (Pioneer Woods)"],
-        "Sioux Falls": ["Harrisburg, SD", "Sioux Falls, SD (41st)", "Sioux Falls, SD (Louise)", "Sioux Falls, SD (Sycamore)", "Tea, SD"],
-        "Southern Minnesota": ["Faribault, MN", "Mankato, MN (Madison)", "Mankato, MN (St. Andrews)", "New Ulm, MN", "Owatonna, MN", "Rochester, MN (37th)"]
-    },
-    "South Central": {
-        "Acadiana": ["Breaux Bridge, LA", "Broussard, LA", "Crowley, LA", "Lafayette, LA (Ambassador)", "Lafayette, LA (Johnston)", "New Iberia, LA", "Opelousas, LA", "Scott, LA", "Youngsville, LA"],
-        "East LA": ["Baton Rouge, LA (Coursey)", "Baton Rouge, LA (O'Neal)", "Baton Rouge, LA (Sherwood)", "Denham Springs, LA", "Gonzales, LA", "Hammond, LA", "Prairieville, LA", "Walker, LA"],
-        "Kansas City": ["Excelsior Springs, MO", "Independence, MO (Noland)", "Kansas City, MO (Barry)", "Kearney, MO", "Lee's Summit, MO (3rd)", "Liberty, MO"]
-    },
-    "South East": {
-        "East Florida": ["Jacksonville, FL (Baymeadows)", "Jacksonville, FL (Regency)", "Middleburg, FL", "Orange Park, FL", "St Augustine, FL"],
-        "Georgia": ["Albany, GA", "Americus, GA", "Cordele, GA", "Moultrie, GA", "Thomasville, GA"],
-        "West Florida": ["Bradenton, FL", "Brandon, FL", "Gibsonton, FL", "Largo, FL", "Palmetto, FL", "Riverview, FL", "Sarasota, FL", "Sun City, FL"]
+    /* KPI card grid - one HTML block per row of cards */
+    .kpi-grid {
+        display: grid;
+        grid-template-columns: repeat(var(--kpi-cols, 4), minmax(0, 1fr));
+        gap: 1rem;
+        margin-bottom: 0.5rem;
     }
-}
-
-# Column mappings for different sheet types
-COL_MAP_OPERATIONAL = {
-    0: 'Entity',
-    1: 'Member Net',
-    2: 'Lead to Member %',
-    3: 'Lead Booked %',
-    4: 'Appt Show %',
-    5: 'Appt Close %',
-    6: 'OB Phone Calls/Day',
-    7: 'Downpayment (w/o Sales Tax)',
-    8: 'FC Booking %',
-    9: 'Show %',
-    10: 'Close %',
-    11: 'Avg Deal',
-    12: 'Avg FCs/Day',
-    13: 'Downpayments',
-    14: 'Downpayment %',
-    15: 'TAV',
-    16: 'Revenue',
-    17: 'Remaining Draft',
-    18: 'Projected Revenue',
-    19: 'OB Phone Calls',
-    20: 'New Leads',
-    21: 'Appt Scheduled',
-    22: 'Appt Show Count',
-    23: 'Total Tours',
-    24: 'Walk-Ins',
-    25: 'New Members',
-    26: 'Downpayment Amount',
-    27: 'Square DPs',
-    28: 'FCs Booked @ POS',
-    29: 'FCs Made',
-    30: 'FCs Scheduled',
-    31: 'FCs Shows',
-    32: 'FCs Closes',
-    33: 'New Deals',
-    34: 'Sales Tax',
-    35: 'Locations'
-}
-
-COL_MAP_BUDGET = {
-    0: 'Entity',
-    1: 'Member Net Real',
-    2: 'Member Net Budget',
-    3: 'Member Net to Budget',
-    4: 'New Members Real',
-    5: 'New Members Budget',
-    6: 'New Members % of Budget',
-    7: 'PIF Members Real',
-    8: 'PIF Members Budget',
-    9: 'PIF Members % of Budget',
-    10: 'Downpayment Real',
-    11: 'Downpayment Budget',
-    12: 'Downpayment % of Budget',
-    13: 'Revenue',
-    14: 'Remaining Draft',
-    15: 'Projected Revenue',
-    16: 'Revenue Budget',
-    17: 'Projected Revenue % of Budget'
-}
-
-def load_operational_data(file_path, sheet_name):
-    """Load and parse operational (Daily KPI Scorecard) data"""
-    df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
-
-    def row_to_dict(row_idx):
-        """Convert a row to a dictionary using column mapping"""
-        result = {}
-        for col_idx, col_name in COL_MAP_OPERATIONAL.items():
-            try:
-                val = df.iloc[row_idx, col_idx]
-                if pd.notna(val):
-                    result[col_name] = val
-            except:
-                pass
-        return result
-
-    # Parse data
-    data = {
-        'company': None,
-        'territories': {},
-        'regions': {},
-        'clubs': {}
+    .kpi-card {
+        background-color: #ffffff;
+        padding: 15px;
+        border-radius: 10px;
+        border: 1px solid #e0e0e0;
+        box-shadow: 0 2px 4px rgba(0,0,0,0.05);
+        height: 100%;
     }
+    .kpi-card .kpi-label {
+        color: #666666;
+        font-size: 0.75rem;
+        margin: 0 0 8px 0;
+        text-transform: uppercase;
+        letter-spacing: 0.5px;
+        font-weight: 600;
+    }
+    .kpi-card .kpi-value {
+        color: #1E3A5F;
+        font-size: 1.5rem;
+        font-weight: 700;
+        margin: 0;
+    }
+    .kpi-card .kpi-value.kpi-value-sm {
+        font-size: 1.3rem;
+    }
+    .kpi-card .kpi-budget {
+        color: #888888;
+        font-size: 0.75rem;
+        margin: 4px 0 0 0;
+    }
+    .kpi-card .kpi-pct {
+        font-size: 0.9rem;
+        font-weight: 600;
+        margin: 4px 0 0 0;
+    }
+    .kpi-card .kpi-good { color: #34C759; }
+    .kpi-card .kpi-warn { color: #FF9500; }
+    .kpi-card .kpi-bad { color: #FF3B30; }
+    @media (max-width: 640px) {
+        .kpi-grid {
+            grid-template-columns: minmax(0, 1fr);
+        }
+    }
+</style>
+""", unsafe_allow_html=True)
 
-    # Get update timestamp
-    update_time = str(df.iloc[0, 0]) if pd.notna(df.iloc[0, 0]) else "Unknown"
-
-    # Row indices for different levels
-    company_row = 2
-    territory_rows = [5, 6, 7]  # North, South Central, South East
-
-    # Parse company level
-    data['company'] = row_to_dict(company_row)
-
-    # Parse territories
-    for row_idx in territory_rows:
-        row_data = row_to_dict(row_idx)
-        territory_name = row_data.get('Entity')
-        if territory_name:
-            data['territories'][territory_name] = row_data
-
-    # Parse regions (rows 10-21)
-    for row_idx in range(10, 22):
-        row_data = row_to_dict(row_idx)
-        region_name = row_data.get('Entity')
-        if region_name:
-            data['regions'][region_name] = row_data
-
-    # Parse clubs - find all club sections
-    current_region = None
-    for row_idx in range(23, len(df)):
-        entity_name = df.iloc[row_idx, 0]
-        col1_value = df.iloc[row_idx, 1]
-
-        if pd.isna(entity_name):
-            continue
-
-        # Check if this is a region header
-        if col1_value == 'Member Net':
-            current_region = entity_name
-            continue
+@st.cache_resource(max_entries=16, show_spinner=False)
+def load_snapshot(file_content, sheet_name, data_type="operational"):
+    """Parse a workbook tab once per distinct file content
 
-        # This is a club row
-        if current_region and pd.notna(col1_value):
-            club_data = row_to_dict(row_idx)
-            club_data['Region'] = current_region
-            # Find territory for this region
-            for territory, regions in HIERARCHY.items():
-                if current_region in regions:
-                    club_data['Territory'] = territory
-                    break
-            data['clubs'][entity_name] = club_data
-
-    return data, update_time
-
-def load_budget_data(file_path, sheet_name):
-    """Load and parse budget tracker data"""
-    df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
-
-    def row_to_dict(row_idx):
-        """Convert a row to a dictionary using column mapping"""
-        result = {}
-        for col_idx, col_name in COL_MAP_BUDGET.items():
-            try:
-                val = df.iloc[row_idx, col_idx]
-                if pd.notna(val):
-                    result[col_name] = val
-            except:
-                pass
-        return result
-
-    # Parse data
-    data = {
-        'company': None,
-        'territories': {},
-        'regions': {},
-        'clubs': {}
-    }
+    Returns the same (data, update_time) objects on every rerun while the
+    sheet is unchanged, so per-snapshot caches (e.g. the ranking index) can
+    key on the snapshot itself. Callers must treat the result as read-only.
+    """
+    return load_data(BytesIO(file_content), sheet_name, data_type)
 
-    # Get update timestamp
-    update_time = str(df.iloc[0, 0]) if pd.notna(df.iloc[0, 0]) else "Unknown"
-
-    # Row indices for different levels (same structure as operational)
-    company_row = 2
-    territory_rows = [5, 6, 7]  # North, South Central, South East
-
-    # Parse company level
-    data['company'] = row_to_dict(company_row)
-
-    # Parse territories
-    for row_idx in territory_rows:
-        row_data = row_to_dict(row_idx)
-        territory_name = row_data.get('Entity')
-        if territory_name:
-            data['territories'][territory_name] = row_data
-
-    # Parse regions (rows 10-21)
-    for row_idx in range(10, 22):
-        row_data = row_to_dict(row_idx)
-        region_name = row_data.get('Entity')
-        if region_name:
-            data['regions'][region_name] = row_data
-
-    # Parse clubs - find all club sections
-    current_region = None
-    for row_idx in range(23, len(df)):
-        entity_name = df.iloc[row_idx, 0]
-        col1_value = df.iloc[row_idx, 1]
-
-        if pd.isna(entity_name):
-            continue
+# A locked, corrupt or unwritable history database, raised by sqlite3
+# directly or re-raised by pd.read_sql_query; the live view works without it
+HISTORY_ERRORS = (sqlite3.Error, pd.errors.DatabaseError)
 
-        # Check if this is a region header (budget sheet uses 'Member Net Real' as second col)
-        if col1_value == 'Member Net Real':
-            current_region = entity_name
-            continue
+@st.cache_resource(max_entries=32, show_spinner=False)
+def load_stored_snapshot(record_date, month_year, data_type, upload_id):
+    """Rebuild a stored snapshot from the history database once per date
 
-        # This is a club row
-        if current_region and pd.notna(col1_value):
-            club_data = row_to_dict(row_idx)
-            club_data['Region'] = current_region
-            # Find territory for this region
-            for territory, regions in HIERARCHY.items():
-                if current_region in regions:
-                    club_data['Territory'] = territory
-                    break
-            data['clubs'][entity_name] = club_data
-
-    return data, update_time
-
-def load_data(file_path, sheet_name, data_type="operational"):
-    """Load data based on the data source type"""
-    if data_type == "budget":
-        return load_budget_data(file_path, sheet_name)
-    else:
-        return load_operational_data(file_path, sheet_name)
+    `upload_id` (from db.get_snapshot_dates) fingerprints that day's stored
+    snapshot and is part of the cache key, so a day that is re-ingested is
+    rebuilt while ingests of other days leave it cached. Like load_snapshot,
+    the result keeps its identity across reruns and must be treated as
+    read-only.
+    """
+    return db.load_snapshot_from_db(record_date, month_year, data_type)
 
 def format_currency(value):
     """Format value as currency"""
@@ -378,19 +191,139 @@ def safe_float(val):
     except:
         return 0
 
-def display_metric_card(label, value, prefix="", suffix=""):
-    """Display a metric with guaranteed visible label - light theme"""
-    st.markdown(f"""
-    <div style="background-color: #ffffff;
-                padding: 15px;
-                border-radius: 10px;
-                border: 1px solid #e0e0e0;
-                box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-                height: 100%;">
-        <p style="color: #666666; font-size: 0.75rem; margin: 0 0 8px 0; text-transform: uppercase; letter-spacing: 0.5px; font-weight: 600;">{label}</p>
-        <p style="color: #1E3A5F; font-size: 1.5rem; font-weight: 700; margin: 0;">{prefix}{value}{suffix}</p>
-    </div>
-    """, unsafe_allow_html=True)
+# Ranking engine - columnar view of the club snapshot for Top-N leaderboards
+def build_ranking_index(clubs):
+    """Build the columnar ranking index for a snapshot's clubs
+
+    Metric columns and scope filters are materialized on first use and kept
+    on the index, so repeat leaderboards over the same snapshot are cheap.
+    """
+    return {
+        'names': np.array(list(clubs.keys()), dtype=object),
+        'region': np.array([c.get('Region', '') for c in clubs.values()], dtype=object),
+        'territory': np.array([c.get('Territory', '') for c in clubs.values()], dtype=object),
+        'records': list(clubs.values()),
+        'metrics': {},
+        'scopes': {},
+    }
+
+@st.cache_resource
+def _snapshot_memo_store():
+    """Process-wide store of values derived from parsed snapshots that survives script reruns"""
+    return {}
+
+def snapshot_memo(snapshot, key, build):
+    """build() for a parsed snapshot object, computed once per object and key
+
+    load_snapshot and load_stored_snapshot hand back the same objects on every
+    rerun while the data is unchanged, so anything derived from a snapshot
+    can be kept here by its id. Keeping a reference to the snapshot
+    guarantees its id is not reused.
+    """
+    store = _snapshot_memo_store()
+    cached = store.get((id(snapshot), key))
+    if cached is None or cached[0] is not snapshot:
+        if len(store) >= 32:
+            store.clear()
+        cached = (snapshot, build())
+        store[id(snapshot), key] = cached
+    return cached[1]
+
+def get_ranking_index(data):
+    """Ranking index for a parsed snapshot, built once per snapshot object"""
+    clubs = data['clubs']
+    return snapshot_memo(clubs, 'ranking index', lambda: build_ranking_index(clubs))
+
+def get_snapshot_digest(filename, month_year, record_date, data, data_type="operational"):
+    """db.snapshot_digest() of a parsed snapshot, computed once per snapshot object"""
+    return snapshot_memo(data, ('history digest', filename, month_year, record_date, data_type),
+                         lambda: db.snapshot_digest(filename, month_year, record_date, data, data_type))
+
+def ranking_metric(index, metric):
+    """Float array of a metric across all clubs in the index (missing values are 0)"""
+    values = index['metrics'].get(metric)
+    if values is None:
+        values = np.fromiter((safe_float(r.get(metric, 0)) for r in index['records']),
+                             dtype=float, count=len(index['records']))
+        index['metrics'][metric] = values
+    return values
+
+def ranking_scope(index, view_level="Company", scope=None):
+    """Positions of the clubs in a company/territory/region scope"""
+    key = (view_level, scope)
+    positions = index['scopes'].get(key)
+    if positions is None:
+        if view_level == "Territory":
+            positions = np.flatnonzero(index['territory'] == scope)
+        elif view_level == "Region":
+            positions = np.flatnonzero(index['region'] == scope)
+        else:
+            positions = np.arange(len(index['names']))
+        index['scopes'][key] = positions
+    return positions
+
+def rank_clubs(index, metric, k=5, view_level="Company", scope=None, ascending=False):
+    """Positions of the k best clubs for a metric within a scope, best first
+
+    Selection is O(n) with np.argpartition; only the k winners get sorted.
+    """
+    positions = ranking_scope(index, view_level, scope)
+    values = ranking_metric(index, metric)[positions]
+    if not ascending:
+        values = -values
+    if k < len(values):
+        candidates = np.argpartition(values, k - 1)[:k]
+    else:
+        candidates = np.arange(len(values))
+    return positions[candidates[np.argsort(values[candidates], kind='stable')]]
+
+def leaderboard_frame(index, positions, columns):
+    """DataFrame of ranked clubs with `columns` mapping display name -> metric"""
+    frame = {
+        'Club': index['names'][positions],
+        'Region': index['region'][positions],
+        'Territory': index['territory'][positions],
+    }
+    for label, metric in columns.items():
+        frame[label] = ranking_metric(index, metric)[positions]
+    return pd.DataFrame(frame)
+
+def metric_card_html(label, value, prefix="", suffix=""):
+    """Build the HTML for a single metric card (styled by the page stylesheet)"""
+    return (f'<div class="kpi-card"><p class="kpi-label">{label}</p>'
+            f'<p class="kpi-value">{prefix}{value}{suffix}</p></div>')
+
+def budget_metric_card_html(label, real_value, budget_value, pct_value, prefix="", is_currency=True):
+    """Build the HTML for a budget vs actual metric card"""
+    real_fmt = f"${real_value:,.0f}" if is_currency else f"{real_value:,.0f}"
+    budget_fmt = f"${budget_value:,.0f}" if is_currency else f"{budget_value:,.0f}"
+    pct_fmt = f"{pct_value*100:.1f}%" if pct_value <= 2 else f"{pct_value:.1f}%"
+
+    # Color based on performance
+    if pct_value >= 1:
+        pct_class = 'kpi-good'
+    elif pct_value >= 0.8:
+        pct_class = 'kpi-warn'
+    else:
+        pct_class = 'kpi-bad'
+
+    return (f'<div class="kpi-card"><p class="kpi-label">{label}</p>'
+            f'<p class="kpi-value kpi-value-sm">{real_fmt}</p>'
+            f'<p class="kpi-budget">Budget: {budget_fmt}</p>'
+            f'<p class="kpi-pct {pct_class}">{pct_fmt} of Budget</p></div>')
+
+def render_metric_card_grid(cards, columns=None):
+    """Render a row of metric cards as one HTML block
+
+    `cards` is a list of HTML snippets from metric_card_html /
+    budget_metric_card_html. Sending the whole row in a single st.markdown
+    call replaces one delta message (and one st.columns cell) per card.
+    """
+    columns = columns or len(cards)
+    st.markdown(
+        f'<div class="kpi-grid" style="--kpi-cols: {columns};">{"".join(cards)}</div>',
+        unsafe_allow_html=True
+    )
 
 # Modern color palette
 COLORS = {
@@ -407,15 +340,38 @@ COLORS = {
 # Clean gradient for bar charts
 CHART_COLORS = ['#0066CC', '#00A3E0', '#5AC8FA', '#34C759', '#30D158']
 
-def create_gauge_chart(value, title, max_val=1, color_scale=None):
-    """Create a clean, modern gauge chart"""
+CHART_FONT_FAMILY = 'SF Pro Display, -apple-system, sans-serif'
+
+# Shared Plotly template - chart builders only set what differs per chart
+pio.templates['bsi'] = go.layout.Template(
+    layout={
+        'font': {'family': CHART_FONT_FAMILY},
+        'paper_bgcolor': 'rgba(0,0,0,0)',
+        'plot_bgcolor': 'rgba(0,0,0,0)',
+        'colorway': CHART_COLORS,
+        'title': {'font': {'size': 14, 'color': '#333333'}},
+        'xaxis': {'gridcolor': '#F0F0F0'},
+        'yaxis': {'gridcolor': '#F0F0F0'},
+        'legend': {'orientation': 'h', 'yanchor': 'bottom', 'y': 1.02, 'xanchor': 'right', 'x': 1,
+                   'bgcolor': 'rgba(0,0,0,0)', 'font': {'size': 11}},
+    },
+    data={
+        'bar': [go.Bar(textfont={'size': 11, 'color': '#666666'})],
+    }
+)
+# Used on its own rather than layered on Streamlit's theme template: every chart
+# sets its own colors, and the Streamlit template adds ~3.6 KB to each figure.
+pio.templates.default = 'bsi'
+
+def gauge_indicator(value, title):
+    """Build a single 0-100% gauge indicator trace"""
     pct_value = value * 100 if value <= 1 else value
 
-    fig = go.Figure(go.Indicator(
+    return go.Indicator(
         mode="gauge+number",
         value=pct_value,
         title={'text': title, 'font': {'size': 13, 'color': '#666666'}},
-        number={'suffix': '%', 'font': {'size': 28, 'color': '#1D1D1F', 'family': 'SF Pro Display, -apple-system, sans-serif'}},
+        number={'suffix': '%', 'font': {'size': 28, 'color': '#1D1D1F'}},
         gauge={
             'axis': {'range': [0, 100], 'ticksuffix': '%', 'tickcolor': '#E5E5E5', 'tickwidth': 1},
             'bar': {'color': '#0066CC', 'thickness': 0.7},
@@ -425,17 +381,10 @@ def create_gauge_chart(value, title, max_val=1, color_scale=None):
                 {'range': [0, 100], 'color': '#F5F5F7'}
             ],
         }
-    ))
-    fig.update_layout(
-        height=180,
-        margin=dict(l=20, r=20, t=40, b=10),
-        paper_bgcolor='rgba(0,0,0,0)',
-        font={'family': 'SF Pro Display, -apple-system, sans-serif'}
     )
-    return fig
 
-def create_budget_gauge_chart(value, title, show_over_budget=True):
-    """Create a gauge chart for budget tracking (0-150% range)"""
+def budget_gauge_indicator(value, title):
+    """Build a single budget tracking gauge indicator trace (0-150% range)"""
     pct_value = value * 100 if value <= 1.5 else value
 
     # Determine color based on performance
@@ -446,11 +395,11 @@ def create_budget_gauge_chart(value, title, show_over_budget=True):
     else:
         bar_color = '#FF3B30'  # Red for below budget
 
-    fig = go.Figure(go.Indicator(
+    return go.Indicator(
         mode="gauge+number",
         value=pct_value,
         title={'text': title, 'font': {'size': 13, 'color': '#666666'}},
-        number={'suffix': '%', 'font': {'size': 28, 'color': '#1D1D1F', 'family': 'SF Pro Display, -apple-system, sans-serif'}},
+        number={'suffix': '%', 'font': {'size': 28, 'color': '#1D1D1F'}},
         gauge={
             'axis': {'range': [0, 150], 'ticksuffix': '%', 'tickcolor': '#E5E5E5', 'tickwidth': 1},
             'bar': {'color': bar_color, 'thickness': 0.7},
@@ -467,42 +416,304 @@ def create_budget_gauge_chart(value, title, show_over_budget=True):
                 'value': 100
             }
         }
+    )
+
+def create_gauge_panel(indicators, height=180):
+    """Lay out several gauge indicators side by side in a single figure
+
+    One figure per panel means one chart payload and one iframe instead of one
+    per gauge. Each indicator is placed in its own cell of a 1 x N grid.
+    """
+    fig = go.Figure()
+    for i, indicator in enumerate(indicators):
+        indicator.domain = {'row': 0, 'column': i}
+        fig.add_trace(indicator)
+    fig.update_layout(
+        grid={'rows': 1, 'columns': max(len(indicators), 1), 'pattern': 'independent', 'xgap': 0.15},
+        height=height,
+        margin=dict(l=20, r=20, t=40, b=10)
+    )
+    return fig
+
+# Comparison charts switch to scale-aware modes above these entity counts
+MAX_BAR_ENTITIES = 25
+HEATMAP_PAGE_SIZE = 30
+WEBGL_POINT_THRESHOLD = 300
+
+def limit_entities(df, value_col, mode=None, n=MAX_BAR_ENTITIES):
+    """Keep the top or bottom n entities by value_col, folding the rest into one row
+
+    The folded row carries the mean of each numeric column over the remaining
+    entities so it stays on the same scale as the bars next to it. Frames with
+    n or fewer entities (or mode=None) are returned unchanged.
+    """
+    if mode is None or len(df) <= n:
+        return df
+    kept = df.nlargest(n, value_col) if mode == "Top" else df.nsmallest(n, value_col)
+    rest = df.drop(kept.index)
+    others = {'Entity': f"Others (avg of {len(rest)})", **rest.mean(numeric_only=True).to_dict()}
+    return pd.concat([kept, pd.DataFrame([others])], ignore_index=True)
+
+def entity_limit_selector(entity_count, key):
+    """Top/Bottom-N toggle for bar charts, only shown when there are too many entities to plot"""
+    if entity_count <= MAX_BAR_ENTITIES:
+        return None
+    return st.radio(
+        f"Bar charts: {entity_count} entities",
+        ["Top", "Bottom"],
+        format_func=lambda mode: f"{mode} {MAX_BAR_ENTITIES} + others",
+        horizontal=True,
+        key=key
+    )
+
+def paginate_heatmap(df_heatmap, key):
+    """Return the page of heatmap rows selected by the user, one page if it fits"""
+    if len(df_heatmap) <= HEATMAP_PAGE_SIZE:
+        return df_heatmap
+    pages = math.ceil(len(df_heatmap) / HEATMAP_PAGE_SIZE)
+    page = st.number_input(f"Heatmap page (1-{pages})", min_value=1, max_value=pages, value=1, key=key)
+    start = (page - 1) * HEATMAP_PAGE_SIZE
+    return df_heatmap.iloc[start:start + HEATMAP_PAGE_SIZE]
+
+def create_hbar_chart(df, value_col, title, color, text_format, height=None, margin_r=60, xaxis=None,
+                      limit_mode=None):
+    """Horizontal bar chart of one comparison column, one bar per Entity
+
+    `color` is a single color or a callable mapping the sorted values to a
+    list of colors. `text_format` is a str.format pattern for the bar labels.
+    `limit_mode` ("Top"/"Bottom") caps the bars via limit_entities.
+    """
+    df_sorted = limit_entities(df, value_col, limit_mode).sort_values(value_col, ascending=True)
+    values = df_sorted[value_col]
+    fig = go.Figure(go.Bar(
+        x=values,
+        y=df_sorted['Entity'],
+        orientation='h',
+        marker_color=color(values) if callable(color) else color,
+        text=values.map(text_format.format),
+        textposition='outside'
     ))
     fig.update_layout(
-        height=180,
-        margin=dict(l=20, r=20, t=40, b=10),
-        paper_bgcolor='rgba(0,0,0,0)',
-        font={'family': 'SF Pro Display, -apple-system, sans-serif'}
+        title_text=title,
+        height=height or max(280, len(df_sorted) * 40),
+        margin=dict(l=10, r=margin_r, t=40, b=20),
+        xaxis=xaxis
     )
     return fig
 
-def display_budget_metric_card(label, real_value, budget_value, pct_value, prefix="", is_currency=True):
-    """Display a budget vs actual metric card"""
-    real_fmt = f"${real_value:,.0f}" if is_currency else f"{real_value:,.0f}"
-    budget_fmt = f"${budget_value:,.0f}" if is_currency else f"{budget_value:,.0f}"
-    pct_fmt = f"{pct_value*100:.1f}%" if pct_value <= 2 else f"{pct_value:.1f}%"
+def create_grouped_bar_chart(df, value_cols, var_name, value_name, colors, yaxis=None, title=None, height=350,
+                             limit_mode=None):
+    """Grouped vertical bar chart comparing several columns per Entity
 
-    # Color based on performance
-    if pct_value >= 1:
-        pct_color = '#34C759'
-    elif pct_value >= 0.8:
-        pct_color = '#FF9500'
+    With `limit_mode` set, entities are ranked by the first of `value_cols`.
+    """
+    import plotly.express as px
+
+    df = limit_entities(df, value_cols[0], limit_mode)
+    df_melted = df[['Entity'] + value_cols].melt(
+        id_vars=['Entity'], var_name=var_name, value_name=value_name
+    )
+    if isinstance(colors, dict):
+        fig = px.bar(df_melted, x='Entity', y=value_name, color=var_name, barmode='group',
+                     color_discrete_map=colors)
     else:
-        pct_color = '#FF3B30'
-
-    st.markdown(f"""
-    <div style="background-color: #ffffff;
-                padding: 15px;
-                border-radius: 10px;
-                border: 1px solid #e0e0e0;
-                box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-                height: 100%;">
-        <p style="color: #666666; font-size: 0.75rem; margin: 0 0 8px 0; text-transform: uppercase; letter-spacing: 0.5px; font-weight: 600;">{label}</p>
-        <p style="color: #1E3A5F; font-size: 1.3rem; font-weight: 700; margin: 0;">{real_fmt}</p>
-        <p style="color: #888888; font-size: 0.75rem; margin: 4px 0 0 0;">Budget: {budget_fmt}</p>
-        <p style="color: {pct_color}; font-size: 0.9rem; font-weight: 600; margin: 4px 0 0 0;">{pct_fmt} of Budget</p>
-    </div>
-    """, unsafe_allow_html=True)
+        fig = px.bar(df_melted, x='Entity', y=value_name, color=var_name, barmode='group',
+                     color_discrete_sequence=colors)
+    fig.update_layout(
+        title_text=title,
+        height=height,
+        xaxis_tickangle=-45,
+        yaxis=yaxis
+    )
+    return fig
+
+def create_heatmap_chart(df_heatmap, y_label, color_label, color_scale, title, zmin=None, zmax=None):
+    """Annotated heatmap of Entity (rows) x metric (columns)"""
+    import plotly.express as px
+
+    fig = px.imshow(df_heatmap,
+                    labels=dict(x="Metric", y=y_label, color=color_label),
+                    color_continuous_scale=color_scale,
+                    aspect="auto",
+                    text_auto='.1f',
+                    zmin=zmin, zmax=zmax)
+    fig.update_layout(
+        title_text=title,
+        height=max(280, len(df_heatmap) * 35),
+        margin=dict(l=10, r=20, t=40, b=20)
+    )
+    fig.update_traces(textfont={'size': 12, 'color': '#333333'})
+    return fig
+
+def create_scatter_chart(df, x, y, size, color, color_scale, title, labels=None, yaxis=None, height=420):
+    """Bubble chart of one point per Entity, WebGL-rendered for large comparisons"""
+    import plotly.express as px
+
+    fig = px.scatter(df, x=x, y=y, size=size, color=color,
+                     hover_name='Entity',
+                     color_continuous_scale=color_scale,
+                     labels=labels,
+                     render_mode='webgl' if len(df) > WEBGL_POINT_THRESHOLD else 'svg')
+    fig.update_layout(
+        title_text=title,
+        height=height,
+        yaxis=yaxis
+    )
+    fig.update_traces(marker={'line': {'width': 1, 'color': 'white'}})
+    return fig
+
+# Trend charts over stored history
+TREND_MAX_POINTS = 400  # roughly one point per 2px of a full-width chart
+# None reads one point per month (its latest value) from the monthly rollups
+TREND_RANGES = {"Last 90 days": 90, "Last 12 months": 365, "All history": None}
+TREND_CURRENCY_METRICS = {'Revenue', 'Projected Revenue', 'TAV', 'Revenue Budget'}
+
+def lttb_downsample(x, y, threshold=TREND_MAX_POINTS):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling
+
+    Keeps the first and last points and, from each of threshold - 2 equal
+    buckets in between, the point forming the largest triangle with the
+    previously kept point and the next bucket's average. Peaks and dips
+    survive, unlike plain striding. `x` and `y` are float arrays.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    every = (n - 2) / (threshold - 2)
+    kept = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(areas.argmax())
+        kept.append(a)
+    kept.append(n - 1)
+    return np.array(kept)
+
+def trend_scope(data, view_level, selected_territory, selected_region, selected_club):
+    """(history level, focus entity, sibling entities) for the current view"""
+    if view_level == "Territory":
+        return 'territory', selected_territory, [t for t in HIERARCHY if t != selected_territory]
+    if view_level == "Region":
+        regions = HIERARCHY.get(selected_territory, {})
+        return 'region', selected_region, [r for r in regions if r != selected_region]
+    if view_level == "Club":
+        clubs = [name for name, club in data['clubs'].items()
+                 if club.get('Region') == selected_region and name != selected_club]
+        return 'club', selected_club, clubs
+    return 'company', 'Company', []
+
+def create_trend_chart(history, metric, focus, title=None, max_points=TREND_MAX_POINTS):
+    """Line chart of one metric over time, focus entity highlighted over grey siblings
+
+    Each series is reduced with LTTB before it is added - the focus line to
+    at most `max_points`, the context-only sibling lines to a quarter of that -
+    so the payload stays small however long the history is.
+    """
+    fig = go.Figure()
+    # Siblings first so the focus line is drawn on top
+    entities = sorted(history['entity'].unique(), key=lambda entity: entity == focus)
+    for entity in entities:
+        series = history[history['entity'] == entity].dropna(subset=['value'])
+        if series.empty:
+            continue
+        dates = pd.to_datetime(series['record_date'])
+        values = series['value'].to_numpy(dtype=float)
+        is_focus = entity == focus
+        keep = lttb_downsample(dates.to_numpy(dtype='datetime64[s]').astype(float), values,
+                               max_points if is_focus else max_points // 4)
+        fig.add_trace(go.Scatter(
+            x=dates.iloc[keep],
+            y=values[keep],
+            mode='lines',
+            name=entity,
+            line={'color': CHART_COLORS[0] if is_focus else '#CCCCCC', 'width': 3 if is_focus else 1},
+            opacity=1 if is_focus else 0.8,
+            showlegend=is_focus
+        ))
+    if '%' in metric or metric.endswith('to Budget'):
+        yaxis = {'tickformat': '.0%'}
+    elif metric in TREND_CURRENCY_METRICS:
+        yaxis = {'tickprefix': '$', 'tickformat': ','}
+    else:
+        yaxis = {'tickformat': ','}
+    fig.update_layout(
+        title_text=title or metric,
+        height=320,
+        margin=dict(l=10, r=20, t=40, b=20),
+        yaxis=yaxis,
+        hovermode='x unified' if len(fig.data) == 1 else 'closest'
+    )
+    return fig
+
+def monthly_history(level, entities, metric, data_type):
+    """get_history()-shaped frame with each month sheet's latest value, read from the rollups"""
+    rollups = db.get_monthly_rollups(level, entities, [metric], data_type=data_type)
+    history = rollups.rename(columns={'last_date': 'record_date', 'last_value': 'value'})
+    return history.sort_values(['entity', 'record_date'], kind='stable')[
+        ['entity', 'record_date', 'month_year', 'metric', 'value']]
+
+def render_trend_section(data, data_type, view_level, selected_territory, selected_region, selected_club, key):
+    """Trend panel for the selected entity, read from stored history in one query"""
+    level, focus, siblings = trend_scope(data, view_level, selected_territory, selected_region, selected_club)
+    st.markdown("#### 📉 Trends")
+
+    col1, col2, col3 = st.columns([2, 2, 1])
+    with col1:
+        metric = st.selectbox("Metric", TREND_METRICS[data_type], key=f"{key}_trend_metric")
+    with col2:
+        range_label = st.selectbox("Range", list(TREND_RANGES), key=f"{key}_trend_range")
+    with col3:
+        overlay = st.checkbox("Siblings", value=bool(siblings), disabled=not siblings,
+                              key=f"{key}_trend_siblings")
+
+    days = TREND_RANGES[range_label]
+    entities = [focus] + (siblings if overlay else [])
+    try:
+        with profiling.section("History query"):
+            if days is None:
+                history = monthly_history(level, entities, metric, data_type)
+            else:
+                start_date = (date.today() - timedelta(days=days)).isoformat()
+                history = db.get_history(level, entities, [metric], start_date=start_date, data_type=data_type)
+    except HISTORY_ERRORS as e:
+        st.caption(f"Trends unavailable - the history database could not be read: {e}")
+        return
+    # A day ingested from two month sheets keeps its latest upload (rows come in upload order)
+    history = history.drop_duplicates(['entity', 'metric', 'record_date'], keep='last')
+    if history[history['entity'] == focus].empty:
+        st.caption("No stored history for this view yet - trends appear once snapshots have been saved.")
+        return
+    st.plotly_chart(create_trend_chart(history, metric, focus), use_container_width=True)
+
+def budget_comparison_frame(compare_data):
+    """One row per compared entity with its budget figures (percentages scaled to 0-100)"""
+    comparison_rows = []
+    for name, metrics in compare_data.items():
+        try:
+            row = {
+                'Entity': name,
+                'Member Net Real': safe_float(metrics.get('Member Net Real', 0)),
+                'Member Net Budget': safe_float(metrics.get('Member Net Budget', 0)),
+                'Member Net %': safe_float(metrics.get('Member Net to Budget', 0)) * 100,
+                'New Members Real': safe_float(metrics.get('New Members Real', 0)),
+                'New Members Budget': safe_float(metrics.get('New Members Budget', 0)),
+                'New Members %': safe_float(metrics.get('New Members % of Budget', 0)) * 100,
+                'Downpayment Real': safe_float(metrics.get('Downpayment Real', 0)),
+                'Downpayment Budget': safe_float(metrics.get('Downpayment Budget', 0)),
+                'Downpayment %': safe_float(metrics.get('Downpayment % of Budget', 0)) * 100,
+                'Projected Revenue': safe_float(metrics.get('Projected Revenue', 0)),
+                'Revenue Budget': safe_float(metrics.get('Revenue Budget', 0)),
+                'Projected Revenue %': safe_float(metrics.get('Projected Revenue % of Budget', 0)) * 100,
+            }
+            comparison_rows.append(row)
+        except Exception as e:
+            pass
+    return pd.DataFrame(comparison_rows)
 
 def render_budget_dashboard(data, view_level, selected_territory, selected_region, selected_club):
     """Render the Budget Tracker dashboard view"""
@@ -529,11 +740,10 @@ def render_budget_dashboard(data, view_level, selected_territory, selected_regio
     st.markdown(f"*{subtitle}*")
     st.markdown("")
 
+    profiling.lap("Membership budget")
     # Section 1: Membership Budget vs Actual with Gauges
     st.markdown("#### 📊 Membership: Budget vs Actual")
 
-    col1, col2, col3 = st.columns(3)
-
     # Member Net
     member_net_real = safe_float(display_data.get('Member Net Real', 0))
     member_net_budget = safe_float(display_data.get('Member Net Budget', 0))
@@ -549,31 +759,24 @@ def render_budget_dashboard(data, view_level, selected_territory, selected_regio
     pif_budget = safe_float(display_data.get('PIF Members Budget', 0))
     pif_pct = safe_float(display_data.get('PIF Members % of Budget', 0))
 
-    with col1:
-        display_budget_metric_card("Member Net", member_net_real, member_net_budget, member_net_pct, is_currency=False)
-        st.markdown("")
-        fig = create_budget_gauge_chart(member_net_pct, "Member Net % of Budget")
-        st.plotly_chart(fig, use_container_width=True)
-
-    with col2:
-        display_budget_metric_card("New Members", new_members_real, new_members_budget, new_members_pct, is_currency=False)
-        st.markdown("")
-        fig = create_budget_gauge_chart(new_members_pct, "New Members % of Budget")
-        st.plotly_chart(fig, use_container_width=True)
-
-    with col3:
-        display_budget_metric_card("PIF Members", pif_real, pif_budget, pif_pct, is_currency=False)
-        st.markdown("")
-        fig = create_budget_gauge_chart(pif_pct, "PIF Members % of Budget")
-        st.plotly_chart(fig, use_container_width=True)
+    render_metric_card_grid([
+        budget_metric_card_html("Member Net", member_net_real, member_net_budget, member_net_pct, is_currency=False),
+        budget_metric_card_html("New Members", new_members_real, new_members_budget, new_members_pct, is_currency=False),
+        budget_metric_card_html("PIF Members", pif_real, pif_budget, pif_pct, is_currency=False),
+    ])
+    fig = create_gauge_panel([
+        budget_gauge_indicator(member_net_pct, "Member Net % of Budget"),
+        budget_gauge_indicator(new_members_pct, "New Members % of Budget"),
+        budget_gauge_indicator(pif_pct, "PIF Members % of Budget"),
+    ])
+    st.plotly_chart(fig, use_container_width=True)
 
     st.markdown("")
 
+    profiling.lap("Financial budget")
     # Section 2: Financial Budget vs Actual
     st.markdown("#### 💰 Financial: Budget vs Actual")
 
-    col1, col2 = st.columns(2)
-
     # Downpayment
     dp_real = safe_float(display_data.get('Downpayment Real', 0))
     dp_budget = safe_float(display_data.get('Downpayment Budget', 0))
@@ -584,36 +787,34 @@ def render_budget_dashboard(data, view_level, selected_territory, selected_regio
     rev_budget = safe_float(display_data.get('Revenue Budget', 0))
     proj_rev_pct = safe_float(display_data.get('Projected Revenue % of Budget', 0))
 
-    with col1:
-        display_budget_metric_card("Downpayment", dp_real, dp_budget, dp_pct, is_currency=True)
-        st.markdown("")
-        fig = create_budget_gauge_chart(dp_pct, "Downpayment % of Budget")
-        st.plotly_chart(fig, use_container_width=True)
-
-    with col2:
-        display_budget_metric_card("Projected Revenue", proj_rev, rev_budget, proj_rev_pct, is_currency=True)
-        st.markdown("")
-        fig = create_budget_gauge_chart(proj_rev_pct, "Projected Revenue % of Budget")
-        st.plotly_chart(fig, use_container_width=True)
+    render_metric_card_grid([
+        budget_metric_card_html("Downpayment", dp_real, dp_budget, dp_pct, is_currency=True),
+        budget_metric_card_html("Projected Revenue", proj_rev, rev_budget, proj_rev_pct, is_currency=True),
+    ])
+    fig = create_gauge_panel([
+        budget_gauge_indicator(dp_pct, "Downpayment % of Budget"),
+        budget_gauge_indicator(proj_rev_pct, "Projected Revenue % of Budget"),
+    ])
+    st.plotly_chart(fig, use_container_width=True)
 
     st.markdown("")
 
+    profiling.lap("Financial summary")
     # Section 3: Summary Financial Cards
     st.markdown("#### 📈 Financial Summary")
-    col1, col2, col3 = st.columns(3)
 
     revenue = safe_float(display_data.get('Revenue', 0))
     remaining_draft = safe_float(display_data.get('Remaining Draft', 0))
 
-    with col1:
-        display_metric_card("Revenue (MTD)", f"{revenue:,.2f}", prefix="$")
-    with col2:
-        display_metric_card("Remaining Draft", f"{remaining_draft:,.2f}", prefix="$")
-    with col3:
-        display_metric_card("Projected Revenue", f"{proj_rev:,.2f}", prefix="$")
+    render_metric_card_grid([
+        metric_card_html("Revenue (MTD)", f"{revenue:,.2f}", prefix="$"),
+        metric_card_html("Remaining Draft", f"{remaining_draft:,.2f}", prefix="$"),
+        metric_card_html("Projected Revenue", f"{proj_rev:,.2f}", prefix="$"),
+    ])
 
     st.markdown("")
 
+    profiling.lap("Comparison charts")
     # Section 4: Comparison Charts (Company/Territory/Region views)
     if view_level != "Club":
         st.markdown("---")
@@ -635,73 +836,25 @@ def render_budget_dashboard(data, view_level, selected_territory, selected_regio
             level_name = f"Clubs in {selected_region}"
 
         if compare_data:
-            # Build comparison dataframe
-            comparison_rows = []
-            for name, metrics in compare_data.items():
-                try:
-                    row = {
-                        'Entity': name,
-                        'Member Net Real': safe_float(metrics.get('Member Net Real', 0)),
-                        'Member Net Budget': safe_float(metrics.get('Member Net Budget', 0)),
-                        'Member Net %': safe_float(metrics.get('Member Net to Budget', 0)) * 100,
-                        'New Members Real': safe_float(metrics.get('New Members Real', 0)),
-                        'New Members Budget': safe_float(metrics.get('New Members Budget', 0)),
-                        'New Members %': safe_float(metrics.get('New Members % of Budget', 0)) * 100,
-                        'Downpayment Real': safe_float(metrics.get('Downpayment Real', 0)),
-                        'Downpayment Budget': safe_float(metrics.get('Downpayment Budget', 0)),
-                        'Downpayment %': safe_float(metrics.get('Downpayment % of Budget', 0)) * 100,
-                        'Projected Revenue': safe_float(metrics.get('Projected Revenue', 0)),
-                        'Revenue Budget': safe_float(metrics.get('Revenue Budget', 0)),
-                        'Projected Revenue %': safe_float(metrics.get('Projected Revenue % of Budget', 0)) * 100,
-                    }
-                    comparison_rows.append(row)
-                except Exception as e:
-                    pass
-
-            if comparison_rows:
-                df_compare = pd.DataFrame(comparison_rows)
+            df_compare = budget_comparison_frame(compare_data)
+            if not df_compare.empty:
+                bar_mode = entity_limit_selector(len(df_compare), key="budget_bar_mode")
 
                 # Real vs Budget grouped bar chart for New Members
                 st.markdown(f"##### New Members: Real vs Budget by {compare_title}")
-
-                df_members = df_compare[['Entity', 'New Members Real', 'New Members Budget']].melt(
-                    id_vars=['Entity'], var_name='Type', value_name='Count'
-                )
-
-                fig = px.bar(df_members, x='Entity', y='Count', color='Type',
-                            barmode='group',
-                            color_discrete_map={'New Members Real': '#0066CC', 'New Members Budget': '#CCCCCC'})
-                fig.update_layout(
-                    height=350,
-                    xaxis_tickangle=-45,
-                    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1,
-                               bgcolor='rgba(0,0,0,0)', font={'size': 11}),
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    xaxis={'gridcolor': '#F0F0F0'},
-                    yaxis={'gridcolor': '#F0F0F0', 'title': 'Count'}
+                fig = create_grouped_bar_chart(
+                    df_compare, ['New Members Real', 'New Members Budget'], 'Type', 'Count',
+                    {'New Members Real': '#0066CC', 'New Members Budget': '#CCCCCC'},
+                    yaxis={'title': 'Count'}, limit_mode=bar_mode
                 )
                 st.plotly_chart(fig, use_container_width=True)
 
                 # Real vs Budget grouped bar chart for Revenue
                 st.markdown(f"##### Projected Revenue: Real vs Budget by {compare_title}")
-
-                df_revenue = df_compare[['Entity', 'Projected Revenue', 'Revenue Budget']].melt(
-                    id_vars=['Entity'], var_name='Type', value_name='Amount'
-                )
-
-                fig = px.bar(df_revenue, x='Entity', y='Amount', color='Type',
-                            barmode='group',
-                            color_discrete_map={'Projected Revenue': '#34C759', 'Revenue Budget': '#CCCCCC'})
-                fig.update_layout(
-                    height=350,
-                    xaxis_tickangle=-45,
-                    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1,
-                               bgcolor='rgba(0,0,0,0)', font={'size': 11}),
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    xaxis={'gridcolor': '#F0F0F0'},
-                    yaxis={'gridcolor': '#F0F0F0', 'tickprefix': '$', 'tickformat': ',', 'title': 'Revenue'}
+                fig = create_grouped_bar_chart(
+                    df_compare, ['Projected Revenue', 'Revenue Budget'], 'Type', 'Amount',
+                    {'Projected Revenue': '#34C759', 'Revenue Budget': '#CCCCCC'},
+                    yaxis={'tickprefix': '$', 'tickformat': ',', 'title': 'Revenue'}, limit_mode=bar_mode
                 )
                 st.plotly_chart(fig, use_container_width=True)
 
@@ -709,23 +862,15 @@ def render_budget_dashboard(data, view_level, selected_territory, selected_regio
                 st.markdown(f"##### % of Budget Performance by {compare_title}")
 
                 pct_cols = ['Member Net %', 'New Members %', 'Downpayment %', 'Projected Revenue %']
-                df_heatmap = df_compare[['Entity'] + pct_cols].set_index('Entity')
+                df_heatmap = paginate_heatmap(df_compare[['Entity'] + pct_cols].set_index('Entity'),
+                                              key="budget_heatmap_page")
 
                 # Custom colorscale: red below 80, orange 80-100, green above 100
-                fig = px.imshow(df_heatmap,
-                               labels=dict(x="Metric", y=compare_title, color="% of Budget"),
-                               color_continuous_scale=[[0, '#FF3B30'], [0.53, '#FF9500'], [0.67, '#FFCC00'], [1, '#34C759']],
-                               aspect="auto",
-                               text_auto='.1f',
-                               zmin=0, zmax=150)
-                fig.update_layout(
-                    title={'text': f'% of Budget Heatmap (Target: 100%)', 'font': {'size': 14, 'color': '#333333'}},
-                    height=max(280, len(df_compare) * 35),
-                    margin=dict(l=10, r=20, t=40, b=20),
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font={'family': 'SF Pro Display, -apple-system, sans-serif'}
+                fig = create_heatmap_chart(
+                    df_heatmap, compare_title, "% of Budget",
+                    [[0, '#FF3B30'], [0.53, '#FF9500'], [0.67, '#FFCC00'], [1, '#34C759']],
+                    '% of Budget Heatmap (Target: 100%)', zmin=0, zmax=150
                 )
-                fig.update_traces(textfont={'size': 12, 'color': '#333333'})
                 st.plotly_chart(fig, use_container_width=True)
 
                 # Summary Table
@@ -746,7 +891,14 @@ def render_budget_dashboard(data, view_level, selected_territory, selected_regio
 
                 st.dataframe(df_display, use_container_width=True, hide_index=True)
 
-    # Section 5: Detailed Metrics Table
+    profiling.lap("Trends")
+    # Section 5: Trends from stored history
+    st.markdown("---")
+    render_trend_section(data, "budget", view_level, selected_territory, selected_region, selected_club,
+                         key="budget")
+
+    profiling.lap("Detailed table")
+    # Section 6: Detailed Metrics Table
     st.markdown("---")
     st.markdown("#### 📋 Detailed Budget Metrics")
 
@@ -789,6 +941,7 @@ def render_budget_dashboard(data, view_level, selected_territory, selected_regio
     with col2:
         st.dataframe(df_table.iloc[len(df_table)//2:], use_container_width=True, hide_index=True)
 
+    profiling.lap("Drill-down")
     # Drill-down navigation
     st.markdown("---")
     if view_level == "Company":
@@ -801,6 +954,30 @@ def render_budget_dashboard(data, view_level, selected_territory, selected_regio
                     st.session_state['selected_territory'] = territory
                     st.rerun()
 
+def operational_comparison_frame(compare_data):
+    """One row per compared entity with its operational KPIs (percentages scaled to 0-100)"""
+    comparison_rows = []
+    for name, metrics in compare_data.items():
+        try:
+            row = {
+                'Entity': name,
+                'Revenue': float(metrics.get('Revenue', 0)) if pd.notna(metrics.get('Revenue')) else 0,
+                'Projected Revenue': float(metrics.get('Projected Revenue', 0)) if pd.notna(metrics.get('Projected Revenue')) else 0,
+                'New Members': float(metrics.get('New Members', 0)) if pd.notna(metrics.get('New Members')) else 0,
+                'Member Net': float(metrics.get('Member Net', 0)) if pd.notna(metrics.get('Member Net')) else 0,
+                'New Leads': float(metrics.get('New Leads', 0)) if pd.notna(metrics.get('New Leads')) else 0,
+                'Lead to Member %': float(metrics.get('Lead to Member %', 0)) * 100 if pd.notna(metrics.get('Lead to Member %')) else 0,
+                'Appt Show %': float(metrics.get('Appt Show %', 0)) * 100 if pd.notna(metrics.get('Appt Show %')) else 0,
+                'Appt Close %': float(metrics.get('Appt Close %', 0)) * 100 if pd.notna(metrics.get('Appt Close %')) else 0,
+                'OB Calls/Day': float(metrics.get('OB Phone Calls/Day', 0)) if pd.notna(metrics.get('OB Phone Calls/Day')) else 0,
+                'Avg Deal': float(metrics.get('Avg Deal', 0)) if pd.notna(metrics.get('Avg Deal')) else 0,
+                'TAV': float(metrics.get('TAV', 0)) if pd.notna(metrics.get('TAV')) else 0,
+            }
+            comparison_rows.append(row)
+        except Exception as e:
+            pass
+    return pd.DataFrame(comparison_rows)
+
 def render_operational_dashboard(data, view_level, selected_territory, selected_region, selected_club):
     """Render the operational (Daily KPI Scorecard) dashboard view"""
 
@@ -826,9 +1003,9 @@ def render_operational_dashboard(data, view_level, selected_territory, selected_
     st.markdown(f"*{subtitle}*")
     st.markdown("")
 
+    profiling.lap("Membership KPIs")
     # KPI Metrics Row 1 - Membership
     st.markdown("#### 📊 Membership Metrics")
-    col1, col2, col3, col4, col5, col6 = st.columns(6)
 
     member_net = display_data.get('Member Net', 0)
     new_members = display_data.get('New Members', 0)
@@ -837,30 +1014,20 @@ def render_operational_dashboard(data, view_level, selected_territory, selected_
     total_tours = display_data.get('Total Tours', 0)
     appt_scheduled = display_data.get('Appt Scheduled', 0)
 
-    with col1:
-        mn = safe_float(member_net)
-        display_metric_card("Member Net", format_number(mn))
-
-    with col2:
-        display_metric_card("New Members", format_number(safe_float(new_members)))
-
-    with col3:
-        display_metric_card("New Leads", format_number(safe_float(new_leads)))
-
-    with col4:
-        display_metric_card("Walk-Ins", format_number(safe_float(walk_ins)))
-
-    with col5:
-        display_metric_card("Total Tours", format_number(safe_float(total_tours)))
-
-    with col6:
-        display_metric_card("Appts Scheduled", format_number(safe_float(appt_scheduled)))
+    render_metric_card_grid([
+        metric_card_html("Member Net", format_number(safe_float(member_net))),
+        metric_card_html("New Members", format_number(safe_float(new_members))),
+        metric_card_html("New Leads", format_number(safe_float(new_leads))),
+        metric_card_html("Walk-Ins", format_number(safe_float(walk_ins))),
+        metric_card_html("Total Tours", format_number(safe_float(total_tours))),
+        metric_card_html("Appts Scheduled", format_number(safe_float(appt_scheduled))),
+    ])
 
     st.markdown("")
 
+    profiling.lap("Revenue KPIs")
     # KPI Metrics Row 2 - Revenue
     st.markdown("#### 💰 Financial Metrics")
-    col1, col2, col3, col4, col5, col6 = st.columns(6)
 
     revenue = display_data.get('Revenue', 0)
     projected_rev = display_data.get('Projected Revenue', 0)
@@ -869,86 +1036,50 @@ def render_operational_dashboard(data, view_level, selected_territory, selected_
     downpayment = display_data.get('Downpayment (w/o Sales Tax)', 0)
     avg_deal = display_data.get('Avg Deal', 0)
 
-    with col1:
-        display_metric_card("Revenue (MTD)", f"{safe_float(revenue):,.2f}", prefix="$")
-
-    with col2:
-        display_metric_card("Projected Revenue", f"{safe_float(projected_rev):,.2f}", prefix="$")
-
-    with col3:
-        display_metric_card("Remaining Draft", f"{safe_float(remaining_draft):,.2f}", prefix="$")
-
-    with col4:
-        display_metric_card("TAV", f"{safe_float(tav):,.2f}", prefix="$")
-
-    with col5:
-        display_metric_card("Downpayments", f"{safe_float(downpayment):,.2f}", prefix="$")
-
-    with col6:
-        display_metric_card("Avg Deal Size", f"{safe_float(avg_deal):,.2f}", prefix="$")
+    render_metric_card_grid([
+        metric_card_html("Revenue (MTD)", f"{safe_float(revenue):,.2f}", prefix="$"),
+        metric_card_html("Projected Revenue", f"{safe_float(projected_rev):,.2f}", prefix="$"),
+        metric_card_html("Remaining Draft", f"{safe_float(remaining_draft):,.2f}", prefix="$"),
+        metric_card_html("TAV", f"{safe_float(tav):,.2f}", prefix="$"),
+        metric_card_html("Downpayments", f"{safe_float(downpayment):,.2f}", prefix="$"),
+        metric_card_html("Avg Deal Size", f"{safe_float(avg_deal):,.2f}", prefix="$"),
+    ])
 
     st.markdown("")
 
+    profiling.lap("Top 5 PT")
     # Top 5 PT Projected Revenue (only show at Company, Territory, Region levels)
     if view_level != "Club":
         st.markdown("#### 💪 Top 5 PT Projected Revenue")
 
-        # Filter clubs based on current view level
         if view_level == "Company":
-            filtered_clubs = data['clubs']
+            scope = None
             top_title = "Top 5 PT Projected Revenue - Company Wide"
         elif view_level == "Territory":
-            filtered_clubs = {k: v for k, v in data['clubs'].items() if v.get('Territory') == selected_territory}
+            scope = selected_territory
             top_title = f"Top 5 PT Projected Revenue - {selected_territory}"
         else:  # Region
-            filtered_clubs = {k: v for k, v in data['clubs'].items() if v.get('Region') == selected_region}
+            scope = selected_region
             top_title = f"Top 5 PT Projected Revenue - {selected_region}"
 
-        # Build ranking data
-        ranking_data = []
-        for club_name, metrics in filtered_clubs.items():
-            pt_proj_rev = safe_float(metrics.get('Projected Revenue', 0))
-            pt_revenue = safe_float(metrics.get('Revenue', 0))
-            avg_deal_val = safe_float(metrics.get('Avg Deal', 0))
-            fc_closes = safe_float(metrics.get('FCs Closes', 0))
-            region = metrics.get('Region', '')
-            territory = metrics.get('Territory', '')
-            ranking_data.append({
-                'Club': club_name,
-                'Region': region,
-                'Territory': territory,
-                'PT Projected Revenue': pt_proj_rev,
-                'PT Revenue (MTD)': pt_revenue,
-                'Avg Deal': avg_deal_val,
-                'FC Closes': fc_closes
-            })
+        index = get_ranking_index(data)
+        top_clubs = rank_clubs(index, 'Projected Revenue', k=5, view_level=view_level, scope=scope)
 
-        if ranking_data:
-            df_ranking = pd.DataFrame(ranking_data)
-            df_ranking = df_ranking.sort_values('PT Projected Revenue', ascending=False).head(5)
+        if len(top_clubs):
+            df_ranking = leaderboard_frame(index, top_clubs, {
+                'PT Projected Revenue': 'Projected Revenue',
+                'PT Revenue (MTD)': 'Revenue',
+                'Avg Deal': 'Avg Deal',
+                'FC Closes': 'FCs Closes',
+            })
 
             col1, col2 = st.columns([2, 1])
 
             with col1:
                 # Bar chart of top PT revenue locations
-                fig = go.Figure(go.Bar(
-                    x=df_ranking['PT Projected Revenue'],
-                    y=df_ranking['Club'],
-                    orientation='h',
-                    marker_color='#34C759',
-                    text=df_ranking['PT Projected Revenue'].apply(lambda x: f"${x:,.0f}"),
-                    textposition='outside',
-                    textfont={'size': 11, 'color': '#666666'}
-                ))
-                fig.update_layout(
-                    title={'text': top_title, 'font': {'size': 14, 'color': '#333333'}},
-                    height=280,
-                    margin=dict(l=10, r=100, t=40, b=20),
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    xaxis={'gridcolor': '#F0F0F0', 'tickprefix': '$', 'tickformat': ','},
-                    yaxis={'gridcolor': '#F0F0F0', 'categoryorder': 'total ascending'}
-                )
+                fig = create_hbar_chart(df_ranking.rename(columns={'Club': 'Entity'}), 'PT Projected Revenue',
+                                        top_title, '#34C759', "${:,.0f}", height=280, margin_r=100,
+                                        xaxis={'tickprefix': '$', 'tickformat': ','})
                 st.plotly_chart(fig, use_container_width=True)
 
             with col2:
@@ -965,6 +1096,7 @@ def render_operational_dashboard(data, view_level, selected_territory, selected_
 
         st.markdown("")
 
+    profiling.lap("Conversion funnel")
     # Conversion Funnel
     st.markdown("#### 🎯 Sales Funnel Performance")
 
@@ -977,39 +1109,13 @@ def render_operational_dashboard(data, view_level, selected_territory, selected_
     close_pct = display_data.get('Close %', 0)
 
     # Row 1: Main conversion gauges
-    col1, col2, col3, col4 = st.columns(4)
-
-    with col1:
-        try:
-            val = float(lead_to_member) if pd.notna(lead_to_member) else 0
-            fig = create_gauge_chart(val, "Lead → Member")
-            st.plotly_chart(fig, use_container_width=True)
-        except:
-            st.metric("Lead to Member %", format_percent(lead_to_member))
-
-    with col2:
-        try:
-            val = float(lead_booked) if pd.notna(lead_booked) else 0
-            fig = create_gauge_chart(val, "Lead → Booked")
-            st.plotly_chart(fig, use_container_width=True)
-        except:
-            st.metric("Lead Booked %", format_percent(lead_booked))
-
-    with col3:
-        try:
-            val = float(appt_show) if pd.notna(appt_show) else 0
-            fig = create_gauge_chart(val, "Appt Show Rate")
-            st.plotly_chart(fig, use_container_width=True)
-        except:
-            st.metric("Appt Show %", format_percent(appt_show))
-
-    with col4:
-        try:
-            val = float(appt_close) if pd.notna(appt_close) else 0
-            fig = create_gauge_chart(val, "Appt Close Rate")
-            st.plotly_chart(fig, use_container_width=True)
-        except:
-            st.metric("Appt Close %", format_percent(appt_close))
+    fig = create_gauge_panel([
+        gauge_indicator(safe_float(lead_to_member), "Lead → Member"),
+        gauge_indicator(safe_float(lead_booked), "Lead → Booked"),
+        gauge_indicator(safe_float(appt_show), "Appt Show Rate"),
+        gauge_indicator(safe_float(appt_close), "Appt Close Rate"),
+    ])
+    st.plotly_chart(fig, use_container_width=True)
 
     # Visual Funnel Chart - Clean modern design
     st.markdown("##### Sales Funnel")
@@ -1031,7 +1137,7 @@ def render_operational_dashboard(data, view_level, selected_territory, selected_
             x=funnel_values,
             textposition="inside",
             textinfo="value+percent initial",
-            textfont={'size': 14, 'color': 'white', 'family': 'SF Pro Display, -apple-system, sans-serif'},
+            textfont={'size': 14, 'color': 'white'},
             marker=dict(
                 color=['#0066CC', '#00A3E0', '#5AC8FA', '#34C759'],
                 line={'width': 0}
@@ -1041,10 +1147,7 @@ def render_operational_dashboard(data, view_level, selected_territory, selected_
         ))
         fig_funnel.update_layout(
             height=280,
-            margin=dict(l=10, r=10, t=10, b=10),
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)',
-            font={'family': 'SF Pro Display, -apple-system, sans-serif'}
+            margin=dict(l=10, r=10, t=10, b=10)
         )
         st.plotly_chart(fig_funnel, use_container_width=True)
 
@@ -1057,37 +1160,33 @@ def render_operational_dashboard(data, view_level, selected_territory, selected_
             ("FC Close %", close_pct, True),
             ("Avg FCs/Day", display_data.get('Avg FCs/Day', 0), False)
         ]
+        fc_cards = []
         for label, val, is_pct in fc_metrics:
             if is_pct:
-                display_val = f"{safe_float(val)*100:.1f}"
-                display_metric_card(label, display_val, suffix="%")
+                fc_cards.append(metric_card_html(label, f"{safe_float(val)*100:.1f}", suffix="%"))
             else:
-                display_val = f"{safe_float(val):.2f}"
-                display_metric_card(label, display_val)
-            st.markdown("<div style='margin-bottom: 8px;'></div>", unsafe_allow_html=True)
+                fc_cards.append(metric_card_html(label, f"{safe_float(val):.2f}"))
+        render_metric_card_grid(fc_cards, columns=1)
 
+    profiling.lap("Activity KPIs")
     # Activity Metrics
     st.markdown("#### 📞 Activity Metrics")
-    col1, col2, col3, col4 = st.columns(4)
-
-    with col1:
-        ob_calls = display_data.get('OB Phone Calls', 0)
-        display_metric_card("OB Phone Calls (Total)", format_number(safe_float(ob_calls)))
 
-    with col2:
-        ob_calls_day = display_data.get('OB Phone Calls/Day', 0)
-        display_metric_card("OB Calls/Day", f"{safe_float(ob_calls_day):.1f}")
-
-    with col3:
-        fcs_made = display_data.get('FCs Made', 0)
-        display_metric_card("FCs Made", format_number(safe_float(fcs_made)))
+    ob_calls = display_data.get('OB Phone Calls', 0)
+    ob_calls_day = display_data.get('OB Phone Calls/Day', 0)
+    fcs_made = display_data.get('FCs Made', 0)
+    new_deals = display_data.get('New Deals', 0)
 
-    with col4:
-        new_deals = display_data.get('New Deals', 0)
-        display_metric_card("New Deals", format_number(safe_float(new_deals)))
+    render_metric_card_grid([
+        metric_card_html("OB Phone Calls (Total)", format_number(safe_float(ob_calls))),
+        metric_card_html("OB Calls/Day", f"{safe_float(ob_calls_day):.1f}"),
+        metric_card_html("FCs Made", format_number(safe_float(fcs_made))),
+        metric_card_html("New Deals", format_number(safe_float(new_deals))),
+    ])
 
     st.markdown("")
 
+    profiling.lap("Comparison charts")
     # Comparison Charts (only show at Company/Territory/Region level)
     if view_level != "Club":
         st.markdown("---")
@@ -1112,77 +1211,24 @@ def render_operational_dashboard(data, view_level, selected_territory, selected_
             level_name = f"Clubs in {selected_region}"
 
         if compare_data:
-            # Build comprehensive comparison dataframe
-            comparison_rows = []
-            for name, metrics in compare_data.items():
-                try:
-                    row = {
-                        'Entity': name,
-                        'Revenue': float(metrics.get('Revenue', 0)) if pd.notna(metrics.get('Revenue')) else 0,
-                        'Projected Revenue': float(metrics.get('Projected Revenue', 0)) if pd.notna(metrics.get('Projected Revenue')) else 0,
-                        'New Members': float(metrics.get('New Members', 0)) if pd.notna(metrics.get('New Members')) else 0,
-                        'Member Net': float(metrics.get('Member Net', 0)) if pd.notna(metrics.get('Member Net')) else 0,
-                        'New Leads': float(metrics.get('New Leads', 0)) if pd.notna(metrics.get('New Leads')) else 0,
-                        'Lead to Member %': float(metrics.get('Lead to Member %', 0)) * 100 if pd.notna(metrics.get('Lead to Member %')) else 0,
-                        'Appt Show %': float(metrics.get('Appt Show %', 0)) * 100 if pd.notna(metrics.get('Appt Show %')) else 0,
-                        'Appt Close %': float(metrics.get('Appt Close %', 0)) * 100 if pd.notna(metrics.get('Appt Close %')) else 0,
-                        'OB Calls/Day': float(metrics.get('OB Phone Calls/Day', 0)) if pd.notna(metrics.get('OB Phone Calls/Day')) else 0,
-                        'Avg Deal': float(metrics.get('Avg Deal', 0)) if pd.notna(metrics.get('Avg Deal')) else 0,
-                        'TAV': float(metrics.get('TAV', 0)) if pd.notna(metrics.get('TAV')) else 0,
-                    }
-                    comparison_rows.append(row)
-                except Exception as e:
-                    pass
-
-            if comparison_rows:
-                df_compare = pd.DataFrame(comparison_rows)
+            df_compare = operational_comparison_frame(compare_data)
+            if not df_compare.empty:
+                bar_mode = entity_limit_selector(len(df_compare), key="ops_bar_mode")
 
                 # Row 1: Revenue and Members side by side
                 st.markdown(f"##### Financial Performance by {compare_title}")
                 col1, col2 = st.columns(2)
 
                 with col1:
-                    df_sorted = df_compare.sort_values('Revenue', ascending=True)
-                    fig = go.Figure(go.Bar(
-                        x=df_sorted['Revenue'],
-                        y=df_sorted['Entity'],
-                        orientation='h',
-                        marker_color='#0066CC',
-                        text=df_sorted['Revenue'].apply(lambda x: f"${x:,.0f}"),
-                        textposition='outside',
-                        textfont={'size': 11, 'color': '#666666'}
-                    ))
-                    fig.update_layout(
-                        title={'text': 'Revenue (MTD)', 'font': {'size': 14, 'color': '#333333'}},
-                        height=max(280, len(df_compare) * 40),
-                        margin=dict(l=10, r=80, t=40, b=20),
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        xaxis={'tickprefix': '$', 'tickformat': ',', 'gridcolor': '#F0F0F0'},
-                        yaxis={'gridcolor': '#F0F0F0'}
-                    )
+                    fig = create_hbar_chart(df_compare, 'Revenue', 'Revenue (MTD)', '#0066CC', "${:,.0f}",
+                                            margin_r=80, xaxis={'tickprefix': '$', 'tickformat': ','},
+                                            limit_mode=bar_mode)
                     st.plotly_chart(fig, use_container_width=True)
 
                 with col2:
-                    df_sorted = df_compare.sort_values('Projected Revenue', ascending=True)
-                    fig = go.Figure(go.Bar(
-                        x=df_sorted['Projected Revenue'],
-                        y=df_sorted['Entity'],
-                        orientation='h',
-                        marker_color='#00A3E0',
-                        text=df_sorted['Projected Revenue'].apply(lambda x: f"${x:,.0f}"),
-                        textposition='outside',
-                        textfont={'size': 11, 'color': '#666666'}
-                    ))
-                    fig.update_layout(
-                        title={'text': 'Projected Revenue', 'font': {'size': 14, 'color': '#333333'}},
-                        height=max(280, len(df_compare) * 40),
-                        margin=dict(l=10, r=80, t=40, b=20),
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        xaxis={'tickprefix': '$', 'tickformat': ',', 'gridcolor': '#F0F0F0'},
-                        yaxis={'gridcolor': '#F0F0F0'}
-                    )
+                    fig = create_hbar_chart(df_compare, 'Projected Revenue', 'Projected Revenue', '#00A3E0', "${:,.0f}",
+                                            margin_r=80, xaxis={'tickprefix': '$', 'tickformat': ','},
+                                            limit_mode=bar_mode)
                     st.plotly_chart(fig, use_container_width=True)
 
                 # Row 2: Membership metrics
@@ -1190,49 +1236,16 @@ def render_operational_dashboard(data, view_level, selected_territory, selected_
                 col1, col2 = st.columns(2)
 
                 with col1:
-                    df_sorted = df_compare.sort_values('New Members', ascending=True)
-                    fig = go.Figure(go.Bar(
-                        x=df_sorted['New Members'],
-                        y=df_sorted['Entity'],
-                        orientation='h',
-                        marker_color='#34C759',
-                        text=df_sorted['New Members'].apply(lambda x: f"{x:.0f}"),
-                        textposition='outside',
-                        textfont={'size': 11, 'color': '#666666'}
-                    ))
-                    fig.update_layout(
-                        title={'text': 'New Members', 'font': {'size': 14, 'color': '#333333'}},
-                        height=max(280, len(df_compare) * 40),
-                        margin=dict(l=10, r=60, t=40, b=20),
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        xaxis={'gridcolor': '#F0F0F0'},
-                        yaxis={'gridcolor': '#F0F0F0'}
-                    )
+                    fig = create_hbar_chart(df_compare, 'New Members', 'New Members', '#34C759', "{:.0f}",
+                                            limit_mode=bar_mode)
                     st.plotly_chart(fig, use_container_width=True)
 
                 with col2:
                     # Member Net with positive/negative coloring
-                    df_sorted = df_compare.sort_values('Member Net', ascending=True)
-                    colors = ['#FF3B30' if x < 0 else '#34C759' for x in df_sorted['Member Net']]
-                    fig = go.Figure(go.Bar(
-                        x=df_sorted['Member Net'],
-                        y=df_sorted['Entity'],
-                        orientation='h',
-                        marker_color=colors,
-                        text=df_sorted['Member Net'].apply(lambda x: f"{x:+.0f}"),
-                        textposition='outside',
-                        textfont={'size': 11, 'color': '#666666'}
-                    ))
-                    fig.update_layout(
-                        title={'text': 'Member Net (+/-)', 'font': {'size': 14, 'color': '#333333'}},
-                        height=max(280, len(df_compare) * 40),
-                        margin=dict(l=10, r=60, t=40, b=20),
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        xaxis={'gridcolor': '#F0F0F0', 'zeroline': True, 'zerolinecolor': '#CCCCCC'},
-                        yaxis={'gridcolor': '#F0F0F0'}
-                    )
+                    fig = create_hbar_chart(df_compare, 'Member Net', 'Member Net (+/-)',
+                                            lambda values: ['#FF3B30' if x < 0 else '#34C759' for x in values],
+                                            "{:+.0f}", xaxis={'zeroline': True, 'zerolinecolor': '#CCCCCC'},
+                                            limit_mode=bar_mode)
                     st.plotly_chart(fig, use_container_width=True)
 
                 # Row 3: Lead generation
@@ -1240,108 +1253,48 @@ def render_operational_dashboard(data, view_level, selected_territory, selected_
                 col1, col2 = st.columns(2)
 
                 with col1:
-                    df_sorted = df_compare.sort_values('New Leads', ascending=True)
-                    fig = go.Figure(go.Bar(
-                        x=df_sorted['New Leads'],
-                        y=df_sorted['Entity'],
-                        orientation='h',
-                        marker_color='#5AC8FA',
-                        text=df_sorted['New Leads'].apply(lambda x: f"{x:.0f}"),
-                        textposition='outside',
-                        textfont={'size': 11, 'color': '#666666'}
-                    ))
-                    fig.update_layout(
-                        title={'text': 'New Leads', 'font': {'size': 14, 'color': '#333333'}},
-                        height=max(280, len(df_compare) * 40),
-                        margin=dict(l=10, r=60, t=40, b=20),
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        xaxis={'gridcolor': '#F0F0F0'},
-                        yaxis={'gridcolor': '#F0F0F0'}
-                    )
+                    fig = create_hbar_chart(df_compare, 'New Leads', 'New Leads', '#5AC8FA', "{:.0f}",
+                                            limit_mode=bar_mode)
                     st.plotly_chart(fig, use_container_width=True)
 
                 with col2:
-                    df_sorted = df_compare.sort_values('OB Calls/Day', ascending=True)
-                    fig = go.Figure(go.Bar(
-                        x=df_sorted['OB Calls/Day'],
-                        y=df_sorted['Entity'],
-                        orientation='h',
-                        marker_color='#AF52DE',
-                        text=df_sorted['OB Calls/Day'].apply(lambda x: f"{x:.1f}"),
-                        textposition='outside',
-                        textfont={'size': 11, 'color': '#666666'}
-                    ))
-                    fig.update_layout(
-                        title={'text': 'OB Phone Calls/Day', 'font': {'size': 14, 'color': '#333333'}},
-                        height=max(280, len(df_compare) * 40),
-                        margin=dict(l=10, r=60, t=40, b=20),
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        xaxis={'gridcolor': '#F0F0F0'},
-                        yaxis={'gridcolor': '#F0F0F0'}
-                    )
+                    fig = create_hbar_chart(df_compare, 'OB Calls/Day', 'OB Phone Calls/Day', '#AF52DE', "{:.1f}",
+                                            limit_mode=bar_mode)
                     st.plotly_chart(fig, use_container_width=True)
 
                 # Row 4: Conversion rates heatmap
                 st.markdown(f"##### Conversion Rates by {compare_title}")
 
                 conv_cols = ['Lead to Member %', 'Appt Show %', 'Appt Close %']
-                df_heatmap = df_compare[['Entity'] + conv_cols].set_index('Entity')
+                df_heatmap = paginate_heatmap(df_compare[['Entity'] + conv_cols].set_index('Entity'),
+                                              key="ops_heatmap_page")
 
                 # Clean blue color scale for heatmap
-                fig = px.imshow(df_heatmap,
-                               labels=dict(x="Metric", y=compare_title, color="Rate %"),
-                               color_continuous_scale=[[0, '#E8F4FD'], [0.5, '#5AC8FA'], [1, '#0066CC']],
-                               aspect="auto",
-                               text_auto='.1f')
-                fig.update_layout(
-                    title={'text': f'Conversion Rate Heatmap', 'font': {'size': 14, 'color': '#333333'}},
-                    height=max(280, len(df_compare) * 35),
-                    margin=dict(l=10, r=20, t=40, b=20),
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font={'family': 'SF Pro Display, -apple-system, sans-serif'}
+                fig = create_heatmap_chart(
+                    df_heatmap, compare_title, "Rate %",
+                    [[0, '#E8F4FD'], [0.5, '#5AC8FA'], [1, '#0066CC']],
+                    'Conversion Rate Heatmap'
                 )
-                fig.update_traces(textfont={'size': 12, 'color': '#333333'})
                 st.plotly_chart(fig, use_container_width=True)
 
                 # Row 5: Grouped bar chart for conversion rates
-                df_melted = df_compare[['Entity'] + conv_cols].melt(
-                    id_vars=['Entity'], var_name='Metric', value_name='Percentage'
-                )
-
-                fig = px.bar(df_melted, x='Entity', y='Percentage', color='Metric',
-                            barmode='group',
-                            color_discrete_sequence=['#0066CC', '#00A3E0', '#5AC8FA'])
-                fig.update_layout(
-                    title={'text': 'Conversion Rates Comparison', 'font': {'size': 14, 'color': '#333333'}},
-                    height=380,
-                    xaxis_tickangle=-45,
-                    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1,
-                               bgcolor='rgba(0,0,0,0)', font={'size': 11}),
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    xaxis={'gridcolor': '#F0F0F0'},
-                    yaxis={'gridcolor': '#F0F0F0', 'ticksuffix': '%', 'title': 'Conversion Rate (%)'}
+                fig = create_grouped_bar_chart(
+                    df_compare, conv_cols, 'Metric', 'Percentage',
+                    ['#0066CC', '#00A3E0', '#5AC8FA'],
+                    yaxis={'ticksuffix': '%', 'title': 'Conversion Rate (%)'},
+                    title='Conversion Rates Comparison', height=380, limit_mode=bar_mode
                 )
                 st.plotly_chart(fig, use_container_width=True)
 
                 # Row 6: Scatter plot - Revenue vs Members
                 st.markdown(f"##### Revenue vs New Members Analysis")
-                fig = px.scatter(df_compare, x='New Members', y='Revenue',
-                               size='TAV', color='Lead to Member %',
-                               hover_name='Entity',
-                               color_continuous_scale=[[0, '#E8F4FD'], [0.5, '#5AC8FA'], [1, '#0066CC']],
-                               labels={'Lead to Member %': 'Lead→Member %'})
-                fig.update_layout(
-                    title={'text': 'Revenue vs New Members (bubble size = TAV)', 'font': {'size': 14, 'color': '#333333'}},
-                    height=420,
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    xaxis={'gridcolor': '#F0F0F0'},
-                    yaxis={'gridcolor': '#F0F0F0', 'tickprefix': '$', 'tickformat': ','}
+                fig = create_scatter_chart(
+                    df_compare, 'New Members', 'Revenue', 'TAV', 'Lead to Member %',
+                    [[0, '#E8F4FD'], [0.5, '#5AC8FA'], [1, '#0066CC']],
+                    'Revenue vs New Members (bubble size = TAV)',
+                    labels={'Lead to Member %': 'Lead→Member %'},
+                    yaxis={'tickprefix': '$', 'tickformat': ','}
                 )
-                fig.update_traces(marker={'line': {'width': 1, 'color': 'white'}})
                 st.plotly_chart(fig, use_container_width=True)
 
                 # Summary Table
@@ -1358,6 +1311,13 @@ def render_operational_dashboard(data, view_level, selected_territory, selected_
 
                 st.dataframe(df_display, use_container_width=True, hide_index=True)
 
+    profiling.lap("Trends")
+    # Trends from stored history
+    st.markdown("---")
+    render_trend_section(data, "operational", view_level, selected_territory, selected_region, selected_club,
+                         key="ops")
+
+    profiling.lap("Detailed table")
     # Detailed Data Table
     st.markdown("---")
     st.markdown("#### Detailed Metrics")
@@ -1401,6 +1361,7 @@ def render_operational_dashboard(data, view_level, selected_territory, selected_
     with col2:
         st.dataframe(df_table.iloc[len(df_table)//2:], use_container_width=True, hide_index=True)
 
+    profiling.lap("Drill-down")
     # Drill-down navigation
     st.markdown("---")
     if view_level == "Company":
@@ -1443,58 +1404,83 @@ def main():
     selected_sheet_id = source_info["id"]
     data_type = source_info["type"]
 
-    file_path = None
-    source_name = ""
+    # Time travel: render a stored snapshot instead of the live sheet
+    with profiling.section("Snapshot dates"):
+        try:
+            snapshot_dates = db.get_snapshot_dates(data_type)
+            stored_dates = list(snapshot_dates['record_date'].unique())
+        except HISTORY_ERRORS as e:
+            st.sidebar.warning(f"History database unavailable, showing live data only: {e}")
+            stored_dates = []
+    as_of = st.sidebar.selectbox(
+        "🕰️ View as of",
+        ["Live"] + stored_dates,
+        key="as_of_date"
+    )
 
-    # Fetch from Google Sheets
-    try:
-        with st.sidebar.status("Fetching live data...", expanded=False) as status:
-            file_path = fetch_google_sheet(selected_sheet_id)
-            status.update(label="✓ Connected to Google Sheet", state="complete")
+    if as_of != "Live":
+        stored = snapshot_dates[snapshot_dates['record_date'] == as_of]
+        selected_month = st.sidebar.selectbox("Select Month", list(stored['month_year']))
+        upload_id = int(stored.loc[stored['month_year'] == selected_month, 'upload_id'].iloc[0])
+        with profiling.section("Load stored snapshot"):
+            snapshot = load_stored_snapshot(as_of, selected_month, data_type, upload_id)
+        if snapshot is None:
+            st.error(f"No stored snapshot for {as_of}.")
+            return
+        data, update_time = snapshot
         source_name = selected_source
-    except Exception as e:
-        st.sidebar.error(f"Could not connect to Google Sheet.")
-        st.sidebar.markdown("**Troubleshooting:**")
-        st.sidebar.markdown("1. Open Google Sheet")
-        st.sidebar.markdown("2. Click Share → Anyone with link → Viewer")
-        st.error("Unable to connect to Google Sheet. Please check sharing settings.")
-        return
-
-    # File upload function kept for future use but hidden from UI
-    # def load_from_upload():
-    #     uploaded_file = st.sidebar.file_uploader("Upload Daily KPI Scorecard", type=['xlsx'])
-    #     if uploaded_file:
-    #         return uploaded_file, uploaded_file.name
-    #     return None, None
-
-    if file_path is None:
-        st.error("No data source available.")
-        return
-
-    st.sidebar.caption(f"🌐 {source_name}")
-
-    # Load available sheets
-    try:
-        xl = pd.ExcelFile(file_path)
-        month_sheets = [s for s in xl.sheet_names if s not in ['Tracker Directory', 'Sources']]
-        selected_month = st.sidebar.selectbox("Select Month", month_sheets)
-    except Exception as e:
-        st.error(f"Error loading file: {e}")
-        return
+        st.sidebar.caption(f"🗄️ {source_name} - stored snapshot, no live fetch")
+        st.sidebar.markdown("---")
+    else:
+        file_path = None
+        source_name = ""
 
-    st.sidebar.markdown("---")
+        # Fetch from Google Sheets
+        try:
+            with st.sidebar.status("Fetching live data...", expanded=False) as status:
+                with profiling.section("Fetch sheet"):
+                    file_path = fetch_google_sheet(selected_sheet_id)
+                status.update(label="✓ Connected to Google Sheet", state="complete")
+            source_name = selected_source
+        except Exception as e:
+            st.sidebar.error(f"Could not connect to Google Sheet.")
+            st.sidebar.markdown("**Troubleshooting:**")
+            st.sidebar.markdown("1. Open Google Sheet")
+            st.sidebar.markdown("2. Click Share → Anyone with link → Viewer")
+            st.error("Unable to connect to Google Sheet. Please check sharing settings.")
+            return
+
+        # File upload function kept for future use but hidden from UI
+        # def load_from_upload():
+        #     uploaded_file = st.sidebar.file_uploader("Upload Daily KPI Scorecard", type=['xlsx'])
+        #     if uploaded_file:
+        #         return uploaded_file, uploaded_file.name
+        #     return None, None
+
+        if file_path is None:
+            st.error("No data source available.")
+            return
+
+        st.sidebar.caption(f"🌐 {source_name}")
+
+        # Load available sheets
+        try:
+            with profiling.section("Open workbook"):
+                month_sheets = month_sheet_names(file_path)
+            selected_month = st.sidebar.selectbox("Select Month", month_sheets)
+        except Exception as e:
+            st.error(f"Error loading file: {e}")
+            return
 
-    # Load data with caching for better performance
-    @st.cache_data(ttl=300)  # Cache for 5 minutes
-    def load_cached_data(file_content, sheet_name, dtype):
-        return load_data(file_content, sheet_name, dtype)
+        st.sidebar.markdown("---")
 
-    # Load data
-    try:
-        data, update_time = load_data(file_path, selected_month, data_type)
-    except Exception as e:
-        st.error(f"Error parsing data: {e}")
-        return
+        # Load data (parsed once per distinct sheet content)
+        try:
+            with profiling.section("Parse sheet"):
+                data, update_time = load_snapshot(file_path.getvalue(), selected_month, data_type)
+        except Exception as e:
+            st.error(f"Error parsing data: {e}")
+            return
 
     st.sidebar.markdown("---")
 
@@ -1542,8 +1528,15 @@ def main():
     st.sidebar.markdown("---")
     st.sidebar.markdown(f"**Last Updated:** {update_time}")
 
-    # Database section - DISABLED FOR NOW (to implement later)
-    # Code preserved in database.py for future implementation
+    # Persist the snapshot to history in the background - never blocks the page.
+    # Dated by the tab's own update time, so browsing an older month tab
+    # re-saves that month's figures rather than writing them into today.
+    if as_of == "Live":
+        with profiling.section("Queue history write"):
+            record_date = sheet_record_date(selected_month, update_time)
+            db.enqueue_snapshot(source_name, selected_month, record_date, data, data_type,
+                                digest=get_snapshot_digest(source_name, selected_month, record_date, data, data_type))
+    st.sidebar.caption(f"🗄️ History: {db.writer_stats['written']} snapshots saved")
 
     st.sidebar.markdown("---")
 
@@ -1575,10 +1568,13 @@ def main():
     st.markdown("---")
 
     # Render appropriate dashboard based on data type
-    if data_type == "operational":
-        render_operational_dashboard(data, view_level, selected_territory, selected_region, selected_club)
-    else:
-        render_budget_dashboard(data, view_level, selected_territory, selected_region, selected_club)
+    with profiling.section("Dashboard"):
+        if data_type == "operational":
+            render_operational_dashboard(data, view_level, selected_territory, selected_region, selected_club)
+        else:
+            render_budget_dashboard(data, view_level, selected_territory, selected_region, selected_club)
 
 if __name__ == "__main__":
-    main()
+    # Opt-in timing of this rerun (BSI_PROFILE=1 or ?profile=1), see profiling.py
+    with profiling.rerun():
+        main()
@@ -0,0 +1,165 @@
+"""Columnar archive of the metric history for offline analysis
+
+Exports every metric table from bsi_kpi_data.db to zstd-compressed Parquet,
+one file per table and calendar month of record_date:
+
+    archive/<table>/<YYYY-MM>.parquet
+
+and loads them back through memory-mapped reads, so multi-year scans never
+materialise SQLite rows. Exports are incremental: a month is rewritten only
+when its row count or latest upload id changed since the last export. Months
+starting before the database.DAILY_RETENTION_DAYS cutoff are frozen once
+archived, because compaction thins them to month-end rows in SQLite.
+
+    python archive.py export [--dir archive] [--force]
+    python archive.py compact [--dir archive]   # export, then apply retention
+    python archive.py info [--dir archive]
+"""
+import argparse
+import os
+from datetime import date, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import database as db
+from metric_schema import LEVEL_NAME_COLUMNS, metric_registry
+
+ARCHIVE_DIR = os.path.join(os.path.dirname(__file__), 'archive')
+FINGERPRINT_KEY = b'bsi_fingerprint'
+
+def table_schema(level, data_type="operational"):
+    """Arrow schema of an archived metric table"""
+    fields = [
+        pa.field('upload_id', pa.int64()),
+        pa.field('record_date', pa.date32()),
+        pa.field('month_year', pa.string()),
+    ]
+    fields += [pa.field(column, pa.string()) for column in LEVEL_NAME_COLUMNS[level]]
+    fields += [pa.field(column, pa.float64()) for _, column in metric_registry(level, data_type)]
+    return pa.schema(fields)
+
+def _month_bounds(month):
+    """First day of `month` ('YYYY-MM') and of the month after it"""
+    start = pd.Period(month, freq='M')
+    return start.start_time.date().isoformat(), (start + 1).start_time.date().isoformat()
+
+def _months(conn, table):
+    """Calendar months of record_date present in a table"""
+    rows = conn.execute(f'''
+        SELECT DISTINCT substr(record_date, 1, 7) FROM {table}
+        WHERE record_date IS NOT NULL ORDER BY 1
+    ''').fetchall()
+    return [row[0] for row in rows]
+
+def _fingerprint(conn, table, month):
+    """Row count and latest upload id of a month; changes whenever the month is re-ingested"""
+    start, end = _month_bounds(month)
+    count, latest_upload = conn.execute(f'''
+        SELECT COUNT(*), MAX(upload_id) FROM {table}
+        WHERE record_date >= ? AND record_date < ?
+    ''', (start, end)).fetchone()
+    return f'{count}:{latest_upload}'.encode()
+
+def _archived_fingerprint(path):
+    """Fingerprint stored in an exported file, or None if there is no readable file"""
+    try:
+        metadata = pq.read_schema(path).metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    return metadata.get(FINGERPRINT_KEY)
+
+def _export_month(conn, level, data_type, month, path, fingerprint, compression):
+    """Write one table-month to Parquet through a temporary file"""
+    schema = table_schema(level, data_type)
+    start, end = _month_bounds(month)
+    rows = conn.execute(f'''
+        SELECT {', '.join(schema.names)} FROM {db.metrics_table(level, data_type)}
+        WHERE record_date >= ? AND record_date < ?
+        ORDER BY record_date
+    ''', (start, end)).fetchall()
+    columns = list(zip(*rows)) if rows else [[] for _ in schema.names]
+    arrays = [pa.array(column, type=pa.string()).cast(field.type) if field.type == pa.date32()
+              else pa.array(column, type=field.type)
+              for column, field in zip(columns, schema)]
+    table = pa.Table.from_arrays(arrays, schema=schema.with_metadata({FINGERPRINT_KEY: fingerprint}))
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    pq.write_table(table, tmp_path, compression=compression)
+    os.replace(tmp_path, path)
+    return len(rows)
+
+def export_archive(archive_dir=ARCHIVE_DIR, force=False, compression='zstd'):
+    """Export every metric table to monthly Parquet files, skipping unchanged months
+
+    Returns a list of (table, month, rows) for the files written. `force`
+    rewrites every month, including frozen ones.
+    """
+    retention_cutoff = (date.today() - timedelta(days=db.DAILY_RETENTION_DAYS)).isoformat()
+    written = []
+    with db.read_connection() as conn:
+        for data_type in db.DATA_TYPES:
+            for level in db.METRIC_LEVELS:
+                table = db.metrics_table(level, data_type)
+                for month in _months(conn, table):
+                    path = os.path.join(archive_dir, table, f'{month}.parquet')
+                    if not force and _month_bounds(month)[0] < retention_cutoff and os.path.exists(path):
+                        continue
+                    fingerprint = _fingerprint(conn, table, month)
+                    if not force and _archived_fingerprint(path) == fingerprint:
+                        continue
+                    rows = _export_month(conn, level, data_type, month, path, fingerprint, compression)
+                    written.append((table, month, rows))
+    return written
+
+def archived_months(level, data_type="operational", archive_dir=ARCHIVE_DIR):
+    """Months exported for a level, oldest first"""
+    table_dir = os.path.join(archive_dir, db.metrics_table(level, data_type))
+    if not os.path.isdir(table_dir):
+        return []
+    return sorted(name[:-len('.parquet')] for name in os.listdir(table_dir) if name.endswith('.parquet'))
+
+def load_archive(level, data_type="operational", months=None, columns=None, archive_dir=ARCHIVE_DIR):
+    """Load archived history for a level as a DataFrame
+
+    `months` limits the scan to some 'YYYY-MM' partitions and `columns` to
+    some columns, so only those column chunks are read. Files are opened
+    memory-mapped.
+    """
+    months = archived_months(level, data_type, archive_dir) if months is None else months
+    table_dir = os.path.join(archive_dir, db.metrics_table(level, data_type))
+    tables = [pq.read_table(os.path.join(table_dir, f'{month}.parquet'), columns=columns, memory_map=True)
+              for month in months]
+    if not tables:
+        schema = table_schema(level, data_type)
+        return schema.empty_table().select(columns or schema.names).to_pandas()
+    return pa.concat_tables(tables).to_pandas()
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or inspect the Parquet archive of KPI history")
+    parser.add_argument('command', choices=['export', 'compact', 'info'])
+    parser.add_argument('--dir', default=ARCHIVE_DIR, help="archive directory (default: %(default)s)")
+    parser.add_argument('--force', action='store_true', help="rewrite every month, changed or frozen")
+    args = parser.parse_args()
+
+    if args.command in ('export', 'compact'):
+        written = export_archive(args.dir, force=args.force)
+        for table, month, rows in written:
+            print(f"{table} {month}: {rows} rows")
+        print(f"{len(written)} file(s) written to {args.dir}")
+    if args.command == 'compact':
+        # Daily rows are archived above before retention thins them in SQLite
+        result = db.compact_database()
+        print(f"{result['rows_deleted']} daily rows, {result['intraday_deleted']} intraday snapshots and "
+              f"{result['uploads_deleted']} uploads removed, {result['freed_pages']} pages freed")
+    elif args.command == 'info':
+        for data_type in db.DATA_TYPES:
+            for level in db.METRIC_LEVELS:
+                months = archived_months(level, data_type, args.dir)
+                if months:
+                    print(f"{db.metrics_table(level, data_type)}: {len(months)} months ({months[0]} .. {months[-1]})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Seed the KPI history database from every month tab of one or more workbooks
+
+Month sheets are parsed in a process pool; the parsed snapshots come back to
+this process, which is the only writer and ingests each one in a single
+transaction.
+
+    python backfill.py Scorecard_2024.xlsx Scorecard_2025.xlsx
+    python backfill.py --type budget Budget_2025.xlsx
+    python backfill.py --source "Daily KPI Scorecard" --source "Budget Tracker"
+
+--source fetches a DATA_SOURCES workbook through sheets.fetch_google_sheet;
+set BSI_SHEET_BASE_URL to read from a local stand-in instead of Google.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
+
+import database as db
+from sheets import DATA_SOURCES, fetch_google_sheet, load_data, month_sheet_names, sheet_record_date
+
+def parse_sheet(file_content, sheet_name, data_type):
+    """Worker: parse one month tab, returning (sheet_name, data, record_date, seconds)"""
+    started = time.perf_counter()
+    data, update_time = load_data(BytesIO(file_content), sheet_name, data_type)
+    return sheet_name, data, sheet_record_date(sheet_name, update_time), time.perf_counter() - started
+
+def collect_workbooks(args):
+    """(label, file bytes, data_type) for every workbook named on the command line"""
+    workbooks = []
+    for path in args.files:
+        with open(path, 'rb') as f:
+            workbooks.append((os.path.basename(path), f.read(), args.type))
+    for source in args.source:
+        info = DATA_SOURCES[source]
+        workbooks.append((source, fetch_google_sheet(info['id']).getvalue(), info['type']))
+    return workbooks
+
+def backfill(workbooks, workers=None):
+    """Parse every month tab of `workbooks` in parallel and ingest them; returns (sheets, rows)"""
+    tasks = [(label, content, sheet_name, data_type)
+             for label, content, data_type in workbooks
+             for sheet_name in month_sheet_names(BytesIO(content))]
+    total_rows = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(parse_sheet, content, sheet_name, data_type): (label, data_type)
+                   for label, content, sheet_name, data_type in tasks}
+        for done, future in enumerate(as_completed(futures), start=1):
+            label, data_type = futures[future]
+            sheet_name, data, record_date, parse_seconds = future.result()
+            write_started = time.perf_counter()
+            db.ingest_snapshot(label, sheet_name, record_date, data, data_type, intraday=False)
+            rows = ((1 if data.get('company') else 0) + len(data['territories'])
+                    + len(data['regions']) + len(data['clubs']))
+            total_rows += rows
+            print(f"[{done}/{len(tasks)}] {label} / {sheet_name} ({record_date}): {rows} rows, "
+                  f"parsed in {parse_seconds:.2f}s, written in {time.perf_counter() - write_started:.2f}s")
+    elapsed = time.perf_counter() - started
+    print(f"Backfilled {len(tasks)} sheets, {total_rows} rows in {elapsed:.1f}s "
+          f"({len(tasks) / elapsed:.1f} sheets/s, {total_rows / elapsed:,.0f} rows/s)")
+    return len(tasks), total_rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill KPI history from every month tab of xlsx workbooks")
+    parser.add_argument('files', nargs='*', help="xlsx workbooks to ingest")
+    parser.add_argument('--type', choices=db.DATA_TYPES, default="operational",
+                        help="sheet layout of the files (default: %(default)s)")
+    parser.add_argument('--source', action='append', default=[], choices=list(DATA_SOURCES),
+                        help="fetch a configured data source instead of a file (repeatable)")
+    parser.add_argument('--workers', type=int, default=None, help="parser processes (default: CPU count)")
+    args = parser.parse_args()
+    if not args.files and not args.source:
+        parser.error("give at least one xlsx file or --source")
+
+    backfill(collect_workbooks(args), args.workers)
+
+if __name__ == '__main__':
+    main()
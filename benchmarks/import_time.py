@@ -0,0 +1,80 @@
+"""Startup import cost of the dashboard, measured with `python -X importtime`
+
+Imports app.py in a fresh interpreter several times and keeps the fastest
+run. Streamlit and pandas are unavoidable, so the regression check is on
+what app.py adds on top of them; it also fails if a module that should be
+deferred to first use (see DEFERRED_MODULES) is imported at startup.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --runs 10 --max-overhead-ms 300 --top 15
+
+Exits with status 1 when a check fails.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Framework imports every Streamlit page pays for
+BASELINE_MODULES = ('streamlit', 'pandas')
+
+# Imported inside the functions that need them; must not load at startup
+DEFERRED_MODULES = ('plotly.express', 'requests', 'openpyxl')
+
+MAX_OVERHEAD_MS = 175
+
+def import_times(module='app'):
+    """{module: (self_us, cumulative_us, depth)} for one fresh `import module`"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=REPO_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        # The first import of a module is the one that paid for it
+        times.setdefault(name.strip(), (int(self_us), int(cumulative_us), depth))
+    return times
+
+def measure(runs=5, module='app'):
+    """Fastest of `runs` fresh imports, as import_times() returns it"""
+    samples = [import_times(module) for _ in range(runs)]
+    return min(samples, key=lambda times: times[module][1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure and check the dashboard's startup import time")
+    parser.add_argument('--runs', type=int, default=5, help="fresh interpreters to try (default: %(default)s)")
+    parser.add_argument('--max-overhead-ms', type=float, default=MAX_OVERHEAD_MS,
+                        help="fail if app.py adds more than this over streamlit and pandas (default: %(default)s)")
+    parser.add_argument('--top', type=int, default=10, help="heaviest direct imports to list (default: %(default)s)")
+    args = parser.parse_args()
+
+    times = measure(args.runs)
+    total_ms = times['app'][1] / 1000
+    baseline_ms = sum(times[name][1] for name in BASELINE_MODULES if name in times) / 1000
+    overhead_ms = total_ms - baseline_ms
+
+    print(f"import app: {total_ms:.0f} ms (best of {args.runs})")
+    print(f"  {' + '.join(BASELINE_MODULES)}: {baseline_ms:.0f} ms")
+    print(f"  app.py overhead: {overhead_ms:.0f} ms (limit {args.max_overhead_ms:.0f} ms)")
+    direct = sorted(((cumulative, name) for name, (_, cumulative, depth) in times.items() if depth == 1),
+                    reverse=True)
+    print("Heaviest direct imports:")
+    for cumulative, name in direct[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failures = []
+    if overhead_ms > args.max_overhead_ms:
+        failures.append(f"app.py overhead {overhead_ms:.0f} ms exceeds {args.max_overhead_ms:.0f} ms")
+    failures += [f"{name} is imported at startup" for name in DEFERRED_MODULES if name in times]
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
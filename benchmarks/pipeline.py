@@ -0,0 +1,238 @@
+"""End-to-end benchmarks of the dashboard pipeline on synthetic workbooks
+
+For every workbook size (a multiple of today's club count, built by
+synthetic_workbook.py) and sheet type, times each stage of a page load:
+
+    fetch           download the workbook from a local stand-in for Google Sheets
+    open            open the workbook and list its month tabs
+    parse           sheets.load_data() of the newest month tab
+    compare         the comparison frame over every club
+    ingest          database.ingest_snapshot() of the parsed month
+    query           trend history and a stored snapshot, query cache cleared
+    render/<view>   the dashboard for the Company, Territory, Region and Club
+                    views, building and serialising every figure (Streamlit
+                    bare mode)
+
+Each stage runs once under tracemalloc for its peak Python heap, then
+--repeat more times untraced; the fastest of those is its time (as timeit
+reports), so render and query times are those of warm reruns. Database stages use a temporary file
+seeded with the workbook's older month tabs, never bsi_kpi_data.db.
+
+Results are compared with a JSON baseline, and the run exits with status 1
+when a stage is slower or peaks higher than its baseline by more than
+--tolerance. Baselines are machine-specific: record one with --save on the
+machine that runs the comparison.
+
+    python benchmarks/pipeline.py --save
+    python benchmarks/pipeline.py
+    python benchmarks/pipeline.py --scales 1 10 100 --repeat 5 --tolerance 0.3
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.py runs its page setup on import and its dashboards call Streamlit outside
+# `streamlit run` (bare mode), which only logs warnings
+os.environ.setdefault('STREAMLIT_LOGGER_LEVEL', 'error')
+
+# Imported lazily by the app; loaded here so no stage carries the one-time cost
+import plotly.express
+import requests
+
+import app
+import database as db
+import sheets
+from metric_schema import TREND_METRICS
+from synthetic_workbook import BASE_CLUB_COUNT, build_workbook
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_SCALES = (1, 10)
+
+# Differences smaller than these are noise whatever the ratio
+MIN_SECONDS_DELTA = 0.005
+MIN_PEAK_MB_DELTA = 1.0
+
+@contextmanager
+def sheet_server(workbooks):
+    """Serve {sheet_id: xlsx bytes} at the Google export URLs and point sheets.py at it"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            content = workbooks.get(self.path.lstrip('/').split('/')[0])
+            if content is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, name='bsi-sheet-server', daemon=True).start()
+    base_url = sheets.SHEET_BASE_URL
+    sheets.SHEET_BASE_URL = f'http://127.0.0.1:{server.server_port}'
+    try:
+        yield
+    finally:
+        sheets.SHEET_BASE_URL = base_url
+        server.shutdown()
+        server.server_close()
+
+@contextmanager
+def temporary_database():
+    """Point database.py at an empty file for the duration"""
+    path = db.DATABASE_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        db.close_connections()
+        db.DATABASE_PATH = os.path.join(tmp, 'benchmark.db')
+        db.clear_history_cache()
+        try:
+            yield
+        finally:
+            db.close_connections()
+            db.DATABASE_PATH = path
+            db.clear_history_cache()
+
+def measure(func, repeat):
+    """Run func once traced and `repeat` times timed; returns (result, {'seconds', 'peak_mb'})"""
+    tracemalloc.start()
+    try:
+        result = func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - started)
+    return result, {'seconds': round(min(times), 5), 'peak_mb': round(peak / 2**20, 2)}
+
+def view_selections(data):
+    """(view_level, (territory, region, club)) for each view, following the first club"""
+    club, metrics = next(iter(data['clubs'].items()))
+    territory, region = metrics.get('Territory'), metrics.get('Region')
+    return [("Company", (None, None, None)), ("Territory", (territory, None, None)),
+            ("Region", (territory, region, None)), ("Club", (territory, region, club))]
+
+def run_pipeline(sheet_id, data_type, repeat):
+    """{stage: measurement} for one workbook served under sheet_id"""
+    results = {}
+
+    def record(stage, func):
+        value, results[stage] = measure(func, repeat)
+        return value
+
+    content = record('fetch', lambda: sheets.fetch_google_sheet(sheet_id).getvalue())
+    month_tabs = record('open', lambda: sheets.month_sheet_names(BytesIO(content)))
+    data, update_time = record('parse', lambda: sheets.load_data(BytesIO(content), month_tabs[0], data_type))
+    comparison_frame = (app.budget_comparison_frame if data_type == "budget"
+                        else app.operational_comparison_frame)
+    record('compare', lambda: comparison_frame(data['clubs']))
+
+    with temporary_database():
+        # Older month tabs give the trend charts and queries some history (untimed)
+        for sheet_name in month_tabs[1:]:
+            older, older_update = sheets.load_data(BytesIO(content), sheet_name, data_type)
+            db.ingest_snapshot(sheet_id, sheet_name, sheets.sheet_record_date(sheet_name, older_update),
+                               older, data_type, intraday=False)
+
+        record_date = sheets.sheet_record_date(month_tabs[0], update_time)
+        record('ingest', lambda: db.ingest_snapshot(sheet_id, month_tabs[0], record_date, data, data_type))
+
+        def query():
+            db.clear_history_cache()
+            return (db.get_history('club', None, TREND_METRICS[data_type], data_type=data_type),
+                    db.load_snapshot_from_db(record_date, month_tabs[0], data_type))
+        record('query', query)
+
+        render = app.render_budget_dashboard if data_type == "budget" else app.render_operational_dashboard
+        for view_level, selection in view_selections(data):
+            record(f'render/{view_level.lower()}', lambda: render(data, view_level, *selection))
+    return results
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Print results next to the baseline; returns the regressions found"""
+    regressions = []
+    print(f"{'stage':<34} {'seconds':>9} {'baseline':>9} {'change':>8} {'peak MB':>9} {'baseline':>9}")
+    for key, current in results.items():
+        base = baseline.get(key)
+        if base is None:
+            print(f"{key:<34} {current['seconds']:>9.4f} {'-':>9} {'new':>8} {current['peak_mb']:>9.2f} {'-':>9}")
+            continue
+        change = current['seconds'] / base['seconds'] - 1 if base['seconds'] else 0.0
+        print(f"{key:<34} {current['seconds']:>9.4f} {base['seconds']:>9.4f} {change:>+8.0%} "
+              f"{current['peak_mb']:>9.2f} {base['peak_mb']:>9.2f}")
+        if (current['seconds'] > base['seconds'] * (1 + tolerance)
+                and current['seconds'] - base['seconds'] > MIN_SECONDS_DELTA):
+            regressions.append(f"{key}: {current['seconds']:.4f}s vs {base['seconds']:.4f}s")
+        if (current['peak_mb'] > base['peak_mb'] * (1 + tolerance)
+                and current['peak_mb'] - base['peak_mb'] > MIN_PEAK_MB_DELTA):
+            regressions.append(f"{key}: peak {current['peak_mb']:.2f} MB vs {base['peak_mb']:.2f} MB")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard pipeline against a JSON baseline")
+    parser.add_argument('--scales', type=float, nargs='+', default=list(DEFAULT_SCALES),
+                        help=f"workbook sizes as multiples of today's {BASE_CLUB_COUNT} clubs (default: %(default)s)")
+    parser.add_argument('--types', nargs='+', choices=db.DATA_TYPES, default=list(db.DATA_TYPES),
+                        help="sheet types to run (default: both)")
+    parser.add_argument('--months', type=int, default=3, help="month tabs per workbook (default: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per stage (default: %(default)s)")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed slowdown or memory growth, as a fraction (default: %(default)s)")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="baseline JSON file (default: %(default)s)")
+    parser.add_argument('--save', action='store_true', help="write the results as the new baseline")
+    args = parser.parse_args()
+
+    workbooks = {}
+    for scale in args.scales:
+        for data_type in args.types:
+            workbooks[f'{data_type}-{scale:g}x'] = build_workbook(
+                data_type, clubs=round(BASE_CLUB_COUNT * scale), months=args.months, end='2025-06')
+
+    results = {}
+    with sheet_server(workbooks):
+        for sheet_id in workbooks:
+            data_type, scale = sheet_id.split('-')
+            started = time.perf_counter()
+            for stage, measurement in run_pipeline(sheet_id, data_type, args.repeat).items():
+                results[f'{scale}/{data_type}/{stage}'] = measurement
+            print(f"{sheet_id}: {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump({'recorded_at': datetime.now().isoformat(timespec='seconds'),
+                       'python': platform.python_version(), 'machine': platform.platform(),
+                       'repeat': args.repeat, 'months': args.months, 'results': results}, f, indent=2)
+        print(f"Baseline of {len(results)} stages written to {args.baseline}")
+        return
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    else:
+        print(f"No baseline at {args.baseline}; record one with --save")
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
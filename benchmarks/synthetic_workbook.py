@@ -0,0 +1,219 @@
+"""Synthetic KPI workbooks in the exact layout sheets.load_data() parses
+
+Each month tab has the update timestamp in A1, the company in row 2,
+territories in rows 5-7, regions in rows 10-21 and, from row 23, one section
+per region: a header row repeating the column labels, whose second cell
+('Member Net' or 'Member Net Real') marks the section, then its clubs. The
+parsers read territories and regions from those fixed rows, so a workbook
+holds at most 3 territories and 12 regions; clubs and month tabs scale
+freely. Regions are drawn from
+sheets.HIERARCHY so clubs resolve to their territory, and the company,
+territory and region rows are aggregated from the clubs.
+
+    python benchmarks/synthetic_workbook.py scorecard.xlsx --scale 10 --months 24
+    python benchmarks/synthetic_workbook.py budget.xlsx --type budget --clubs 9600
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metric_schema import COL_MAPS
+from sheets import HIERARCHY, NON_MONTH_SHEETS
+
+# Row layout expected by sheets.load_operational_data / load_budget_data
+COMPANY_ROW = 2
+TERRITORY_ROWS = range(5, 8)
+REGION_ROWS = range(10, 22)
+CLUB_START_ROW = 23
+MAX_TERRITORIES = len(TERRITORY_ROWS)
+MAX_REGIONS = len(REGION_ROWS)
+
+BASE_CLUB_COUNT = sum(len(clubs) for regions in HIERARCHY.values() for clubs in regions.values())
+
+def synthetic_hierarchy(territories=MAX_TERRITORIES, regions=MAX_REGIONS, clubs=None):
+    """{territory: {region: [club names]}} drawn from sheets.HIERARCHY
+
+    Regions are taken round-robin across the first `territories` so each one
+    keeps at least one. `clubs` (default: as many as the real regions have)
+    are spread over the regions in proportion to their real size; names
+    repeat with a ' #n' suffix once a region's real club names run out.
+    """
+    picked = list(HIERARCHY.items())[:territories]
+    available = sum(len(region_map) for _, region_map in picked)
+    if not 1 <= territories <= MAX_TERRITORIES:
+        raise ValueError(f"territories must be between 1 and {MAX_TERRITORIES}")
+    if not territories <= regions <= min(available, MAX_REGIONS):
+        raise ValueError(f"regions must be between {territories} and {min(available, MAX_REGIONS)} "
+                         f"for {territories} territories")
+
+    by_depth = sorted(((depth, t_idx, territory, region)
+                       for t_idx, (territory, region_map) in enumerate(picked)
+                       for depth, region in enumerate(region_map)))[:regions]
+    chosen = {(territory, region) for _, _, territory, region in by_depth}
+    pool = [(territory, region, HIERARCHY[territory][region])
+            for territory, region_map in picked for region in region_map
+            if (territory, region) in chosen]
+
+    real_total = sum(len(names) for _, _, names in pool)
+    clubs = real_total if clubs is None else clubs
+    if clubs < regions:
+        raise ValueError("need at least one club per region")
+    shares = np.array([len(names) for _, _, names in pool]) * clubs / real_total
+    counts = np.maximum(np.floor(shares).astype(int), 1)
+    # Hand out what flooring left over to the largest remainders
+    for idx in np.argsort(counts - shares)[:max(clubs - counts.sum(), 0)]:
+        counts[idx] += 1
+    while counts.sum() > clubs:
+        counts[np.argmax(counts)] -= 1
+
+    hierarchy = {}
+    for (territory, region, names), count in zip(pool, counts):
+        hierarchy.setdefault(territory, {})[region] = [
+            names[k % len(names)] if k < len(names) else f"{names[k % len(names)]} #{k // len(names) + 1}"
+            for k in range(count)
+        ]
+    return hierarchy
+
+def _metric_kind(label):
+    """How a metric is generated and rolled up: 'ratio', 'average', 'net', 'amount' or 'count'"""
+    if '%' in label or label.endswith('to Budget'):
+        return 'ratio'
+    if label.startswith('Avg') or label.endswith('/Day'):
+        return 'average'
+    if label.startswith('Member Net'):
+        return 'net'
+    if any(word in label for word in ('Revenue', 'Downpayment', 'Draft', 'TAV', 'Tax', 'Amount', 'Deal')):
+        return 'amount'
+    return 'count'
+
+def _club_frame(hierarchy, data_type, rng):
+    """One row per club with Territory, Region and every metric of the sheet type"""
+    rows = [(territory, region, club)
+            for territory, region_map in hierarchy.items()
+            for region, clubs in region_map.items() for club in clubs]
+    frame = pd.DataFrame(rows, columns=['Territory', 'Region', 'Entity'])
+    n = len(frame)
+    for label in list(COL_MAPS[data_type].values())[1:]:
+        kind = _metric_kind(label)
+        if label == 'Locations':
+            values = np.full(n, np.nan)
+        elif kind == 'ratio':
+            low, high = (0.6, 1.3) if 'Budget' in label else (0.05, 0.95)
+            values = rng.uniform(low, high, n).round(3)
+        elif kind == 'average':
+            values = rng.uniform(1, 50, n).round(1)
+        elif kind == 'net':
+            values = rng.integers(-20, 60, n).astype(float)
+        elif kind == 'amount':
+            values = rng.uniform(1_000, 100_000, n).round(2)
+        else:
+            values = rng.integers(0, 300, n).astype(float)
+        frame[label] = values
+    return frame
+
+def _aggregate(clubs, data_type, by=None):
+    """Roll clubs up to one row per `by` value (or one company row): sums, or means for ratios"""
+    labels = list(COL_MAPS[data_type].values())[1:]
+    how = {label: 'mean' if _metric_kind(label) in ('ratio', 'average') else 'sum' for label in labels}
+    how['Locations'] = 'size'
+    if by is None:
+        return pd.DataFrame([{'Entity': 'Company',
+                              **{label: len(clubs) if func == 'size' else clubs[label].agg(func)
+                                 for label, func in how.items() if label in clubs}}])
+    grouped = clubs.groupby(by, sort=False)
+    frame = grouped.agg({label: func for label, func in how.items() if func != 'size' and label in clubs})
+    if 'Locations' in clubs:
+        frame['Locations'] = grouped.size()
+    return frame.reset_index().rename(columns={by: 'Entity'})
+
+def _sheet_row(record, labels):
+    """Cells of one entity row in sheet column order, blanks as None"""
+    return [record['Entity']] + [None if pd.isna(record.get(label)) else record[label] for label in labels]
+
+def month_names(months, end=None):
+    """Names of `months` month tabs ending with `end` (default: this month), newest first"""
+    end = pd.Period(end or datetime.now(), freq='M')
+    return [(end - k).strftime('%B %Y') for k in range(months)]
+
+def _write_month(ws, hierarchy, data_type, updated, rng):
+    """Append one month tab in the parsed layout"""
+    labels = list(COL_MAPS[data_type].values())[1:]
+    clubs = _club_frame(hierarchy, data_type, rng)
+    company = _aggregate(clubs, data_type)
+    territories = _aggregate(clubs, data_type, 'Territory').to_dict('records')
+    regions = _aggregate(clubs, data_type, 'Region').to_dict('records')
+
+    rows = {0: [updated], COMPANY_ROW: _sheet_row(company.iloc[0], labels)}
+    rows.update({row: _sheet_row(record, labels) for row, record in zip(TERRITORY_ROWS, territories)})
+    rows.update({row: _sheet_row(record, labels) for row, record in zip(REGION_ROWS, regions)})
+    for row in range(CLUB_START_ROW):
+        ws.append(rows.get(row, []))
+
+    for region, section in clubs.groupby('Region', sort=False):
+        ws.append([region] + labels)
+        for record in section.to_dict('records'):
+            ws.append(_sheet_row(record, labels))
+        ws.append([])
+
+def build_workbook(data_type="operational", territories=MAX_TERRITORIES, regions=MAX_REGIONS,
+                   clubs=None, months=12, end=None, seed=0):
+    """xlsx bytes with `months` month tabs (newest first) plus the non-month tabs
+
+    Each tab's A1 holds its update time: now for the current month, the last
+    evening of the month otherwise, so sheets.sheet_record_date() dates
+    every tab. The same `seed` always gives the same workbook.
+    """
+    hierarchy = synthetic_hierarchy(territories, regions, clubs)
+    rng = np.random.default_rng(seed)
+    now = datetime.now().replace(microsecond=0)
+    wb = Workbook(write_only=True)
+    for name in month_names(months, end):
+        month_end = (pd.Period(name, freq='M').end_time.normalize() + pd.Timedelta(hours=23)).to_pydatetime()
+        _write_month(wb.create_sheet(name), hierarchy, data_type, min(month_end, now), rng)
+    for name in NON_MONTH_SHEETS:
+        wb.create_sheet(name).append([name])
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic KPI workbook for scale and performance tests")
+    parser.add_argument('output', help="xlsx file to write")
+    parser.add_argument('--type', choices=list(COL_MAPS), default="operational",
+                        help="sheet layout (default: %(default)s)")
+    parser.add_argument('--territories', type=int, default=MAX_TERRITORIES,
+                        help="territories, at most %(default)s")
+    parser.add_argument('--regions', type=int, default=MAX_REGIONS, help="regions, at most %(default)s")
+    clubs = parser.add_mutually_exclusive_group()
+    clubs.add_argument('--clubs', type=int, help="total clubs (default: the real count for the regions)")
+    clubs.add_argument('--scale', type=float,
+                       help=f"clubs as a multiple of today's {BASE_CLUB_COUNT} (e.g. 10 or 100)")
+    parser.add_argument('--months', type=int, default=12, help="month tabs (default: %(default)s)")
+    parser.add_argument('--end', help="newest month, e.g. 2025-06 (default: this month)")
+    parser.add_argument('--seed', type=int, default=0, help="random seed (default: %(default)s)")
+    args = parser.parse_args()
+
+    club_count = round(BASE_CLUB_COUNT * args.scale) if args.scale else args.clubs
+    try:
+        content = build_workbook(args.type, args.territories, args.regions, club_count,
+                                 args.months, args.end, args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+    with open(args.output, 'wb') as f:
+        f.write(content)
+    hierarchy = synthetic_hierarchy(args.territories, args.regions, club_count)
+    total_clubs = sum(len(clubs) for region_map in hierarchy.values() for clubs in region_map.values())
+    print(f"Wrote {args.output}: {args.months} {args.type} month tabs, {len(hierarchy)} territories, "
+          f"{sum(len(region_map) for region_map in hierarchy.values())} regions, {total_clubs} clubs "
+          f"({len(content) / 1e6:.1f} MB)")
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,283 @@
 import sqlite3
 import pandas as pd
-from datetime import datetime
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from collections import OrderedDict
+from contextlib import contextmanager
+import atexit
+import functools
+import hashlib
 import os
+import pathlib
+import pickle
+import queue
+import threading
+import time
+import zlib
+
+from metric_schema import LEVEL_NAME_COLUMNS, TREND_METRICS, metric_registry
 
 DATABASE_PATH = os.path.join(os.path.dirname(__file__), 'bsi_kpi_data.db')
 
-def get_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DATABASE_PATH)
+# Applied to every pooled connection. WAL lets dashboard readers run while the
+# background writer commits; NORMAL sync is durable across app crashes in WAL mode.
+CONNECTION_PRAGMAS = (
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA cache_size = -16000',     # 16 MB page cache per connection
+    'PRAGMA mmap_size = 268435456',   # 256 MB of memory-mapped reads
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA busy_timeout = 5000',
+)
+
+# Dashboard reads borrow from a small shared pool of read-only connections:
+# Streamlit runs every rerun on a new thread, so per-thread connections would
+# never be reused. Writes go through one connection per writing thread (the
+# background writer, CLI scripts).
+READ_POOL_SIZE = 4
+
+_local = threading.local()
+_read_pool_lock = threading.Lock()
+_read_pools = {}   # DATABASE_PATH -> idle read-only connections
+
+def _open_connection(readonly=False):
+    """Open a new configured connection (read-only connections cannot write)"""
+    if readonly:
+        # Pooled read connections move between threads, one borrower at a time
+        conn = sqlite3.connect(pathlib.Path(DATABASE_PATH).resolve().as_uri() + '?mode=ro', uri=True,
+                               check_same_thread=False)
+    else:
+        conn = sqlite3.connect(DATABASE_PATH)
+        # Only takes effect on a new file; compact_database() converts older ones
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('PRAGMA journal_mode = WAL')
     conn.row_factory = sqlite3.Row
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
     return conn
 
-def init_database():
-    """Initialize the database with required tables"""
+def get_connection():
+    """Get this thread's pooled write connection
+
+    Connections are opened once per thread and reused, so callers must not
+    close them. Reads should use read_connection() instead. The first call
+    in a process creates or upgrades the schema (see ensure_schema).
+    """
+    ensure_schema()
+    return _pooled_connection()
+
+def _pooled_connection():
+    """This thread's write connection, opened on first use, without the schema check"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = _open_connection()
+        _local.conn = conn
+    return conn
+
+@contextmanager
+def read_connection():
+    """Borrow a read-only connection from the shared pool for the duration of the block
+
+    The connection goes back to the pool afterwards (at most READ_POOL_SIZE
+    are kept idle), so callers must not close it or use it after the block.
+    """
+    ensure_schema()
+    path = DATABASE_PATH
+    with _read_pool_lock:
+        idle = _read_pools.get(path)
+        conn = idle.pop() if idle else None
+    if conn is None:
+        conn = _open_connection(readonly=True)
+    try:
+        yield conn
+    finally:
+        with _read_pool_lock:
+            idle = _read_pools.setdefault(path, [])
+            if len(idle) < READ_POOL_SIZE:
+                idle.append(conn)
+                conn = None
+        if conn is not None:
+            conn.close()
+
+def close_connections():
+    """Close this thread's write connection and every idle pooled read connection"""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+    with _read_pool_lock:
+        idle = [conn for pool in _read_pools.values() for conn in pool]
+        _read_pools.clear()
+    for conn in idle:
+        conn.close()
+
+METRIC_LEVELS = ('company', 'territory', 'region', 'club')
+DATA_TYPES = ('operational', 'budget')
+
+def metrics_table(level, data_type="operational"):
+    """Name of the metric table for a hierarchy level and sheet type"""
+    if data_type == "budget":
+        return f'{level}_budget_metrics'
+    return f'{level}_metrics'
+
+def metric_table_key(level):
+    """Natural key of a level's metric table
+
+    month_year is part of the key because the same day can be ingested from
+    more than one month's sheet.
+    """
+    return LEVEL_NAME_COLUMNS[level][-1:] + ('record_date', 'month_year')
+
+def _id_columns(level):
+    """Columns that identify a metric row, ahead of the metric columns"""
+    return ('upload_id', 'record_date', 'month_year') + LEVEL_NAME_COLUMNS[level]
+
+def create_metrics_table_sql(level, data_type="operational"):
+    """CREATE TABLE statement for a level, generated from the metric registry"""
+    column_defs = [f'{column} TEXT' for column in LEVEL_NAME_COLUMNS[level]]
+    column_defs += [f'{column} REAL' for _, column in metric_registry(level, data_type)]
+    columns = ''.join(f'            {definition},\n' for definition in column_defs)
+    return f'''
+        CREATE TABLE IF NOT EXISTS {metrics_table(level, data_type)} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            upload_id INTEGER,
+            record_date DATE,
+            month_year TEXT,
+{columns}            FOREIGN KEY (upload_id) REFERENCES uploads(id)
+        )
+    '''
+
+def metric_upsert_sql(level, data_type="operational"):
+    """INSERT ... ON CONFLICT DO UPDATE statement for a level
+
+    Re-ingesting the same key overwrites the row in place.
+    """
+    key_columns = metric_table_key(level)
+    columns = _id_columns(level) + tuple(column for _, column in metric_registry(level, data_type))
+    updates = ',\n        '.join(f'{column} = excluded.{column}'
+                                 for column in columns if column not in key_columns)
+    return f'''
+    INSERT INTO {metrics_table(level, data_type)} ({', '.join(columns)})
+    VALUES ({', '.join('?' * len(columns))})
+    ON CONFLICT({', '.join(key_columns)}) DO UPDATE SET
+        {updates}
+'''
+
+METRICS_UPSERT = {(data_type, level): metric_upsert_sql(level, data_type)
+                  for data_type in DATA_TYPES for level in METRIC_LEVELS}
+
+def _add_missing_columns(cursor, level, data_type="operational"):
+    """Add registry columns that an existing table predates"""
+    table = metrics_table(level, data_type)
+    existing = {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+    for _, column in metric_registry(level, data_type):
+        if column not in existing:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} REAL')
+
+def _create_unique_key(cursor, level, data_type="operational"):
+    """Add the unique key index to a metric table, first dropping older duplicate rows"""
+    table = metrics_table(level, data_type)
+    index_name = f'ux_{table}_key'
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (index_name,)
+    ).fetchone()
+    if exists:
+        return
+    columns = ', '.join(metric_table_key(level))
+    # Databases written before the key existed can hold repeats; keep the latest
+    cursor.execute(f'''
+        DELETE FROM {table}
+        WHERE id NOT IN (SELECT MAX(id) FROM {table} GROUP BY {columns})
+    ''')
+    cursor.execute(f'CREATE UNIQUE INDEX {index_name} ON {table}({columns})')
+
+def trend_index_sql(level, data_type="operational"):
+    """CREATE INDEX statement of a level's covering trend index, generated from TREND_METRICS"""
+    table = metrics_table(level, data_type)
+    columns = dict(metric_registry(level, data_type))
+    index_columns = (metric_table_key(level) + tuple(columns[label] for label in TREND_METRICS[data_type])
+                     + ('upload_id',))
+    return f'CREATE INDEX idx_{table}_trend ON {table}({", ".join(index_columns)})'
+
+def _create_trend_index(cursor, level, data_type="operational"):
+    """Create the covering index for trend queries, rebuilding it if TREND_METRICS changed
+
+    It holds the key columns, every trend metric and upload_id (get_history's
+    tie-break), so history scans over those metrics are answered from the
+    index without touching the table.
+    """
+    index_name = f'idx_{metrics_table(level, data_type)}_trend'
+    index_sql = trend_index_sql(level, data_type)
+    existing = cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND name = ?", (index_name,)
+    ).fetchone()
+    if existing and existing[0] == index_sql:
+        return
+    cursor.execute(f'DROP INDEX IF EXISTS {index_name}')
+    cursor.execute(index_sql)
+
+@contextmanager
+def write_transaction():
+    """This thread's write connection inside a transaction, committed on success
+
+    Every committed write bumps the data generation, which invalidates the
+    history query cache.
+    """
+    global _data_generation
     conn = get_connection()
+    with conn:
+        yield conn
+    with _cache_lock:
+        _data_generation += 1
+
+# Bump whenever init_database() gains a hand-written table, column or index.
+# Metric columns and the trend indexes are generated from the metric registry
+# and TREND_METRICS, and changes to those are picked up by schema_version().
+SCHEMA_REVISION = 2
+
+def schema_version():
+    """Fingerprint of the schema init_database() builds, as stored in PRAGMA user_version
+
+    A crc32 of SCHEMA_REVISION and the generated metric table and trend index
+    SQL, so editing the metric registry or TREND_METRICS upgrades existing
+    files the next time a process opens them.
+    """
+    parts = [str(SCHEMA_REVISION)]
+    for data_type in DATA_TYPES:
+        for level in METRIC_LEVELS:
+            parts += [create_metrics_table_sql(level, data_type), trend_index_sql(level, data_type)]
+    # user_version is a signed 32-bit integer
+    return zlib.crc32('\n'.join(parts).encode()) & 0x7FFFFFFF
+
+SCHEMA_VERSION = schema_version()
+
+_schema_lock = threading.Lock()
+_schema_path = None   # DATABASE_PATH whose schema this process has checked
+
+def ensure_schema():
+    """Bring the schema up to SCHEMA_VERSION once per process and database file
+
+    Importing this module does no I/O; the first get_connection() call runs
+    init_database() only if the file's user_version differs, so a current
+    database costs one PRAGMA read per process.
+    """
+    global _schema_path
+    if _schema_path == DATABASE_PATH:
+        return
+    with _schema_lock:
+        if _schema_path == DATABASE_PATH:
+            return
+        conn = _pooled_connection()
+        if conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+            init_database(conn)
+        _schema_path = DATABASE_PATH
+
+def init_database(conn=None):
+    """Create or upgrade every table and index, then stamp SCHEMA_VERSION
+
+    Each statement is idempotent, so this is safe to run on any existing
+    database; ensure_schema() calls it when the stored version differs.
+    """
+    conn = conn or _pooled_connection()
     cursor = conn.cursor()
 
     # Upload history table
@@ -27,212 +291,103 @@ def init_database():
         )
     ''')
 
-    # Company level metrics
+    # Operational KPI and Budget Tracker tables for every level
+    for data_type in DATA_TYPES:
+        for level in METRIC_LEVELS:
+            table = metrics_table(level, data_type)
+            cursor.execute(create_metrics_table_sql(level, data_type))
+            _add_missing_columns(cursor, level, data_type)
+
+            # Whole-day lookups by date; the unique key leads with the entity
+            # name, so it also serves per-entity date-range scans
+            date_columns = ', '.join(('record_date',) + LEVEL_NAME_COLUMNS[level][-1:])
+            index_name = f'idx_{level}_date' if data_type == "operational" else f'idx_{level}_budget_date'
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {index_name} ON {table}({date_columns})')
+            _create_unique_key(cursor, level, data_type)
+            _create_trend_index(cursor, level, data_type)
+
+    # Per entity, metric and month summary kept up to date on every ingest
+    rollups_exist = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'metric_rollups'"
+    ).fetchone()
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS company_metrics (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            upload_id INTEGER,
-            record_date DATE,
-            month_year TEXT,
-            member_net REAL,
-            lead_to_member_pct REAL,
-            lead_booked_pct REAL,
-            appt_show_pct REAL,
-            appt_close_pct REAL,
-            ob_phone_calls_day REAL,
-            downpayment_wo_tax REAL,
-            fc_booking_pct REAL,
-            show_pct REAL,
-            close_pct REAL,
-            avg_deal REAL,
-            avg_fcs_day REAL,
-            downpayments REAL,
-            downpayment_pct REAL,
-            tav REAL,
-            revenue REAL,
-            remaining_draft REAL,
-            projected_revenue REAL,
-            ob_phone_calls REAL,
-            new_leads REAL,
-            appt_scheduled REAL,
-            appt_show_count REAL,
-            total_tours REAL,
-            walk_ins REAL,
-            new_members REAL,
-            downpayment_amount REAL,
-            square_dps REAL,
-            fcs_booked_pos REAL,
-            fcs_made REAL,
-            fcs_scheduled REAL,
-            fcs_shows REAL,
-            fcs_closes REAL,
-            new_deals REAL,
-            locations REAL,
-            FOREIGN KEY (upload_id) REFERENCES uploads(id)
-        )
+        CREATE TABLE IF NOT EXISTS metric_rollups (
+            data_type TEXT NOT NULL,
+            level TEXT NOT NULL,
+            entity TEXT NOT NULL,
+            metric TEXT NOT NULL,
+            month_year TEXT NOT NULL,
+            first_date DATE,
+            first_value REAL,
+            last_date DATE,
+            last_value REAL,
+            min_value REAL,
+            max_value REAL,
+            PRIMARY KEY (data_type, level, entity, metric, month_year)
+        ) WITHOUT ROWID
     ''')
+    if not rollups_exist:
+        rebuild_rollups(conn)
 
-    # Territory level metrics
+    # Intraday refreshes stored as keyframes and deltas of changed cells
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS territory_metrics (
+        CREATE TABLE IF NOT EXISTS intraday_snapshots (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             upload_id INTEGER,
-            record_date DATE,
+            data_type TEXT NOT NULL,
             month_year TEXT,
-            territory_name TEXT,
-            member_net REAL,
-            lead_to_member_pct REAL,
-            lead_booked_pct REAL,
-            appt_show_pct REAL,
-            appt_close_pct REAL,
-            ob_phone_calls_day REAL,
-            downpayment_wo_tax REAL,
-            fc_booking_pct REAL,
-            show_pct REAL,
-            close_pct REAL,
-            avg_deal REAL,
-            avg_fcs_day REAL,
-            downpayments REAL,
-            downpayment_pct REAL,
-            tav REAL,
-            revenue REAL,
-            remaining_draft REAL,
-            projected_revenue REAL,
-            ob_phone_calls REAL,
-            new_leads REAL,
-            appt_scheduled REAL,
-            appt_show_count REAL,
-            total_tours REAL,
-            walk_ins REAL,
-            new_members REAL,
-            downpayment_amount REAL,
-            square_dps REAL,
-            fcs_booked_pos REAL,
-            fcs_made REAL,
-            fcs_scheduled REAL,
-            fcs_shows REAL,
-            fcs_closes REAL,
-            new_deals REAL,
-            locations REAL,
-            FOREIGN KEY (upload_id) REFERENCES uploads(id)
+            record_date DATE,
+            taken_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            keyframe_id INTEGER,
+            cell_count INTEGER
         )
     ''')
-
-    # Region level metrics
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_intraday_stream ON intraday_snapshots(data_type, month_year, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_intraday_chain ON intraday_snapshots(keyframe_id, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_intraday_date ON intraday_snapshots(record_date)')
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS region_metrics (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            upload_id INTEGER,
-            record_date DATE,
-            month_year TEXT,
+        CREATE TABLE IF NOT EXISTS intraday_keys (
+            id INTEGER PRIMARY KEY,
+            data_type TEXT NOT NULL,
+            level TEXT NOT NULL,
             territory_name TEXT,
             region_name TEXT,
-            member_net REAL,
-            lead_to_member_pct REAL,
-            lead_booked_pct REAL,
-            appt_show_pct REAL,
-            appt_close_pct REAL,
-            ob_phone_calls_day REAL,
-            downpayment_wo_tax REAL,
-            fc_booking_pct REAL,
-            show_pct REAL,
-            close_pct REAL,
-            avg_deal REAL,
-            avg_fcs_day REAL,
-            downpayments REAL,
-            downpayment_pct REAL,
-            tav REAL,
-            revenue REAL,
-            remaining_draft REAL,
-            projected_revenue REAL,
-            ob_phone_calls REAL,
-            new_leads REAL,
-            appt_scheduled REAL,
-            appt_show_count REAL,
-            total_tours REAL,
-            walk_ins REAL,
-            new_members REAL,
-            downpayment_amount REAL,
-            square_dps REAL,
-            fcs_booked_pos REAL,
-            fcs_made REAL,
-            fcs_scheduled REAL,
-            fcs_shows REAL,
-            fcs_closes REAL,
-            new_deals REAL,
-            locations REAL,
-            FOREIGN KEY (upload_id) REFERENCES uploads(id)
+            entity TEXT NOT NULL,
+            metric TEXT NOT NULL,
+            UNIQUE (data_type, level, entity, metric)
         )
     ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS intraday_cells (
+            snapshot_id INTEGER NOT NULL,
+            key_id INTEGER NOT NULL,
+            value REAL,
+            PRIMARY KEY (snapshot_id, key_id)
+        ) WITHOUT ROWID
+    ''')
 
-    # Club level metrics
+    # One row per compact_database() run; also schedules the next one
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS club_metrics (
+        CREATE TABLE IF NOT EXISTS maintenance_runs (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            upload_id INTEGER,
-            record_date DATE,
-            month_year TEXT,
-            territory_name TEXT,
-            region_name TEXT,
-            club_name TEXT,
-            member_net REAL,
-            lead_to_member_pct REAL,
-            lead_booked_pct REAL,
-            appt_show_pct REAL,
-            appt_close_pct REAL,
-            ob_phone_calls_day REAL,
-            downpayment_wo_tax REAL,
-            fc_booking_pct REAL,
-            show_pct REAL,
-            close_pct REAL,
-            avg_deal REAL,
-            avg_fcs_day REAL,
-            downpayments REAL,
-            downpayment_pct REAL,
-            tav REAL,
-            revenue REAL,
-            remaining_draft REAL,
-            projected_revenue REAL,
-            ob_phone_calls REAL,
-            new_leads REAL,
-            appt_scheduled REAL,
-            appt_show_count REAL,
-            total_tours REAL,
-            walk_ins REAL,
-            new_members REAL,
-            downpayment_amount REAL,
-            square_dps REAL,
-            fcs_booked_pos REAL,
-            fcs_made REAL,
-            fcs_scheduled REAL,
-            fcs_shows REAL,
-            fcs_closes REAL,
-            new_deals REAL,
-            FOREIGN KEY (upload_id) REFERENCES uploads(id)
+            ran_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            rows_deleted INTEGER,
+            uploads_deleted INTEGER,
+            freed_pages INTEGER
         )
     ''')
 
-    # Create indexes for faster queries
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_company_date ON company_metrics(record_date)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_territory_date ON territory_metrics(record_date, territory_name)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_region_date ON region_metrics(record_date, region_name)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_club_date ON club_metrics(record_date, club_name)')
-
+    cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
     conn.commit()
-    conn.close()
 
 def save_upload(filename, month_year, record_count):
     """Record an upload and return the upload_id"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO uploads (filename, month_year, record_count)
-        VALUES (?, ?, ?)
-    ''', (filename, month_year, record_count))
-    upload_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    return upload_id
+    with write_transaction() as conn:
+        cursor = conn.execute('''
+            INSERT INTO uploads (filename, month_year, record_count)
+            VALUES (?, ?, ?)
+        ''', (filename, month_year, record_count))
+    return cursor.lastrowid
 
 def metric_to_db_value(value):
     """Convert metric value to database-safe float"""
@@ -243,293 +398,879 @@ def metric_to_db_value(value):
     except:
         return None
 
+def _metric_column(column):
+    """A metric column as floats, NaN where metric_to_db_value gives NULL"""
+    if column.dtype.kind in 'biuf':
+        return column.to_numpy(dtype=float)
+    return column.map(metric_to_db_value).to_numpy(dtype=float)
+
+def metric_rows(level, id_rows, metric_dicts, data_type="operational"):
+    """Build upsert parameter tuples for many entities of a level at once
+
+    `id_rows` holds each row's identifying values (upload_id, record_date,
+    month_year, then the level's name columns) and `metric_dicts` the parsed
+    metrics keyed by sheet label. Numeric columns are converted in one step;
+    any other column (text, dates, mixed) goes through metric_to_db_value
+    cell by cell, so every value is stored as metric_to_db_value stores it.
+    """
+    labels = [label for label, _ in metric_registry(level, data_type)]
+    frame = pd.DataFrame.from_records(list(metric_dicts), columns=labels)
+    values = np.column_stack([_metric_column(frame[label]) for label in labels])
+    cells = values.astype(object)
+    cells[np.isnan(values)] = None
+    return [tuple(ids) + tuple(row) for ids, row in zip(id_rows, cells.tolist())]
+
+def _save_level_rows(level, rows, data_type="operational"):
+    """Upsert metric rows of one level and fold them into metric_rollups"""
+    with write_transaction() as conn:
+        conn.executemany(METRICS_UPSERT[data_type, level], rows)
+        conn.executemany(ROLLUP_UPSERT, _rollup_rows(level, rows, data_type))
+
 def save_company_metrics(upload_id, record_date, month_year, metrics):
     """Save company level metrics"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO company_metrics (
-            upload_id, record_date, month_year,
-            member_net, lead_to_member_pct, lead_booked_pct, appt_show_pct, appt_close_pct,
-            ob_phone_calls_day, downpayment_wo_tax, fc_booking_pct, show_pct, close_pct,
-            avg_deal, avg_fcs_day, downpayments, downpayment_pct, tav, revenue,
-            remaining_draft, projected_revenue, ob_phone_calls, new_leads, appt_scheduled,
-            appt_show_count, total_tours, walk_ins, new_members, downpayment_amount,
-            square_dps, fcs_booked_pos, fcs_made, fcs_scheduled, fcs_shows, fcs_closes,
-            new_deals, locations
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        upload_id, record_date, month_year,
-        metric_to_db_value(metrics.get('Member Net')),
-        metric_to_db_value(metrics.get('Lead to Member %')),
-        metric_to_db_value(metrics.get('Lead Booked %')),
-        metric_to_db_value(metrics.get('Appt Show %')),
-        metric_to_db_value(metrics.get('Appt Close %')),
-        metric_to_db_value(metrics.get('OB Phone Calls/Day')),
-        metric_to_db_value(metrics.get('Downpayment (w/o Sales Tax)')),
-        metric_to_db_value(metrics.get('FC Booking %')),
-        metric_to_db_value(metrics.get('Show %')),
-        metric_to_db_value(metrics.get('Close %')),
-        metric_to_db_value(metrics.get('Avg Deal')),
-        metric_to_db_value(metrics.get('Avg FCs/Day')),
-        metric_to_db_value(metrics.get('Downpayments')),
-        metric_to_db_value(metrics.get('Downpayment %')),
-        metric_to_db_value(metrics.get('TAV')),
-        metric_to_db_value(metrics.get('Revenue')),
-        metric_to_db_value(metrics.get('Remaining Draft')),
-        metric_to_db_value(metrics.get('Projected Revenue')),
-        metric_to_db_value(metrics.get('OB Phone Calls')),
-        metric_to_db_value(metrics.get('New Leads')),
-        metric_to_db_value(metrics.get('Appt Scheduled')),
-        metric_to_db_value(metrics.get('Appt Show Count')),
-        metric_to_db_value(metrics.get('Total Tours')),
-        metric_to_db_value(metrics.get('Walk-Ins')),
-        metric_to_db_value(metrics.get('New Members')),
-        metric_to_db_value(metrics.get('Downpayment Amount')),
-        metric_to_db_value(metrics.get('Square DPs')),
-        metric_to_db_value(metrics.get('FCs Booked @ POS')),
-        metric_to_db_value(metrics.get('FCs Made')),
-        metric_to_db_value(metrics.get('FCs Scheduled')),
-        metric_to_db_value(metrics.get('FCs Shows')),
-        metric_to_db_value(metrics.get('FCs Closes')),
-        metric_to_db_value(metrics.get('New Deals')),
-        metric_to_db_value(metrics.get('Locations'))
-    ))
-    conn.commit()
-    conn.close()
+    _save_level_rows('company', metric_rows('company', [(upload_id, record_date, month_year)], [metrics]))
 
 def save_territory_metrics(upload_id, record_date, month_year, territory_name, metrics):
     """Save territory level metrics"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO territory_metrics (
-            upload_id, record_date, month_year, territory_name,
-            member_net, lead_to_member_pct, lead_booked_pct, appt_show_pct, appt_close_pct,
-            ob_phone_calls_day, downpayment_wo_tax, fc_booking_pct, show_pct, close_pct,
-            avg_deal, avg_fcs_day, downpayments, downpayment_pct, tav, revenue,
-            remaining_draft, projected_revenue, ob_phone_calls, new_leads, appt_scheduled,
-            appt_show_count, total_tours, walk_ins, new_members, downpayment_amount,
-            square_dps, fcs_booked_pos, fcs_made, fcs_scheduled, fcs_shows, fcs_closes,
-            new_deals, locations
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        upload_id, record_date, month_year, territory_name,
-        metric_to_db_value(metrics.get('Member Net')),
-        metric_to_db_value(metrics.get('Lead to Member %')),
-        metric_to_db_value(metrics.get('Lead Booked %')),
-        metric_to_db_value(metrics.get('Appt Show %')),
-        metric_to_db_value(metrics.get('Appt Close %')),
-        metric_to_db_value(metrics.get('OB Phone Calls/Day')),
-        metric_to_db_value(metrics.get('Downpayment (w/o Sales Tax)')),
-        metric_to_db_value(metrics.get('FC Booking %')),
-        metric_to_db_value(metrics.get('Show %')),
-        metric_to_db_value(metrics.get('Close %')),
-        metric_to_db_value(metrics.get('Avg Deal')),
-        metric_to_db_value(metrics.get('Avg FCs/Day')),
-        metric_to_db_value(metrics.get('Downpayments')),
-        metric_to_db_value(metrics.get('Downpayment %')),
-        metric_to_db_value(metrics.get('TAV')),
-        metric_to_db_value(metrics.get('Revenue')),
-        metric_to_db_value(metrics.get('Remaining Draft')),
-        metric_to_db_value(metrics.get('Projected Revenue')),
-        metric_to_db_value(metrics.get('OB Phone Calls')),
-        metric_to_db_value(metrics.get('New Leads')),
-        metric_to_db_value(metrics.get('Appt Scheduled')),
-        metric_to_db_value(metrics.get('Appt Show Count')),
-        metric_to_db_value(metrics.get('Total Tours')),
-        metric_to_db_value(metrics.get('Walk-Ins')),
-        metric_to_db_value(metrics.get('New Members')),
-        metric_to_db_value(metrics.get('Downpayment Amount')),
-        metric_to_db_value(metrics.get('Square DPs')),
-        metric_to_db_value(metrics.get('FCs Booked @ POS')),
-        metric_to_db_value(metrics.get('FCs Made')),
-        metric_to_db_value(metrics.get('FCs Scheduled')),
-        metric_to_db_value(metrics.get('FCs Shows')),
-        metric_to_db_value(metrics.get('FCs Closes')),
-        metric_to_db_value(metrics.get('New Deals')),
-        metric_to_db_value(metrics.get('Locations'))
-    ))
-    conn.commit()
-    conn.close()
+    _save_level_rows('territory', metric_rows('territory', [(upload_id, record_date, month_year, territory_name)], [metrics]))
 
 def save_region_metrics(upload_id, record_date, month_year, territory_name, region_name, metrics):
     """Save region level metrics"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO region_metrics (
-            upload_id, record_date, month_year, territory_name, region_name,
-            member_net, lead_to_member_pct, lead_booked_pct, appt_show_pct, appt_close_pct,
-            ob_phone_calls_day, downpayment_wo_tax, fc_booking_pct, show_pct, close_pct,
-            avg_deal, avg_fcs_day, downpayments, downpayment_pct, tav, revenue,
-            remaining_draft, projected_revenue, ob_phone_calls, new_leads, appt_scheduled,
-            appt_show_count, total_tours, walk_ins, new_members, downpayment_amount,
-            square_dps, fcs_booked_pos, fcs_made, fcs_scheduled, fcs_shows, fcs_closes,
-            new_deals, locations
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        upload_id, record_date, month_year, territory_name, region_name,
-        metric_to_db_value(metrics.get('Member Net')),
-        metric_to_db_value(metrics.get('Lead to Member %')),
-        metric_to_db_value(metrics.get('Lead Booked %')),
-        metric_to_db_value(metrics.get('Appt Show %')),
-        metric_to_db_value(metrics.get('Appt Close %')),
-        metric_to_db_value(metrics.get('OB Phone Calls/Day')),
-        metric_to_db_value(metrics.get('Downpayment (w/o Sales Tax)')),
-        metric_to_db_value(metrics.get('FC Booking %')),
-        metric_to_db_value(metrics.get('Show %')),
-        metric_to_db_value(metrics.get('Close %')),
-        metric_to_db_value(metrics.get('Avg Deal')),
-        metric_to_db_value(metrics.get('Avg FCs/Day')),
-        metric_to_db_value(metrics.get('Downpayments')),
-        metric_to_db_value(metrics.get('Downpayment %')),
-        metric_to_db_value(metrics.get('TAV')),
-        metric_to_db_value(metrics.get('Revenue')),
-        metric_to_db_value(metrics.get('Remaining Draft')),
-        metric_to_db_value(metrics.get('Projected Revenue')),
-        metric_to_db_value(metrics.get('OB Phone Calls')),
-        metric_to_db_value(metrics.get('New Leads')),
-        metric_to_db_value(metrics.get('Appt Scheduled')),
-        metric_to_db_value(metrics.get('Appt Show Count')),
-        metric_to_db_value(metrics.get('Total Tours')),
-        metric_to_db_value(metrics.get('Walk-Ins')),
-        metric_to_db_value(metrics.get('New Members')),
-        metric_to_db_value(metrics.get('Downpayment Amount')),
-        metric_to_db_value(metrics.get('Square DPs')),
-        metric_to_db_value(metrics.get('FCs Booked @ POS')),
-        metric_to_db_value(metrics.get('FCs Made')),
-        metric_to_db_value(metrics.get('FCs Scheduled')),
-        metric_to_db_value(metrics.get('FCs Shows')),
-        metric_to_db_value(metrics.get('FCs Closes')),
-        metric_to_db_value(metrics.get('New Deals')),
-        metric_to_db_value(metrics.get('Locations'))
-    ))
-    conn.commit()
-    conn.close()
+    _save_level_rows('region', metric_rows('region', [(upload_id, record_date, month_year, territory_name, region_name)], [metrics]))
 
 def save_club_metrics(upload_id, record_date, month_year, territory_name, region_name, club_name, metrics):
     """Save club level metrics"""
+    _save_level_rows('club', metric_rows('club', [(upload_id, record_date, month_year, territory_name, region_name, club_name)], [metrics]))
+
+def _snapshot_rows(upload_id, record_date, month_year, data, data_type="operational"):
+    """Yield (level, parameter rows) for every level of a parsed snapshot"""
+    ids = (upload_id, record_date, month_year)
+    # Region rows don't carry their territory; recover it from the clubs
+    region_territory = {club.get('Region'): club.get('Territory') for club in data['clubs'].values()}
+
+    if data.get('company'):
+        yield 'company', metric_rows('company', [ids], [data['company']], data_type)
+    yield 'territory', metric_rows('territory', [ids + (name,) for name in data['territories']],
+                                   data['territories'].values(), data_type)
+    yield 'region', metric_rows('region', [ids + (region_territory.get(name), name) for name in data['regions']],
+                                data['regions'].values(), data_type)
+    yield 'club', metric_rows('club', [ids + (metrics.get('Territory'), metrics.get('Region'), name)
+                                       for name, metrics in data['clubs'].items()],
+                              data['clubs'].values(), data_type)
+
+def _row_key(level, row):
+    """(level, entity) of a metric upsert row, the entity the daily tables key on"""
+    names = row[3:len(_id_columns(level))]
+    return level, names[-1] if names else 'Company'
+
+def _write_snapshot(conn, upload_id, record_date, data, month_year, data_type="operational",
+                    intraday=False, previous=None, key_ids=None):
+    """Upsert a snapshot on an open connection (caller commits); returns (row_count, stream, key_ids)
+
+    `previous` is the stream this returned for the last snapshot of the
+    same month sheet. When it is for the same record_date, only rows that
+    changed since are upserted and only changed cells are folded into
+    metric_rollups; otherwise every row is written. The company row is
+    rewritten whenever any row changed, so its upload_id is the day's
+    fingerprint (see get_snapshot_dates). With `intraday`, the snapshot is
+    also added to the intraday history (see _write_intraday), and `key_ids`
+    is the intraday key map from the previous call, if any. The returned
+    stream holds this snapshot's rows for the next call.
+    """
+    record_date = str(record_date)
+    if previous is not None and previous['record_date'] != record_date:
+        previous = None
+    previous_rows = previous['rows'] if previous else {}
+    rows_by_key = {}
+    changes = []   # (level, rows that differ from previous)
+    unchanged_company = []
+    for level, rows in _snapshot_rows(upload_id, record_date, month_year, data, data_type):
+        changed = []
+        for row in rows:
+            key = _row_key(level, row)
+            rows_by_key[key] = row[1:]
+            if previous_rows.get(key) != row[1:]:
+                changed.append(row)
+        conn.executemany(METRICS_UPSERT[data_type, level], changed)
+        conn.executemany(ROLLUP_UPSERT, _rollup_rows(level, changed, data_type, previous_rows))
+        changes.append((level, changed))
+        if level == 'company':
+            unchanged_company = [] if changed else rows
+    if unchanged_company and any(changed for _, changed in changes):
+        conn.executemany(METRICS_UPSERT[data_type, 'company'], unchanged_company)
+    chain = None
+    if intraday:
+        chain, key_ids = _write_intraday(conn, upload_id, record_date, month_year, data_type,
+                                         rows_by_key, changes, previous, key_ids)
+    return len(rows_by_key), {'record_date': record_date, 'rows': rows_by_key, 'chain': chain}, key_ids
+
+# Monthly rollups
+#
+# metric_rollups holds one row per (entity, metric, month_year) with the
+# month's first and latest values and the extremes seen so far. Each ingest
+# folds its changed cells in with a single upsert, so month-over-month views
+# read a handful of rows per entity instead of every daily row. min/max
+# cover every ingested value, including intraday refreshes later overwritten
+# in the daily tables.
+ROLLUP_UPSERT = '''
+    INSERT INTO metric_rollups (
+        data_type, level, entity, metric, month_year,
+        first_date, first_value, last_date, last_value, min_value, max_value
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(data_type, level, entity, metric, month_year) DO UPDATE SET
+        first_value = CASE WHEN excluded.first_date <= first_date THEN excluded.first_value ELSE first_value END,
+        first_date = MIN(first_date, excluded.first_date),
+        last_value = CASE WHEN excluded.last_date >= last_date THEN excluded.last_value ELSE last_value END,
+        last_date = MAX(last_date, excluded.last_date),
+        min_value = MIN(min_value, excluded.min_value),
+        max_value = MAX(max_value, excluded.max_value)
+'''
+
+def _rollup_rows(level, rows, data_type="operational", previous_rows=None):
+    """Turn metric upsert rows into ROLLUP_UPSERT parameter tuples (NULL values are skipped)
+
+    `previous_rows` maps (level, entity) to the same day's row as last
+    written, without its upload_id; cells that still hold that value are
+    skipped, since folding them again changes nothing.
+    """
+    labels = [label for label, _ in metric_registry(level, data_type)]
+    id_count = len(_id_columns(level))
+    rollup_rows = []
+    for row in rows:
+        record_date, month_year = row[1], row[2]
+        entity = row[id_count - 1] if LEVEL_NAME_COLUMNS[level] else 'Company'
+        if month_year is None or entity is None:
+            continue
+        before = (previous_rows or {}).get((level, entity))
+        before = before[id_count - 1:] if before else (None,) * len(labels)
+        for label, value, old in zip(labels, row[id_count:], before):
+            if value is not None and value != old:
+                rollup_rows.append((data_type, level, entity, label, month_year,
+                                    record_date, value, record_date, value, value, value))
+    return rollup_rows
+
+def rebuild_rollups(conn=None):
+    """Recompute metric_rollups from the daily tables (for databases that predate it)"""
+    if conn is None:
+        with write_transaction() as conn:
+            return rebuild_rollups(conn)
+    conn.execute('DELETE FROM metric_rollups')
+    for data_type in DATA_TYPES:
+        for level in METRIC_LEVELS:
+            columns = _id_columns(level) + tuple(column for _, column in metric_registry(level, data_type))
+            cursor = conn.execute(f'''
+                SELECT {', '.join(columns)} FROM {metrics_table(level, data_type)}
+                ORDER BY record_date
+            ''')
+            while True:
+                rows = cursor.fetchmany(5000)
+                if not rows:
+                    break
+                conn.executemany(ROLLUP_UPSERT, _rollup_rows(level, [tuple(row) for row in rows], data_type))
+
+def ingest_snapshot(filename, month_year, record_date, data, data_type="operational", intraday=True, state=None):
+    """Record an upload and all of its metric rows in one transaction, returning the upload_id
+
+    `intraday` also keeps the snapshot in the intraday history; pass False
+    for one-off imports such as backfills. `state` is a dict the caller
+    keeps between calls, as the background writer does: with it, a refresh
+    of a month sheet already ingested that day is diffed in memory against
+    the last one and only what changed is written. Without it (or after any
+    other write to the database) every row is written and an intraday
+    snapshot starts a new keyframe.
+    """
+    record_count = ((1 if data.get('company') else 0) + len(data['territories'])
+                    + len(data['regions']) + len(data['clubs']))
+    if state and (state['path'], state['generation']) != (DATABASE_PATH, _data_generation):
+        state.clear()
+    with write_transaction() as conn:
+        cursor = conn.execute('''
+            INSERT INTO uploads (filename, month_year, record_count)
+            VALUES (?, ?, ?)
+        ''', (filename, month_year, record_count))
+        upload_id = cursor.lastrowid
+        # Another process may have written since the state was kept
+        if state and conn.execute('SELECT MAX(id) FROM uploads WHERE id < ?',
+                                  (upload_id,)).fetchone()[0] != state['upload_id']:
+            state.clear()
+        streams = state.get('streams', {}) if state else {}
+        key_ids = state.get('key_ids', {}) if state else {}
+        _, stream, data_key_ids = _write_snapshot(conn, upload_id, record_date, data, month_year, data_type,
+                                                  intraday, streams.get((data_type, month_year)),
+                                                  key_ids.get(data_type))
+    if state is not None:
+        state.setdefault('streams', {})[data_type, month_year] = stream
+        if data_key_ids is not None:
+            state.setdefault('key_ids', {})[data_type] = data_key_ids
+        state.update(path=DATABASE_PATH, generation=_data_generation, upload_id=upload_id)
+    return upload_id
+
+# Intraday history
+#
+# The metric tables keep one row per entity and day, so every refresh
+# overwrites the previous one there. Intraday refreshes are kept as deltas
+# instead: each one adds an intraday_snapshots row and stores only the cells
+# (one entity's value of one metric) that changed since the previous refresh
+# of the same month sheet, with a NULL for a cell that went blank. The first
+# refresh of a day, the first after the writer restarts, and every
+# INTRADAY_KEYFRAME_INTERVAL-th one after that is a keyframe holding every
+# cell, so rebuilding any snapshot reads one keyframe and at most
+# INTRADAY_KEYFRAME_INTERVAL - 1 deltas. Cells point at interned
+# intraday_keys rows rather than repeating entity and metric names.
+INTRADAY_KEYFRAME_INTERVAL = 96   # a day of 15-minute refreshes
+INTRADAY_RETENTION_DAYS = 14
+
+def _intraday_cells(level, row, labels, before=None):
+    """{(level, entity, metric): (territory_name, region_name, value)} for one entity's row
+
+    `row` is a metric upsert row without its upload_id. Without `before`
+    (the entity's previous row) every non-blank cell is returned; with it,
+    only cells whose value changed, a blanked one as None, plus every
+    non-blank cell if the entity moved territory or region.
+    """
+    id_count = len(_id_columns(level)) - 1
+    names = row[2:id_count]
+    entity = names[-1] if names else 'Company'
+    if entity is None:
+        return {}
+    territory_name = names[0] if names else None
+    region_name = names[1] if len(names) > 1 else None
+    moved = before is not None and before[2:id_count] != names
+    old_values = before[id_count:] if before is not None else (None,) * len(labels)
+    return {(level, entity, label): (territory_name, region_name, value)
+            for label, value, old in zip(labels, row[id_count:], old_values)
+            if value != old or (moved and value is not None)}
+
+def _intraday_key_ids(conn, data_type, cells, known=None):
+    """{(level, entity, metric): (key_id, (territory_name, region_name))} covering `cells`
+
+    `known` is the map this returned last time (read from intraday_keys
+    when None) and is left unmodified. New keys are interned and moved
+    entities recorded.
+    """
+    def keys_since(last_id):
+        return {(level, entity, metric): (key_id, (territory_name, region_name))
+                for key_id, level, territory_name, region_name, entity, metric in conn.execute('''
+                    SELECT id, level, territory_name, region_name, entity, metric
+                    FROM intraday_keys WHERE data_type = ? AND id > ?
+                ''', (data_type, last_id))}
+
+    if known is None:
+        known = keys_since(0)
+    new_keys = [(data_type, level, territory_name, region_name, entity, metric)
+                for (level, entity, metric), (territory_name, region_name, _) in cells.items()
+                if (level, entity, metric) not in known]
+    moved = {key: (known[key][0], (territory_name, region_name))
+             for key, (territory_name, region_name, _) in cells.items()
+             if key in known and known[key][1] != (territory_name, region_name)}
+    if not new_keys and not moved:
+        return known
+    known = dict(known)
+    if new_keys:
+        last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM intraday_keys').fetchone()[0]
+        conn.executemany('''
+            INSERT INTO intraday_keys (data_type, level, territory_name, region_name, entity, metric)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', new_keys)
+        known.update(keys_since(last_id))
+    if moved:
+        conn.executemany('UPDATE intraday_keys SET territory_name = ?, region_name = ? WHERE id = ?',
+                         [(territory_name, region_name, key_id)
+                          for key_id, (territory_name, region_name) in moved.values()])
+        known.update(moved)
+    return known
+
+def _intraday_state(conn, keyframe_id, snapshot_id, columns='c.key_id, c.value'):
+    """`columns` for every non-blank cell of a snapshot, in key order; the value must come last
+
+    Each key's value comes from the latest snapshot up to `snapshot_id` in
+    the keyframe's chain that wrote it (SQLite takes bare columns from the
+    MAX() row).
+    """
+    rows = conn.execute(f'''
+        SELECT {columns}, MAX(c.snapshot_id)
+        FROM intraday_snapshots s
+        JOIN intraday_cells c ON c.snapshot_id = s.id
+        JOIN intraday_keys k ON k.id = c.key_id
+        WHERE s.keyframe_id = ? AND s.id <= ?
+        GROUP BY c.key_id
+        ORDER BY c.key_id
+    ''', (keyframe_id, snapshot_id)).fetchall()
+    return [tuple(row)[:-1] for row in rows if row[-2] is not None]
+
+def _write_intraday(conn, upload_id, record_date, month_year, data_type, rows_by_key, changes,
+                    previous=None, key_ids=None):
+    """Add one intraday snapshot as a keyframe or a delta; returns (chain, key_ids)
+
+    `rows_by_key` and `changes` come from _write_snapshot, and `previous`
+    is the same day's stream whose chain the delta extends. The returned
+    chain is {'keyframe_id', 'length'}.
+    """
+    labels = {level: [label for label, _ in metric_registry(level, data_type)] for level in METRIC_LEVELS}
+    chain = previous['chain'] if previous else None
+    keyframe = chain is None or chain['length'] >= INTRADAY_KEYFRAME_INTERVAL
+    cells = {}
+    if keyframe:
+        for (level, _), row in rows_by_key.items():
+            cells.update(_intraday_cells(level, row, labels[level]))
+    else:
+        # Entities gone from the sheet blank out first, so a renamed key can reuse them
+        for (level, entity), before in previous['rows'].items():
+            if (level, entity) not in rows_by_key:
+                cells.update({key: (territory_name, region_name, None) for key, (territory_name, region_name, _)
+                              in _intraday_cells(level, before, labels[level]).items()})
+        for level, rows in changes:
+            for row in rows:
+                cells.update(_intraday_cells(level, row[1:], labels[level],
+                                             previous['rows'].get(_row_key(level, row))))
+    key_ids = _intraday_key_ids(conn, data_type, cells, key_ids)
+
+    cursor = conn.execute('''
+        INSERT INTO intraday_snapshots (upload_id, data_type, month_year, record_date, keyframe_id, cell_count)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (upload_id, data_type, month_year, record_date,
+          None if keyframe else chain['keyframe_id'], len(cells)))
+    snapshot_id = cursor.lastrowid
+    if keyframe:
+        conn.execute('UPDATE intraday_snapshots SET keyframe_id = id WHERE id = ?', (snapshot_id,))
+        chain = {'keyframe_id': snapshot_id, 'length': 1}
+    else:
+        chain = {'keyframe_id': chain['keyframe_id'], 'length': chain['length'] + 1}
+    conn.executemany('INSERT INTO intraday_cells (snapshot_id, key_id, value) VALUES (?, ?, ?)',
+                     [(snapshot_id, key_ids[key][0], value) for key, (_, _, value) in cells.items()])
+    return chain, key_ids
+
+# Retention and compaction
+#
+# The metric tables hold one end-of-day row per entity (re-ingests upsert in
+# place), and every refresh adds an uploads row. compact_database() applies
+# the retention tiers:
+#   - uploads: kept for UPLOAD_RETENTION_DAYS, then dropped once no metric
+#     row references them any more
+#   - daily rows: every day kept for DAILY_RETENTION_DAYS, then only the
+#     month-end row (latest record_date per entity and month_year)
+#   - intraday snapshots: kept for INTRADAY_RETENTION_DAYS, then dropped
+#     whole days at a time (a day's chains never reach into another day)
+# and then returns freed pages to the OS with an incremental VACUUM and
+# refreshes the planner statistics. metric_rollups are left alone, so
+# monthly first/last/min/max stay exact after thinning. Thinning destroys
+# daily rows, so only `python archive.py compact` applies it, after exporting
+# them to Parquet; the background writer's periodic maintenance passes
+# daily_days=None and leaves the daily tables whole.
+DAILY_RETENTION_DAYS = 400
+UPLOAD_RETENTION_DAYS = 30
+MAINTENANCE_INTERVAL_HOURS = 6
+
+def _thin_to_month_end(conn, level, data_type, cutoff):
+    """Delete daily rows older than cutoff that are not their month's last row"""
+    table = metrics_table(level, data_type)
+    partition = ', '.join(LEVEL_NAME_COLUMNS[level][-1:] + ('month_year',))
+    cursor = conn.execute(f'''
+        DELETE FROM {table}
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, record_date,
+                       MAX(record_date) OVER (PARTITION BY {partition}) AS month_end
+                FROM {table}
+            )
+            WHERE record_date < ? AND record_date < month_end
+        )
+    ''', (cutoff,))
+    return cursor.rowcount
+
+def _drop_orphaned_uploads(conn, cutoff):
+    """Delete uploads older than cutoff that no metric row points at"""
+    referenced = ' UNION '.join(
+        f'SELECT upload_id FROM {metrics_table(level, data_type)} WHERE upload_id IS NOT NULL'
+        for data_type in DATA_TYPES for level in METRIC_LEVELS
+    )
+    cursor = conn.execute(f'''
+        DELETE FROM uploads
+        WHERE upload_date < ? AND id NOT IN ({referenced})
+    ''', (cutoff,))
+    return cursor.rowcount
+
+def _drop_old_intraday(conn, cutoff):
+    """Delete intraday snapshots (and their cells) recorded before cutoff"""
+    conn.execute('''
+        DELETE FROM intraday_cells
+        WHERE snapshot_id IN (SELECT id FROM intraday_snapshots WHERE record_date < ?)
+    ''', (cutoff,))
+    return conn.execute('DELETE FROM intraday_snapshots WHERE record_date < ?', (cutoff,)).rowcount
+
+def compact_database(daily_days=DAILY_RETENTION_DAYS, upload_days=UPLOAD_RETENTION_DAYS,
+                     intraday_days=INTRADAY_RETENTION_DAYS):
+    """Apply the retention tiers, then VACUUM and ANALYZE; returns what was done
+
+    With daily_days=None the daily tables are not thinned.
+    """
+    now = datetime.now()
+    intraday_cutoff = (now.date() - timedelta(days=intraday_days)).isoformat()
+    # uploads.upload_date is CURRENT_TIMESTAMP, i.e. UTC
+    upload_cutoff = (datetime.now(timezone.utc) - timedelta(days=upload_days)).strftime('%Y-%m-%d %H:%M:%S')
+
+    with write_transaction() as conn:
+        rows_deleted = 0
+        if daily_days is not None:
+            daily_cutoff = (now.date() - timedelta(days=daily_days)).isoformat()
+            rows_deleted = sum(_thin_to_month_end(conn, level, data_type, daily_cutoff)
+                               for data_type in DATA_TYPES for level in METRIC_LEVELS)
+        uploads_deleted = _drop_orphaned_uploads(conn, upload_cutoff)
+        intraday_deleted = _drop_old_intraday(conn, intraday_cutoff)
+
     conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO club_metrics (
-            upload_id, record_date, month_year, territory_name, region_name, club_name,
-            member_net, lead_to_member_pct, lead_booked_pct, appt_show_pct, appt_close_pct,
-            ob_phone_calls_day, downpayment_wo_tax, fc_booking_pct, show_pct, close_pct,
-            avg_deal, avg_fcs_day, downpayments, downpayment_pct, tav, revenue,
-            remaining_draft, projected_revenue, ob_phone_calls, new_leads, appt_scheduled,
-            appt_show_count, total_tours, walk_ins, new_members, downpayment_amount,
-            square_dps, fcs_booked_pos, fcs_made, fcs_scheduled, fcs_shows, fcs_closes,
-            new_deals
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        upload_id, record_date, month_year, territory_name, region_name, club_name,
-        metric_to_db_value(metrics.get('Member Net')),
-        metric_to_db_value(metrics.get('Lead to Member %')),
-        metric_to_db_value(metrics.get('Lead Booked %')),
-        metric_to_db_value(metrics.get('Appt Show %')),
-        metric_to_db_value(metrics.get('Appt Close %')),
-        metric_to_db_value(metrics.get('OB Phone Calls/Day')),
-        metric_to_db_value(metrics.get('Downpayment (w/o Sales Tax)')),
-        metric_to_db_value(metrics.get('FC Booking %')),
-        metric_to_db_value(metrics.get('Show %')),
-        metric_to_db_value(metrics.get('Close %')),
-        metric_to_db_value(metrics.get('Avg Deal')),
-        metric_to_db_value(metrics.get('Avg FCs/Day')),
-        metric_to_db_value(metrics.get('Downpayments')),
-        metric_to_db_value(metrics.get('Downpayment %')),
-        metric_to_db_value(metrics.get('TAV')),
-        metric_to_db_value(metrics.get('Revenue')),
-        metric_to_db_value(metrics.get('Remaining Draft')),
-        metric_to_db_value(metrics.get('Projected Revenue')),
-        metric_to_db_value(metrics.get('OB Phone Calls')),
-        metric_to_db_value(metrics.get('New Leads')),
-        metric_to_db_value(metrics.get('Appt Scheduled')),
-        metric_to_db_value(metrics.get('Appt Show Count')),
-        metric_to_db_value(metrics.get('Total Tours')),
-        metric_to_db_value(metrics.get('Walk-Ins')),
-        metric_to_db_value(metrics.get('New Members')),
-        metric_to_db_value(metrics.get('Downpayment Amount')),
-        metric_to_db_value(metrics.get('Square DPs')),
-        metric_to_db_value(metrics.get('FCs Booked @ POS')),
-        metric_to_db_value(metrics.get('FCs Made')),
-        metric_to_db_value(metrics.get('FCs Scheduled')),
-        metric_to_db_value(metrics.get('FCs Shows')),
-        metric_to_db_value(metrics.get('FCs Closes')),
-        metric_to_db_value(metrics.get('New Deals'))
-    ))
-    conn.commit()
-    conn.close()
+    freed_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+        # Databases created before incremental auto-vacuum need one full VACUUM to switch
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
+    else:
+        # executescript steps the pragma to completion; execute() frees a single page
+        conn.executescript('PRAGMA incremental_vacuum;')
+    analyzed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+    ).fetchone()
+    conn.execute('PRAGMA optimize' if analyzed else 'ANALYZE')
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    with write_transaction() as conn:
+        conn.execute('''
+            INSERT INTO maintenance_runs (rows_deleted, uploads_deleted, freed_pages)
+            VALUES (?, ?, ?)
+        ''', (rows_deleted, uploads_deleted, freed_pages))
+    return {'rows_deleted': rows_deleted, 'uploads_deleted': uploads_deleted,
+            'intraday_deleted': intraday_deleted, 'freed_pages': freed_pages}
+
+def maintenance_due(interval_hours=MAINTENANCE_INTERVAL_HOURS):
+    """True when compact_database() has not run in the last interval_hours"""
+    with read_connection() as conn:
+        recent = conn.execute(
+            "SELECT 1 FROM maintenance_runs WHERE ran_at > datetime('now', ?)", (f'-{interval_hours} hours',)
+        ).fetchone()
+    return recent is None
+
+# Background history writer
+#
+# The dashboard hands parsed snapshots to enqueue_snapshot(), which returns
+# immediately; a single daemon thread drains the queue into SQLite. The queue
+# is bounded: when it is full the oldest pending snapshot is dropped in
+# favour of the newest, so a slow disk never blocks a page render.
+WRITE_QUEUE_SIZE = 8
+SEEN_DIGESTS_SIZE = 64
+
+_writer_lock = threading.Lock()
+_write_queue = None
+_writer_thread = None
+_seen_digests = OrderedDict()
+writer_stats = {'queued': 0, 'written': 0, 'duplicates': 0, 'dropped': 0, 'errors': 0, 'last_error': None}
+
+def snapshot_digest(filename, month_year, record_date, data, data_type="operational"):
+    """Content hash used to skip re-writing an identical snapshot"""
+    return hashlib.sha1(pickle.dumps((filename, month_year, record_date, data, data_type))).hexdigest()
+
+def _writer_loop(write_queue):
+    """Drain the write queue into the database until a None sentinel arrives
 
+    The writer keeps the last snapshot it wrote of each month sheet, so a
+    refresh only writes what changed (see ingest_snapshot).
+    """
+    ingest_state = {}
+    while True:
+        item = write_queue.get()
+        if item is None:
+            write_queue.task_done()
+            return
+        digest, filename, month_year, record_date, data, data_type = item
+        try:
+            ingest_snapshot(filename, month_year, record_date, data, data_type, state=ingest_state)
+            writer_stats['written'] += 1
+            # Housekeeping runs here so it never competes with another writer.
+            # Daily rows are only thinned by `archive.py compact`, which
+            # exports them first.
+            if maintenance_due():
+                compact_database(daily_days=None)
+        except Exception as e:
+            writer_stats['errors'] += 1
+            writer_stats['last_error'] = str(e)
+            # Let the same snapshot be retried on its next enqueue
+            with _writer_lock:
+                _seen_digests.pop(digest, None)
+        finally:
+            write_queue.task_done()
+
+def start_background_writer():
+    """Start the background writer thread once per process"""
+    global _write_queue, _writer_thread
+    with _writer_lock:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _write_queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+            _writer_thread = threading.Thread(target=_writer_loop, args=(_write_queue,),
+                                              name='bsi-history-writer', daemon=True)
+            _writer_thread.start()
+
+def enqueue_snapshot(filename, month_year, record_date, data, data_type="operational", digest=None):
+    """Queue a parsed snapshot for background persistence without waiting on disk
+
+    `digest` is the snapshot_digest() of the same arguments if the caller
+    already has it; hashing a large snapshot on every rerun is not free.
+    Returns 'queued', or 'duplicate' if an identical snapshot is already
+    pending or was written recently.
+    """
+    start_background_writer()
+    if digest is None:
+        digest = snapshot_digest(filename, month_year, record_date, data, data_type)
+    with _writer_lock:
+        if digest in _seen_digests:
+            writer_stats['duplicates'] += 1
+            return 'duplicate'
+        _seen_digests[digest] = True
+        if len(_seen_digests) > SEEN_DIGESTS_SIZE:
+            _seen_digests.popitem(last=False)
+
+    item = (digest, filename, month_year, record_date, data, data_type)
+    while True:
+        try:
+            _write_queue.put_nowait(item)
+            break
+        except queue.Full:
+            # Backpressure: drop the oldest pending snapshot rather than block the page
+            try:
+                dropped = _write_queue.get_nowait()
+            except queue.Empty:
+                continue
+            _write_queue.task_done()
+            if dropped is None:
+                # Writer is shutting down; leave the sentinel in place
+                _write_queue.put_nowait(None)
+                return 'dropped'
+            writer_stats['dropped'] += 1
+            with _writer_lock:
+                _seen_digests.pop(dropped[0], None)
+    writer_stats['queued'] += 1
+    return 'queued'
+
+def flush_background_writer(timeout=10):
+    """Wait up to `timeout` seconds for queued snapshots to be written, then stop the writer"""
+    global _writer_thread
+    with _writer_lock:
+        thread = _writer_thread
+        _writer_thread = None
+    if thread is None or not thread.is_alive():
+        return
+    _write_queue.put(None)
+    thread.join(timeout)
+
+atexit.register(flush_background_writer)
+
+# History query cache
+#
+# Dashboard reruns ask for the same history slices over and over between
+# ingestions. Results are kept in an in-process LRU keyed by the query and
+# the data version: the latest uploads.id (new uploads from any process)
+# plus a generation counter bumped by every write committed in this process.
+# A cached frame is served until either changes. The latest upload id is
+# only re-read when the generation moves or UPLOAD_RECHECK_SECONDS have
+# passed, so cache hits don't touch SQLite and writes from other processes
+# (backfills) show up within that interval.
+HISTORY_CACHE_SIZE = 128
+UPLOAD_RECHECK_SECONDS = 10
+
+_cache_lock = threading.Lock()
+_history_cache = OrderedDict()
+_data_generation = 0
+_latest_upload = None   # (DATABASE_PATH, generation, monotonic time, MAX(uploads.id)) last read
+history_cache_stats = {'hits': 0, 'misses': 0}
+
+def data_version():
+    """Current (latest upload id, write generation) pair that cached reads are keyed on"""
+    global _latest_upload
+    generation, checked = _data_generation, _latest_upload
+    now = time.monotonic()
+    if (checked is None or checked[:2] != (DATABASE_PATH, generation)
+            or now - checked[2] > UPLOAD_RECHECK_SECONDS):
+        with read_connection() as conn:
+            latest_upload = conn.execute('SELECT MAX(id) FROM uploads').fetchone()[0]
+        checked = _latest_upload = (DATABASE_PATH, generation, now, latest_upload)
+    return checked[3], generation
+
+def _freeze(value):
+    """Hashable form of a query argument (lists become tuples)"""
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def cached_history(func):
+    """Serve a history reader from the LRU cache until the data version changes
+
+    The wrapped function must return a DataFrame; callers get a copy so they
+    can't modify the cached frame.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (func.__name__, _freeze(args), _freeze(sorted(kwargs.items())), data_version())
+        with _cache_lock:
+            cached = _history_cache.get(key)
+            if cached is not None:
+                _history_cache.move_to_end(key)
+                history_cache_stats['hits'] += 1
+                return cached.copy()
+            history_cache_stats['misses'] += 1
+        result = func(*args, **kwargs)
+        with _cache_lock:
+            _history_cache[key] = result
+            while len(_history_cache) > HISTORY_CACHE_SIZE:
+                _history_cache.popitem(last=False)
+        return result.copy()
+    return wrapper
+
+def clear_history_cache():
+    """Drop every cached history result and re-read the latest upload id on next use"""
+    global _latest_upload
+    with _cache_lock:
+        _history_cache.clear()
+        _latest_upload = None
+
+@cached_history
 def get_historical_company_data(limit=30):
     """Get historical company metrics for trend analysis"""
-    conn = get_connection()
-    df = pd.read_sql_query('''
-        SELECT * FROM company_metrics
-        ORDER BY record_date DESC
-        LIMIT ?
-    ''', conn, params=(limit,))
-    conn.close()
+    with read_connection() as conn:
+        df = pd.read_sql_query('''
+            SELECT * FROM company_metrics
+            ORDER BY record_date DESC
+            LIMIT ?
+        ''', conn, params=(limit,))
     return df
 
+@cached_history
 def get_historical_territory_data(territory_name, limit=30):
     """Get historical territory metrics"""
-    conn = get_connection()
-    df = pd.read_sql_query('''
-        SELECT * FROM territory_metrics
-        WHERE territory_name = ?
-        ORDER BY record_date DESC
-        LIMIT ?
-    ''', conn, params=(territory_name, limit))
-    conn.close()
+    with read_connection() as conn:
+        df = pd.read_sql_query('''
+            SELECT * FROM territory_metrics
+            WHERE territory_name = ?
+            ORDER BY record_date DESC
+            LIMIT ?
+        ''', conn, params=(territory_name, limit))
     return df
 
+@cached_history
 def get_historical_region_data(region_name, limit=30):
     """Get historical region metrics"""
-    conn = get_connection()
-    df = pd.read_sql_query('''
-        SELECT * FROM region_metrics
-        WHERE region_name = ?
-        ORDER BY record_date DESC
-        LIMIT ?
-    ''', conn, params=(region_name, limit))
-    conn.close()
+    with read_connection() as conn:
+        df = pd.read_sql_query('''
+            SELECT * FROM region_metrics
+            WHERE region_name = ?
+            ORDER BY record_date DESC
+            LIMIT ?
+        ''', conn, params=(region_name, limit))
     return df
 
+@cached_history
 def get_historical_club_data(club_name, limit=30):
     """Get historical club metrics"""
-    conn = get_connection()
-    df = pd.read_sql_query('''
-        SELECT * FROM club_metrics
-        WHERE club_name = ?
-        ORDER BY record_date DESC
-        LIMIT ?
-    ''', conn, params=(club_name, limit))
-    conn.close()
+    with read_connection() as conn:
+        df = pd.read_sql_query('''
+            SELECT * FROM club_metrics
+            WHERE club_name = ?
+            ORDER BY record_date DESC
+            LIMIT ?
+        ''', conn, params=(club_name, limit))
+    return df
+
+# Columns of get_history()'s long-format frames
+HISTORY_COLUMNS = ['entity', 'record_date', 'month_year', 'metric', 'value']
+
+@cached_history
+def get_history(level, entities=None, metrics=None, start_date=None, end_date=None, data_type="operational"):
+    """Get history for many entities of one level in a single query
+
+    `entities` is a list of territory/region/club names (ignored for the
+    company level; None means every entity), `metrics` a list of sheet labels
+    (None means all of them) and `start_date`/`end_date` an inclusive
+    record_date range. Returns a long-format frame with columns entity,
+    record_date, month_year, metric and value, ordered by metric, entity
+    and date; a day ingested from more than one month sheet has a row per
+    sheet, in upload order, so keep='last' picks the latest write. Queries
+    limited to TREND_METRICS are served from the covering index.
+    """
+    registry = dict(metric_registry(level, data_type))
+    labels = list(registry) if metrics is None else list(metrics)
+    unknown = [label for label in labels if label not in registry]
+    if unknown:
+        raise ValueError(f"Unknown {data_type} metrics for {level}: {unknown}")
+    if not labels:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+
+    name_columns = LEVEL_NAME_COLUMNS[level]
+    entity_column = name_columns[-1] if name_columns else "'Company'"
+    columns = ', '.join(f'{registry[label]} AS "{label}"' for label in labels)
+    conditions, params = [], []
+    if name_columns and entities is not None:
+        entities = list(entities)
+        if not entities:
+            return pd.DataFrame(columns=HISTORY_COLUMNS)
+        conditions.append(f"{entity_column} IN ({', '.join('?' * len(entities))})")
+        params += entities
+    if start_date is not None:
+        conditions.append('record_date >= ?')
+        params.append(str(start_date))
+    if end_date is not None:
+        conditions.append('record_date <= ?')
+        params.append(str(end_date))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+    with read_connection() as conn:
+        df = pd.read_sql_query(f'''
+            SELECT {entity_column} AS entity, record_date, month_year, {columns}
+            FROM {metrics_table(level, data_type)}
+            {where}
+            ORDER BY entity, record_date, upload_id
+        ''', conn, params=params)
+    return df.melt(id_vars=['entity', 'record_date', 'month_year'], value_vars=labels,
+                   var_name='metric', value_name='value')
+
+@cached_history
+def get_monthly_rollups(level, entities=None, metrics=None, data_type="operational"):
+    """Get monthly rollups (first/last/min/max per month) for many entities in one query
+
+    Arguments match get_history. Returns one row per entity, metric and
+    month_year, ordered by entity, metric and first_date. Reads a few rows
+    per entity and month from metric_rollups, so long trend ranges use this
+    instead of scanning every daily row.
+    """
+    conditions, params = ['data_type = ?', 'level = ?'], [data_type, level]
+    if entities is not None and LEVEL_NAME_COLUMNS[level]:
+        entities = list(entities)
+        conditions.append(f"entity IN ({', '.join('?' * len(entities))})")
+        params += entities
+    if metrics is not None:
+        metrics = list(metrics)
+        conditions.append(f"metric IN ({', '.join('?' * len(metrics))})")
+        params += metrics
+
+    with read_connection() as conn:
+        df = pd.read_sql_query(f'''
+            SELECT entity, metric, month_year, first_date, first_value, last_date, last_value,
+                   min_value, max_value
+            FROM metric_rollups
+            WHERE {' AND '.join(conditions)}
+            ORDER BY entity, metric, first_date
+        ''', conn, params=params)
     return df
 
+@cached_history
+def get_snapshot_dates(data_type="operational"):
+    """Stored snapshot dates, newest first, with each month sheet recorded on them
+
+    upload_id is that of the latest write that changed the day's snapshot
+    (_write_snapshot always rewrites the company row), so it fingerprints the
+    stored snapshot of that record_date and month_year.
+    """
+    with read_connection() as conn:
+        df = pd.read_sql_query(f'''
+            SELECT record_date, month_year, upload_id FROM {metrics_table('company', data_type)}
+            ORDER BY record_date DESC, upload_id DESC
+        ''', conn)
+    return df
+
+def load_snapshot_from_db(record_date, month_year, data_type="operational"):
+    """Rebuild the sheets.load_data() structure for a stored snapshot, one query per level
+
+    Returns (data, update_time) like load_data, or None if nothing was stored
+    for that date and month sheet. Metrics that were blank in the sheet are
+    left out of the entity dicts, as the parsers do.
+    """
+    with read_connection() as conn:
+        data = {'company': None, 'territories': {}, 'regions': {}, 'clubs': {}}
+        for level in METRIC_LEVELS:
+            registry = metric_registry(level, data_type)
+            name_columns = LEVEL_NAME_COLUMNS[level]
+            columns = name_columns + tuple(column for _, column in registry)
+            rows = conn.execute(f'''
+                SELECT {', '.join(columns)} FROM {metrics_table(level, data_type)}
+                WHERE record_date = ? AND month_year = ?
+                ORDER BY id
+            ''', (str(record_date), month_year)).fetchall()
+            for row in rows:
+                metrics = {label: value for (label, _), value in zip(registry, row[len(name_columns):])
+                           if value is not None}
+                _add_snapshot_entity(data, level, *row[:len(name_columns)], metrics=metrics)
+    if data['company'] is None and not data['clubs']:
+        return None
+    return data, f"Stored snapshot of {record_date}"
+
+def _add_snapshot_entity(data, level, territory_name=None, region_name=None, club_name=None, metrics=None):
+    """Place one entity's metrics in a load_data()-shaped dict"""
+    if level == 'company':
+        data['company'] = {'Entity': 'Company', **metrics}
+    elif level == 'territory':
+        data['territories'][territory_name] = {'Entity': territory_name, **metrics}
+    elif level == 'region':
+        data['regions'][region_name] = {'Entity': region_name, **metrics}
+    else:
+        data['clubs'][club_name] = {'Entity': club_name, **metrics,
+                                    'Region': region_name, 'Territory': territory_name}
+
+@cached_history
+def get_intraday_snapshots(record_date=None, data_type="operational"):
+    """Intraday snapshots, newest first, optionally only those of one record_date"""
+    query = '''
+        SELECT id, upload_id, month_year, record_date, taken_at,
+               keyframe_id = id AS is_keyframe, cell_count
+        FROM intraday_snapshots
+        WHERE data_type = ?
+    '''
+    params = [data_type]
+    if record_date is not None:
+        query += ' AND record_date = ?'
+        params.append(str(record_date))
+    query += ' ORDER BY id DESC'
+    with read_connection() as conn:
+        return pd.read_sql_query(query, conn, params=params)
+
+def load_intraday_snapshot(snapshot_id):
+    """Rebuild the sheets.load_data() structure for one intraday snapshot
+
+    Reads the snapshot's keyframe with the deltas up to it applied, in one
+    query. Entities are placed under the territory and region they were
+    last ingested with. Returns (data, update_time) like load_data, or None
+    for an unknown id.
+    """
+    with read_connection() as conn:
+        snapshot = conn.execute(
+            'SELECT keyframe_id, taken_at FROM intraday_snapshots WHERE id = ?', (snapshot_id,)
+        ).fetchone()
+        if snapshot is None:
+            return None
+        cells = _intraday_state(conn, snapshot['keyframe_id'], snapshot_id,
+                                columns='k.level, k.territory_name, k.region_name, k.entity, k.metric, c.value')
+    data = {'company': None, 'territories': {}, 'regions': {}, 'clubs': {}}
+    entities = {}
+    for level, territory_name, region_name, entity, metric, value in cells:
+        names = {'territory': (entity, None, None), 'region': (territory_name, entity, None),
+                 'club': (territory_name, region_name, entity)}.get(level, ())
+        entities.setdefault((level,) + names, {})[metric] = value
+    for (level, *names), metrics in entities.items():
+        _add_snapshot_entity(data, level, *names, metrics=metrics)
+    return data, f"Intraday snapshot of {snapshot['taken_at']} UTC"
+
+@cached_history
 def get_upload_history():
     """Get list of all uploads"""
-    conn = get_connection()
-    df = pd.read_sql_query('''
-        SELECT * FROM uploads
-        ORDER BY upload_date DESC
-    ''', conn)
-    conn.close()
+    with read_connection() as conn:
+        df = pd.read_sql_query('''
+            SELECT * FROM uploads
+            ORDER BY upload_date DESC
+        ''', conn)
     return df
 
 def check_if_date_exists(record_date, month_year):
     """Check if data for this date already exists"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT COUNT(*) FROM company_metrics
-        WHERE record_date = ? AND month_year = ?
-    ''', (record_date, month_year))
-    count = cursor.fetchone()[0]
-    conn.close()
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT COUNT(*) FROM company_metrics
+            WHERE record_date = ? AND month_year = ?
+        ''', (record_date, month_year))
+        count = cursor.fetchone()[0]
     return count > 0
-
-# Initialize database on import
-init_database()
@@ -0,0 +1,108 @@
+import re
+
+# Column mapping for operational data (Daily KPI Scorecard)
+COL_MAP_OPERATIONAL = {
+    0: 'Entity',
+    1: 'Member Net',
+    2: 'Lead to Member %',
+    3: 'Lead Booked %',
+    4: 'Appt Show %',
+    5: 'Appt Close %',
+    6: 'OB Phone Calls/Day',
+    7: 'Downpayment (w/o Sales Tax)',
+    8: 'FC Booking %',
+    9: 'Show %',
+    10: 'Close %',
+    11: 'Avg Deal',
+    12: 'Avg FCs/Day',
+    13: 'Downpayments',
+    14: 'Downpayment %',
+    15: 'TAV',
+    16: 'Revenue',
+    17: 'Remaining Draft',
+    18: 'Projected Revenue',
+    19: 'OB Phone Calls',
+    20: 'New Leads',
+    21: 'Appt Scheduled',
+    22: 'Appt Show Count',
+    23: 'Total Tours',
+    24: 'Walk-Ins',
+    25: 'New Members',
+    26: 'Downpayment Amount',
+    27: 'Square DPs',
+    28: 'FCs Booked @ POS',
+    29: 'FCs Made',
+    30: 'FCs Scheduled',
+    31: 'FCs Shows',
+    32: 'FCs Closes',
+    33: 'New Deals',
+    34: 'Sales Tax',
+    35: 'Locations'
+}
+
+# Column mapping for budget data (Budget Tracker)
+COL_MAP_BUDGET = {
+    0: 'Entity',
+    1: 'Member Net Real',
+    2: 'Member Net Budget',
+    3: 'Member Net to Budget',
+    4: 'New Members Real',
+    5: 'New Members Budget',
+    6: 'New Members % of Budget',
+    7: 'PIF Members Real',
+    8: 'PIF Members Budget',
+    9: 'PIF Members % of Budget',
+    10: 'Downpayment Real',
+    11: 'Downpayment Budget',
+    12: 'Downpayment % of Budget',
+    13: 'Revenue',
+    14: 'Remaining Draft',
+    15: 'Projected Revenue',
+    16: 'Revenue Budget',
+    17: 'Projected Revenue % of Budget'
+}
+
+COL_MAPS = {
+    'operational': COL_MAP_OPERATIONAL,
+    'budget': COL_MAP_BUDGET,
+}
+
+# Hierarchy levels and the name columns that identify a row at each level
+LEVEL_NAME_COLUMNS = {
+    'company': (),
+    'territory': ('territory_name',),
+    'region': ('territory_name', 'region_name'),
+    'club': ('territory_name', 'region_name', 'club_name'),
+}
+
+# Database column names that don't follow column_name()'s rule
+COLUMN_NAME_OVERRIDES = {
+    'Downpayment (w/o Sales Tax)': 'downpayment_wo_tax',
+}
+
+# Metrics that are meaningless at a level and are not stored for it
+LEVEL_EXCLUDED_METRICS = {
+    'club': {'Locations'},
+}
+
+# Metrics charted as trends; each level's covering history index includes them
+TREND_METRICS = {
+    'operational': ['Member Net', 'Revenue', 'Lead to Member %', 'New Members', 'New Leads',
+                    'Projected Revenue', 'TAV'],
+    'budget': ['Member Net Real', 'Member Net Budget', 'Member Net to Budget',
+               'Projected Revenue', 'Revenue Budget', 'Projected Revenue % of Budget'],
+}
+
+def column_name(label):
+    """Database column name for a sheet metric label ('Lead Booked %' -> 'lead_booked_pct')"""
+    if label in COLUMN_NAME_OVERRIDES:
+        return COLUMN_NAME_OVERRIDES[label]
+    name = label.lower().replace('%', 'pct')
+    return re.sub(r'[^a-z0-9]+', '_', name).strip('_')
+
+def metric_registry(level, data_type="operational"):
+    """List of (label, column) pairs stored for a level, in sheet column order"""
+    excluded = LEVEL_EXCLUDED_METRICS.get(level, set())
+    return [(label, column_name(label))
+            for col_idx, label in sorted(COL_MAPS[data_type].items())
+            if label != 'Entity' and label not in excluded]
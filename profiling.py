@@ -0,0 +1,142 @@
+"""Opt-in per-rerun profiling of the dashboard
+
+Set BSI_PROFILE=1 in the server's environment, or open the app with
+?profile=1, to time every pipeline stage and dashboard section of each rerun.
+The breakdown is shown in a sidebar panel. With BSI_PROFILE_DIR set as well,
+each profiled rerun also dumps cProfile stats to
+<dir>/rerun-<timestamp>.prof (inspect with `python -m pstats`).
+
+app.py marks its work with section() blocks and, inside long render
+functions, lap() markers that end the previous part of the enclosing section
+and start the next. When profiling is off both are a thread-local lookup.
+"""
+import cProfile
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+PROFILE_ENV = 'BSI_PROFILE'
+PROFILE_DIR_ENV = 'BSI_PROFILE_DIR'
+PROFILE_QUERY_PARAM = 'profile'
+TRUTHY = ('1', 'true', 'yes', 'on')
+
+# The Profiler of the rerun running on this thread; Streamlit runs each
+# session's script on its own thread
+_state = threading.local()
+_NOT_PROFILING = nullcontext()
+
+class Profiler:
+    """Section timings, and optionally a cProfile, of one rerun"""
+
+    def __init__(self, cprofile_dir=None):
+        self.cprofile_dir = cprofile_dir
+        self.cprofile = cProfile.Profile() if cprofile_dir else None
+        self.dump_path = None
+        self.records = []   # (started, depth, name, seconds)
+        self._open = []     # [name, started, is_lap] of the sections being timed
+        self.started = time.perf_counter()
+        self.seconds = None
+
+    def push(self, name, is_lap=False):
+        self._open.append([name, time.perf_counter(), is_lap])
+
+    def pop(self):
+        name, started, _ = self._open.pop()
+        self.records.append((started, len(self._open), name, time.perf_counter() - started))
+
+    def lap(self, name):
+        if self._open and self._open[-1][2]:
+            self.pop()
+        self.push(name, is_lap=True)
+
+    def end_section(self):
+        if self._open and self._open[-1][2]:
+            self.pop()
+        self.pop()
+
+    def start(self):
+        if self.cprofile:
+            self.cprofile.enable()
+
+    def stop(self):
+        while self._open:
+            self.pop()
+        self.seconds = time.perf_counter() - self.started
+        if self.cprofile:
+            self.cprofile.disable()
+            os.makedirs(self.cprofile_dir, exist_ok=True)
+            self.dump_path = os.path.join(self.cprofile_dir, f"rerun-{datetime.now():%Y%m%d-%H%M%S-%f}.prof")
+            self.cprofile.dump_stats(self.dump_path)
+
+    def breakdown(self):
+        """DataFrame of sections in the order they started, nested ones marked ↳"""
+        rows = [{'Section': '↳ ' * depth + name,
+                 'ms': round(seconds * 1000, 1),
+                 '% of rerun': round(100 * seconds / self.seconds, 1) if self.seconds else 0.0}
+                for _, depth, name, seconds in sorted(self.records)]
+        other = self.seconds - sum(seconds for _, depth, _, seconds in self.records if depth == 0)
+        rows.append({'Section': 'Other (widgets, layout)', 'ms': round(other * 1000, 1),
+                     '% of rerun': round(100 * other / self.seconds, 1) if self.seconds else 0.0})
+        return pd.DataFrame(rows, columns=['Section', 'ms', '% of rerun'])
+
+def profiling_requested():
+    """True when BSI_PROFILE is set or the page was opened with ?profile=1"""
+    if os.environ.get(PROFILE_ENV, '').lower() in TRUTHY:
+        return True
+    return str(st.query_params.get(PROFILE_QUERY_PARAM, '')).lower() in TRUTHY
+
+@contextmanager
+def _timed(profiler, name):
+    profiler.push(name)
+    try:
+        yield
+    finally:
+        profiler.end_section()
+
+def section(name):
+    """Context manager timing `name` within the current rerun (a no-op when not profiling)"""
+    profiler = getattr(_state, 'profiler', None)
+    if profiler is None:
+        return _NOT_PROFILING
+    return _timed(profiler, name)
+
+def lap(name):
+    """End the previous lap of the enclosing section, if any, and start timing `name`"""
+    profiler = getattr(_state, 'profiler', None)
+    if profiler is not None:
+        profiler.lap(name)
+
+def render_panel(profiler):
+    """Sidebar panel with the rerun's section breakdown"""
+    with st.sidebar.expander(f"🛠️ Profile: {profiler.seconds * 1000:.0f} ms this rerun", expanded=True):
+        st.dataframe(profiler.breakdown(), use_container_width=True, hide_index=True)
+        if profiler.dump_path:
+            st.caption(f"cProfile stats: {profiler.dump_path}")
+
+@contextmanager
+def rerun():
+    """Profile the enclosed script run if requested, then show the breakdown
+
+    A rerun cut short by st.rerun() or st.stop() still dumps its cProfile
+    stats but draws no panel.
+    """
+    if not profiling_requested():
+        yield
+        return
+    profiler = Profiler(os.environ.get(PROFILE_DIR_ENV) or None)
+    _state.profiler = profiler
+    profiler.start()
+    completed = False
+    try:
+        yield
+        completed = True
+    finally:
+        _state.profiler = None
+        profiler.stop()
+    if completed:
+        render_panel(profiler)
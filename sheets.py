@@ -0,0 +1,242 @@
+import os
+from datetime import date
+from io import BytesIO
+
+import pandas as pd
+
+from metric_schema import COL_MAP_OPERATIONAL, COL_MAP_BUDGET
+
+# Google Sheet Configuration
+DATA_SOURCES = {
+    "Daily KPI Scorecard": {
+        "id": "1NLF3LTZbNybmSL8b7N3GSHwhfJD82Hxm-wkRiZooohk",
+        "type": "operational"
+    },
+    "Budget Tracker": {
+        "id": "1oVKpIEmRUTzJX5T66ziGpx2VBhLAcEETcFCS1Q4ah3M",
+        "type": "budget"
+    },
+}
+DEFAULT_DATA_SOURCE = "Daily KPI Scorecard"
+
+# Overridable so backfills and benchmarks can point at a local stand-in server
+SHEET_BASE_URL = os.environ.get("BSI_SHEET_BASE_URL", "https://docs.google.com/spreadsheets/d")
+
+# Workbook tabs that are not monthly KPI sheets
+NON_MONTH_SHEETS = ['Tracker Directory', 'Sources']
+
+def get_google_sheet_url(sheet_id, sheet_name):
+    """Generate URL to fetch Google Sheet as Excel"""
+    # Use export URL for xlsx format
+    return f"{SHEET_BASE_URL}/{sheet_id}/export?format=xlsx"
+
+def fetch_google_sheet(sheet_id):
+    """Fetch Google Sheet data directly"""
+    import requests  # deferred: only the live fetch needs it
+
+    url = get_google_sheet_url(sheet_id, None)
+    try:
+        response = requests.get(url, timeout=30)
+        response.raise_for_status()
+        return BytesIO(response.content)
+    except Exception as e:
+        raise Exception(f"Failed to fetch Google Sheet: {str(e)}")
+
+def month_sheet_names(file_path):
+    """Names of the monthly KPI tabs in a workbook, in workbook order"""
+    xl = pd.ExcelFile(file_path)
+    return [s for s in xl.sheet_names if s not in NON_MONTH_SHEETS]
+
+# Hierarchy mapping
+HIERARCHY = {
+    "North": {
+        "Dakotasota": ["Bemidji, MN", "Grand Forks, ND", "Grand Rapids, MN", "Hibbing, MN", "Jamestown, ND", "Virginia, MN"],
+        "Duluth": ["Cloquet, MN", "Duluth, MN (Superior St)", "Duluth, MN (West)", "Hermantown, MN", "Superior, WI"],
+        "Mid-Atlantic": ["Ashland, VA", "Chester, VA", "Clinton, MD", "Lovingston, VA", "Mechanicsville, VA", "Palmyra, VA", "Richmond, VA (Forest Hill Ave)", "Shrewsbury, PA", "Sparks, MD", "Timonium, MD", "Windsor, VA"],
+        "Nebraska": ["Columbus, NE", "Fremont, NE", "Grand Island, NE", "Kearney, NE", "Lincoln, NE (N. 26th)", "Lincoln, NE (27th St)", "Lincoln, NE (Pioneer Woods)"],
+        "Sioux Falls": ["Harrisburg, SD", "Sioux Falls, SD (41st)", "Sioux Falls, SD (Louise)", "Sioux Falls, SD (Sycamore)", "Tea, SD"],
+        "Southern Minnesota": ["Faribault, MN", "Mankato, MN (Madison)", "Mankato, MN (St. Andrews)", "New Ulm, MN", "Owatonna, MN", "Rochester, MN (37th)"]
+    },
+    "South Central": {
+        "Acadiana": ["Breaux Bridge, LA", "Broussard, LA", "Crowley, LA", "Lafayette, LA (Ambassador)", "Lafayette, LA (Johnston)", "New Iberia, LA", "Opelousas, LA", "Scott, LA", "Youngsville, LA"],
+        "East LA": ["Baton Rouge, LA (Coursey)", "Baton Rouge, LA (O'Neal)", "Baton Rouge, LA (Sherwood)", "Denham Springs, LA", "Gonzales, LA", "Hammond, LA", "Prairieville, LA", "Walker, LA"],
+        "Kansas City": ["Excelsior Springs, MO", "Independence, MO (Noland)", "Kansas City, MO (Barry)", "Kearney, MO", "Lee's Summit, MO (3rd)", "Liberty, MO"]
+    },
+    "South East": {
+        "East Florida": ["Jacksonville, FL (Baymeadows)", "Jacksonville, FL (Regency)", "Middleburg, FL", "Orange Park, FL", "St Augustine, FL"],
+        "Georgia": ["Albany, GA", "Americus, GA", "Cordele, GA", "Moultrie, GA", "Thomasville, GA"],
+        "West Florida": ["Bradenton, FL", "Brandon, FL", "Gibsonton, FL", "Largo, FL", "Palmetto, FL", "Riverview, FL", "Sarasota, FL", "Sun City, FL"]
+    }
+}
+
+def load_operational_data(file_path, sheet_name):
+    """Load and parse operational (Daily KPI Scorecard) data"""
+    df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
+
+    def row_to_dict(row_idx):
+        """Convert a row to a dictionary using column mapping"""
+        result = {}
+        for col_idx, col_name in COL_MAP_OPERATIONAL.items():
+            try:
+                val = df.iloc[row_idx, col_idx]
+                if pd.notna(val):
+                    result[col_name] = val
+            except:
+                pass
+        return result
+
+    # Parse data
+    data = {
+        'company': None,
+        'territories': {},
+        'regions': {},
+        'clubs': {}
+    }
+
+    # Get update timestamp
+    update_time = str(df.iloc[0, 0]) if pd.notna(df.iloc[0, 0]) else "Unknown"
+
+    # Row indices for different levels
+    company_row = 2
+    territory_rows = [5, 6, 7]  # North, South Central, South East
+
+    # Parse company level
+    data['company'] = row_to_dict(company_row)
+
+    # Parse territories
+    for row_idx in territory_rows:
+        row_data = row_to_dict(row_idx)
+        territory_name = row_data.get('Entity')
+        if territory_name:
+            data['territories'][territory_name] = row_data
+
+    # Parse regions (rows 10-21)
+    for row_idx in range(10, 22):
+        row_data = row_to_dict(row_idx)
+        region_name = row_data.get('Entity')
+        if region_name:
+            data['regions'][region_name] = row_data
+
+    # Parse clubs - find all club sections
+    current_region = None
+    for row_idx in range(23, len(df)):
+        entity_name = df.iloc[row_idx, 0]
+        col1_value = df.iloc[row_idx, 1]
+
+        if pd.isna(entity_name):
+            continue
+
+        # Check if this is a region header
+        if col1_value == 'Member Net':
+            current_region = entity_name
+            continue
+
+        # This is a club row
+        if current_region and pd.notna(col1_value):
+            club_data = row_to_dict(row_idx)
+            club_data['Region'] = current_region
+            # Find territory for this region
+            for territory, regions in HIERARCHY.items():
+                if current_region in regions:
+                    club_data['Territory'] = territory
+                    break
+            data['clubs'][entity_name] = club_data
+
+    return data, update_time
+
+def load_budget_data(file_path, sheet_name):
+    """Load and parse budget tracker data"""
+    df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
+
+    def row_to_dict(row_idx):
+        """Convert a row to a dictionary using column mapping"""
+        result = {}
+        for col_idx, col_name in COL_MAP_BUDGET.items():
+            try:
+                val = df.iloc[row_idx, col_idx]
+                if pd.notna(val):
+                    result[col_name] = val
+            except:
+                pass
+        return result
+
+    # Parse data
+    data = {
+        'company': None,
+        'territories': {},
+        'regions': {},
+        'clubs': {}
+    }
+
+    # Get update timestamp
+    update_time = str(df.iloc[0, 0]) if pd.notna(df.iloc[0, 0]) else "Unknown"
+
+    # Row indices for different levels (same structure as operational)
+    company_row = 2
+    territory_rows = [5, 6, 7]  # North, South Central, South East
+
+    # Parse company level
+    data['company'] = row_to_dict(company_row)
+
+    # Parse territories
+    for row_idx in territory_rows:
+        row_data = row_to_dict(row_idx)
+        territory_name = row_data.get('Entity')
+        if territory_name:
+            data['territories'][territory_name] = row_data
+
+    # Parse regions (rows 10-21)
+    for row_idx in range(10, 22):
+        row_data = row_to_dict(row_idx)
+        region_name = row_data.get('Entity')
+        if region_name:
+            data['regions'][region_name] = row_data
+
+    # Parse clubs - find all club sections
+    current_region = None
+    for row_idx in range(23, len(df)):
+        entity_name = df.iloc[row_idx, 0]
+        col1_value = df.iloc[row_idx, 1]
+
+        if pd.isna(entity_name):
+            continue
+
+        # Check if this is a region header (budget sheet uses 'Member Net Real' as second col)
+        if col1_value == 'Member Net Real':
+            current_region = entity_name
+            continue
+
+        # This is a club row
+        if current_region and pd.notna(col1_value):
+            club_data = row_to_dict(row_idx)
+            club_data['Region'] = current_region
+            # Find territory for this region
+            for territory, regions in HIERARCHY.items():
+                if current_region in regions:
+                    club_data['Territory'] = territory
+                    break
+            data['clubs'][entity_name] = club_data
+
+    return data, update_time
+
+def load_data(file_path, sheet_name, data_type="operational"):
+    """Load data based on the data source type"""
+    if data_type == "budget":
+        return load_budget_data(file_path, sheet_name)
+    else:
+        return load_operational_data(file_path, sheet_name)
+
+def sheet_record_date(sheet_name, update_time):
+    """Date a month tab's figures belong to
+
+    The sheet's own "updated" timestamp when it parses, otherwise the last
+    day of the month named by the tab (never later than today).
+    """
+    updated = pd.to_datetime(update_time, errors='coerce')
+    if pd.notna(updated):
+        return updated.date().isoformat()
+    month = pd.to_datetime(sheet_name, errors='coerce')
+    if pd.notna(month):
+        month_end = (month + pd.offsets.MonthEnd(0)).date()
+        return min(month_end, date.today()).isoformat()
+    return date.today().isoformat()
@@ -0,0 +1,22 @@
+"""Shared fixtures of the test suite
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """Point database.py at an empty file for one test"""
+    db.close_connections()
+    monkeypatch.setattr(db, 'DATABASE_PATH', str(tmp_path / 'test.db'))
+    db.clear_history_cache()
+    yield tmp_path
+    db.close_connections()
+    db.clear_history_cache()
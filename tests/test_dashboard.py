@@ -0,0 +1,68 @@
+"""Pure helpers of the dashboard: leaderboards, bar-chart limits and trend downsampling
+
+    python -m pytest tests
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+
+def clubs(count, seed=0):
+    """load_data()-shaped clubs with distinct Revenue values across two territories"""
+    rng = np.random.default_rng(seed)
+    revenues = rng.permutation(count).astype(float) * 10
+    return {f'Club {n}': {'Entity': f'Club {n}', 'Revenue': revenue,
+                          'Region': f'Region {n % 4}', 'Territory': 'North' if n % 4 < 2 else 'South'}
+            for n, revenue in enumerate(revenues)}
+
+@pytest.mark.parametrize('k', [1, 5, 40, 500])
+@pytest.mark.parametrize('ascending', [False, True])
+@pytest.mark.parametrize('view_level, scope', [('Company', None), ('Territory', 'South'), ('Region', 'Region 1')])
+def test_rank_clubs_matches_a_full_sort(k, ascending, view_level, scope):
+    data = clubs(200)
+    index = app.build_ranking_index(data)
+    ranked = [index['names'][p] for p in app.rank_clubs(index, 'Revenue', k, view_level, scope, ascending)]
+
+    in_scope = [name for name, metrics in data.items()
+                if view_level == 'Company' or metrics[view_level] == scope]
+    expected = sorted(in_scope, key=lambda name: data[name]['Revenue'], reverse=not ascending)[:k]
+    assert ranked == expected
+
+def test_ranking_index_is_built_once_per_snapshot():
+    data = {'clubs': clubs(10)}
+    assert app.get_ranking_index(data) is app.get_ranking_index(data)
+    assert app.get_ranking_index({'clubs': clubs(10)}) is not app.get_ranking_index(data)
+
+def comparison(count):
+    return pd.DataFrame({'Entity': [f'Club {n}' for n in range(count)],
+                         'Revenue': np.arange(count, dtype=float), 'Members': np.arange(count) * 2.0})
+
+def test_limit_entities_folds_the_rest_into_their_average():
+    df = comparison(30)
+    top = app.limit_entities(df, 'Revenue', 'Top', n=5)
+    assert top['Entity'].tolist()[:5] == [f'Club {n}' for n in range(29, 24, -1)]
+    assert top.iloc[-1].to_dict() == {'Entity': 'Others (avg of 25)', 'Revenue': 12.0, 'Members': 24.0}
+    bottom = app.limit_entities(df, 'Revenue', 'Bottom', n=5)
+    assert bottom['Entity'].tolist()[:5] == [f'Club {n}' for n in range(5)]
+    assert bottom.iloc[-1]['Revenue'] == 17.0
+
+@pytest.mark.parametrize('count, mode', [(30, None), (5, 'Top')])
+def test_limit_entities_leaves_small_or_unlimited_frames_alone(count, mode):
+    df = comparison(count)
+    assert app.limit_entities(df, 'Revenue', mode, n=5) is df
+
+def test_lttb_keeps_the_ends_and_the_spikes():
+    x = np.arange(10_000, dtype=float)
+    y = np.sin(x / 500)
+    y[[1234, 7777]] = [50.0, -50.0]
+    keep = app.lttb_downsample(x, y, 400)
+    assert len(keep) == 400
+    assert keep[0] == 0 and keep[-1] == len(x) - 1
+    assert np.all(np.diff(keep) > 0)
+    assert {1234, 7777} <= set(keep.tolist())
+
+@pytest.mark.parametrize('threshold', [2, 100, 1000])
+def test_lttb_keeps_short_series_whole(threshold):
+    x = np.arange(100, dtype=float)
+    assert np.array_equal(app.lttb_downsample(x, x, threshold), np.arange(100))
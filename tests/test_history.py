@@ -0,0 +1,26 @@
+"""History queries
+
+    python -m pytest tests
+"""
+import pytest
+
+import database as db
+
+def snapshot(revenue):
+    """A load_data()-shaped snapshot with a company row and one club"""
+    return {'company': {'Entity': 'Company', 'Revenue': revenue},
+            'territories': {}, 'regions': {},
+            'clubs': {'Club 0': {'Entity': 'Club 0', 'Revenue': revenue, 'Region': 'Lakes', 'Territory': 'North'}}}
+
+@pytest.mark.parametrize('level', ['company', 'club'])
+def test_no_metrics_gives_an_empty_frame(database, level):
+    db.ingest_snapshot('test', 'June 2025', '2025-06-02', snapshot(1.0), intraday=False)
+    history = db.get_history(level, None, [])
+    assert history.empty and list(history.columns) == db.HISTORY_COLUMNS
+
+def test_no_entities_gives_an_empty_frame(database):
+    db.ingest_snapshot('test', 'June 2025', '2025-06-02', snapshot(1.0), intraday=False)
+    history = db.get_history('club', [], ['Revenue'])
+    assert history.empty and list(history.columns) == db.HISTORY_COLUMNS
+    # The company level has no entity names to filter on
+    assert db.get_history('company', [], ['Revenue'])['value'].tolist() == [1.0]
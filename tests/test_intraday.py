@@ -0,0 +1,149 @@
+"""Round trips of the incremental ingest and the intraday delta history
+
+    python -m pytest tests
+"""
+import copy
+import sqlite3
+
+import pytest
+
+import database as db
+from metric_schema import LEVEL_NAME_COLUMNS, metric_registry
+
+MONTH = 'June 2025'
+DAY = '2025-06-02'
+
+def _metrics(level, seed):
+    labels = [label for label, _ in metric_registry(level)]
+    return {label: float(seed * 100 + i) for i, label in enumerate(labels)}
+
+def snapshot():
+    """A small load_data()-shaped operational snapshot"""
+    clubs = {}
+    for n, (territory, region) in enumerate([('North', 'Lakes'), ('North', 'Lakes'), ('South', 'Coast')]):
+        clubs[f'Club {n}'] = {'Entity': f'Club {n}', **_metrics('club', n + 10),
+                              'Region': region, 'Territory': territory}
+    return {
+        'company': {'Entity': 'Company', **_metrics('company', 1)},
+        'territories': {name: {'Entity': name, **_metrics('territory', seed)}
+                        for seed, name in enumerate(['North', 'South'], start=2)},
+        'regions': {name: {'Entity': name, **_metrics('region', seed)}
+                    for seed, name in enumerate(['Lakes', 'Coast'], start=4)},
+        'clubs': clubs,
+    }
+
+def refreshes():
+    """A day of refreshes: changed values, blanked cells, a club leaving, moving and coming back"""
+    first = snapshot()
+    second = copy.deepcopy(first)
+    second['company']['Member Net'] = -3.0
+    second['clubs']['Club 0']['Revenue'] = 123.45
+    third = copy.deepcopy(second)
+    third['clubs']['Club 1']['Revenue'] = None
+    third['regions']['Coast']['Member Net'] = None
+    fourth = copy.deepcopy(third)
+    del fourth['clubs']['Club 2']
+    fifth = copy.deepcopy(fourth)
+    fifth['clubs']['Club 1']['Revenue'] = 99.0
+    fifth['clubs']['Club 0'].update(Region='Coast', Territory='South')
+    sixth = copy.deepcopy(fifth)
+    sixth['clubs']['Club 2'] = copy.deepcopy(first['clubs']['Club 2'])
+    return [first, second, third, fourth, fifth, sixth, copy.deepcopy(sixth)]
+
+def without_blanks(data, latest=None):
+    """`data` as load_intraday_snapshot() returns it: blank metrics left out, and
+    clubs under their territory and region in `latest`"""
+    def clean(metrics):
+        return {label: value for label, value in metrics.items() if value is not None}
+    clubs = {name: clean(metrics) for name, metrics in data['clubs'].items()}
+    for name, metrics in clubs.items():
+        if latest and name in latest['clubs']:
+            metrics.update(Region=latest['clubs'][name]['Region'], Territory=latest['clubs'][name]['Territory'])
+    return {
+        'company': clean(data['company']),
+        'territories': {name: clean(metrics) for name, metrics in data['territories'].items()},
+        'regions': {name: clean(metrics) for name, metrics in data['regions'].items()},
+        'clubs': clubs,
+    }
+
+def table_contents(path):
+    """Every daily metric row (without ids) and every rollup row of a database file"""
+    conn = sqlite3.connect(path)
+    contents = {}
+    for level in db.METRIC_LEVELS:
+        columns = ('record_date', 'month_year') + LEVEL_NAME_COLUMNS[level] + tuple(
+            column for _, column in metric_registry(level))
+        contents[level] = conn.execute(
+            f"SELECT {', '.join(columns)} FROM {db.metrics_table(level)} ORDER BY {', '.join(columns[:3])}"
+        ).fetchall()
+    contents['rollups'] = conn.execute('SELECT * FROM metric_rollups ORDER BY 1, 2, 3, 4, 5').fetchall()
+    conn.close()
+    return contents
+
+@pytest.mark.parametrize('keyframe_interval', [db.INTRADAY_KEYFRAME_INTERVAL, 3])
+def test_intraday_snapshots_round_trip(database, monkeypatch, keyframe_interval):
+    monkeypatch.setattr(db, 'INTRADAY_KEYFRAME_INTERVAL', keyframe_interval)
+    state = {}
+    for data in refreshes():
+        db.ingest_snapshot('test', MONTH, DAY, data, state=state)
+    snapshots = db.get_intraday_snapshots(DAY).sort_values('id')
+    assert len(snapshots) == len(refreshes())
+    assert snapshots['is_keyframe'].sum() == -(-len(refreshes()) // keyframe_interval)
+    if keyframe_interval > len(refreshes()):
+        # The repeated last refresh changed nothing
+        assert snapshots['cell_count'].iloc[-1] == 0
+    # Locations are not versioned: Club 0's move shows in every snapshot
+    for snapshot_id, data in zip(snapshots['id'], refreshes()):
+        rebuilt, _ = db.load_intraday_snapshot(int(snapshot_id))
+        assert without_blanks(rebuilt) == without_blanks(data, latest=refreshes()[-1])
+
+def test_incremental_ingest_matches_full_writes(database):
+    state = {}
+    for data in refreshes():
+        db.ingest_snapshot('test', MONTH, DAY, data, state=state)
+    incremental = table_contents(db.DATABASE_PATH)
+
+    db.close_connections()
+    db.DATABASE_PATH = str(database / 'full.db')
+    for data in refreshes():
+        db.ingest_snapshot('test', MONTH, DAY, data)
+    assert table_contents(db.DATABASE_PATH) == incremental
+
+def test_state_is_dropped_after_another_write(database):
+    state = {}
+    first, second = refreshes()[:2]
+    db.ingest_snapshot('test', MONTH, DAY, first, state=state)
+    # Written as another process would: without the state, and unseen by the write generation
+    db.ingest_snapshot('other', MONTH, DAY, second, intraday=False)
+    state['generation'] = db._data_generation
+    db.ingest_snapshot('test', MONTH, DAY, first, state=state)
+    stored, _ = db.load_snapshot_from_db(DAY, MONTH)
+    assert stored['company']['Member Net'] == first['company']['Member Net']
+
+def test_save_functions_fold_rollups(database):
+    upload_id = db.save_upload('test', MONTH, 1)
+    metrics = {'Entity': 'Club 0', **_metrics('club', 1)}
+    db.save_club_metrics(upload_id, DAY, MONTH, 'North', 'Lakes', 'Club 0', metrics)
+    metrics['Revenue'] = 5.0
+    db.save_club_metrics(upload_id, '2025-06-03', MONTH, 'North', 'Lakes', 'Club 0', metrics)
+    rollups = db.get_monthly_rollups('club', ['Club 0'], ['Revenue'])
+    assert rollups[['first_date', 'first_value', 'last_date', 'last_value', 'min_value']].values.tolist() == [
+        [DAY, _metrics('club', 1)['Revenue'], '2025-06-03', 5.0, 5.0]]
+
+def test_snapshot_fingerprint_moves_only_with_its_day(database):
+    def fingerprint(record_date):
+        dates = db.get_snapshot_dates()
+        return dates.loc[dates['record_date'] == record_date, 'upload_id'].item()
+    state = {}
+    first = snapshot()
+    second = copy.deepcopy(first)
+    second['clubs']['Club 1']['Revenue'] = 7.0   # only a club row changes
+    db.ingest_snapshot('test', MONTH, DAY, first, state=state)
+    before = fingerprint(DAY)
+    db.ingest_snapshot('test', MONTH, DAY, second, state=state)
+    changed = fingerprint(DAY)
+    assert changed > before
+    db.ingest_snapshot('test', MONTH, DAY, second, state=state)
+    assert fingerprint(DAY) == changed
+    db.ingest_snapshot('test', MONTH, '2025-06-03', first, state=state)
+    assert fingerprint(DAY) == changed
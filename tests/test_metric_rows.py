@@ -0,0 +1,47 @@
+"""metric_rows() against the cell-by-cell metric_to_db_value it replaced
+
+    python -m pytest tests
+"""
+import datetime
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import database as db
+from metric_schema import metric_registry
+
+LABELS = [label for label, _ in metric_registry('club')]
+
+# One column per case: metric_rows converts whole columns, so a column's
+# dtype decides its path
+COLUMNS = {
+    'numbers': [1, 2.5, np.int64(3), np.float32(0.5), float('inf')],
+    'with blanks': [1.0, None, np.nan, 4.0, 5.0],
+    'sheet text': ['12', ' 4 ', '$ -', '-', '1_000'],
+    'junk text': ['abc', '12%', 'nan', '', None],
+    'booleans': [True, False, True, False, True],
+    'timestamps': [pd.Timestamp('2025-06-02')] * 5,
+    'dates': [datetime.date(2025, 6, 2)] * 5,
+    'datetimes': [datetime.datetime(2025, 6, 2, 8)] * 4 + [pd.NaT],
+    'durations': [pd.Timedelta('1D')] * 5,
+    'mixed': [3, '7', pd.Timestamp('2025-06-02'), '$ -', 2.0],
+}
+
+def stored(value):
+    """What SQLite keeps of a bound value: NaN is stored as NULL"""
+    return None if value is None or (isinstance(value, float) and math.isnan(value)) else value
+
+@pytest.mark.parametrize('case', COLUMNS)
+def test_metric_rows_matches_metric_to_db_value(case):
+    values = COLUMNS[case]
+    label = LABELS[1]
+    metric_dicts = [{LABELS[0]: 1.0, label: value} for value in values]
+    id_rows = [(1, '2025-06-02', 'June 2025', 'North', 'Lakes', f'Club {n}') for n in range(len(values))]
+    rows = db.metric_rows('club', id_rows, metric_dicts)
+    id_count = len(id_rows[0])
+    for row, ids, metrics in zip(rows, id_rows, metric_dicts):
+        assert row[:id_count] == ids
+        expected = [stored(db.metric_to_db_value(metrics.get(name))) for name in LABELS]
+        assert list(row[id_count:]) == expected
@@ -0,0 +1,59 @@
+"""Retention tiers and the background writer's periodic maintenance
+
+    python -m pytest tests
+"""
+import sqlite3
+from datetime import date, timedelta
+
+import database as db
+
+def snapshot(revenue):
+    """A load_data()-shaped snapshot with only a company row"""
+    return {'company': {'Entity': 'Company', 'Revenue': revenue},
+            'territories': {}, 'regions': {}, 'clubs': {}}
+
+def old_month():
+    """month_year and two record_dates of a month past the daily retention cutoff"""
+    start = (date.today() - timedelta(days=db.DAILY_RETENTION_DAYS + 60)).replace(day=1)
+    return f'{start:%B %Y}', [start.isoformat(), (start + timedelta(days=1)).isoformat()]
+
+def company_rows(month_year):
+    conn = sqlite3.connect(db.DATABASE_PATH)
+    count = conn.execute(f"SELECT COUNT(*) FROM {db.metrics_table('company')} WHERE month_year = ?",
+                         (month_year,)).fetchone()[0]
+    conn.close()
+    return count
+
+def test_writer_maintenance_keeps_daily_rows(database):
+    month_year, days = old_month()
+    for revenue, record_date in enumerate(days):
+        db.ingest_snapshot('backfill', month_year, record_date, snapshot(float(revenue)), intraday=False)
+    assert db.maintenance_due()
+
+    errors = db.writer_stats['errors']
+    db.enqueue_snapshot('live', f'{date.today():%B %Y}', date.today().isoformat(), snapshot(7.0))
+    db.flush_background_writer()
+    assert db.writer_stats['errors'] == errors
+    assert not db.maintenance_due()
+    # Only an explicit compaction (archive.py compact, after exporting) thins them
+    assert company_rows(month_year) == 2
+    assert db.compact_database()['rows_deleted'] == 1
+    assert company_rows(month_year) == 1
+
+def test_compaction_keeps_rollups_exact(database):
+    month_year, days = old_month()
+    start = date.fromisoformat(days[0])
+    # The month's low and high land on days that thinning deletes
+    revenues = [5.0, 1.0, 9.0, 4.0]
+    for offset, revenue in enumerate(revenues):
+        db.ingest_snapshot('backfill', month_year, (start + timedelta(days=offset)).isoformat(),
+                           snapshot(revenue), intraday=False)
+    before = db.get_monthly_rollups('company', metrics=['Revenue'])
+    assert before[['first_value', 'last_value', 'min_value', 'max_value']].values.tolist() == [[5.0, 4.0, 1.0, 9.0]]
+
+    assert db.compact_database()['rows_deleted'] == len(revenues) - 1
+    db.clear_history_cache()
+    assert db.get_monthly_rollups('company', metrics=['Revenue']).equals(before)
+    # Only the month-end row is left in the daily table
+    history = db.get_history('company', metrics=['Revenue'])
+    assert history[['record_date', 'value']].values.tolist() == [[(start + timedelta(days=3)).isoformat(), 4.0]]
@@ -0,0 +1,51 @@
+"""Background writer queue: de-duplication and backpressure
+
+    python -m pytest tests
+"""
+import queue
+from collections import OrderedDict
+
+import pytest
+
+import database as db
+
+def snapshot(revenue):
+    return {'company': {'Entity': 'Company', 'Revenue': revenue},
+            'territories': {}, 'regions': {}, 'clubs': {}}
+
+@pytest.fixture
+def held_queue(monkeypatch):
+    """A two-slot write queue that nothing drains, so tests see what enqueue_snapshot leaves in it"""
+    pending = queue.Queue(maxsize=2)
+    monkeypatch.setattr(db, 'start_background_writer', lambda: None)
+    monkeypatch.setattr(db, '_write_queue', pending)
+    monkeypatch.setattr(db, '_seen_digests', OrderedDict())
+    monkeypatch.setattr(db, 'writer_stats', dict(db.writer_stats, queued=0, duplicates=0, dropped=0))
+    return pending
+
+def queued_revenues(pending):
+    return [item[4]['company']['Revenue'] for item in list(pending.queue)]
+
+def test_identical_snapshots_are_queued_once(held_queue):
+    assert db.enqueue_snapshot('test', 'June 2025', '2025-06-02', snapshot(1.0)) == 'queued'
+    assert db.enqueue_snapshot('test', 'June 2025', '2025-06-02', snapshot(1.0)) == 'duplicate'
+    assert db.enqueue_snapshot('test', 'June 2025', '2025-06-03', snapshot(1.0)) == 'queued'
+    assert queued_revenues(held_queue) == [1.0, 1.0]
+    assert db.writer_stats['duplicates'] == 1
+
+def test_full_queue_drops_the_oldest_snapshot(held_queue):
+    for revenue in (1.0, 2.0, 3.0):
+        assert db.enqueue_snapshot('test', 'June 2025', '2025-06-02', snapshot(revenue)) == 'queued'
+    assert queued_revenues(held_queue) == [2.0, 3.0]
+    assert db.writer_stats['dropped'] == 1
+    # The dropped snapshot is forgotten, so it is written if it comes back
+    assert db.enqueue_snapshot('test', 'June 2025', '2025-06-02', snapshot(1.0)) == 'queued'
+    assert queued_revenues(held_queue) == [3.0, 1.0]
+
+def test_shutdown_sentinel_is_never_dropped(held_queue):
+    held_queue.put_nowait(None)
+    db.enqueue_snapshot('test', 'June 2025', '2025-06-02', snapshot(1.0))
+    # The writer is stopping: the new snapshot is refused and the sentinel kept
+    assert db.enqueue_snapshot('test', 'June 2025', '2025-06-02', snapshot(2.0)) == 'dropped'
+    assert list(held_queue.queue)[-1] is None
+    assert [item[4]['company']['Revenue'] for item in list(held_queue.queue)[:-1]] == [1.0]